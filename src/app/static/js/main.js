@@ -1,6 +1,8 @@
 // Estado global de la aplicación
 let currentUserId = null;
 let currentRecommendation = null;
+let currentSlate = null;
+const SLATE_SIZE = 5;  // recomendaciones por petición
 let availableUsers = [];
 
 // Utilidades
@@ -116,7 +118,8 @@ async function getRecommendation() {
                 'Content-Type': 'application/json'
             },
             body: JSON.stringify({
-                user_id: currentUserId
+                user_id: currentUserId,
+                top_k: SLATE_SIZE
             })
         });
         
@@ -126,7 +129,7 @@ async function getRecommendation() {
             throw new Error(data.error);
         }
         
-        currentRecommendation = data;
+        currentSlate = data;
         displayRecommendation(data);
         
         hideLoading();
@@ -136,17 +139,50 @@ async function getRecommendation() {
     }
 }
 
-function displayRecommendation(rec) {
+function displayRecommendation(data) {
     document.getElementById('recommendationResult').style.display = 'block';
+    document.getElementById('strategy').textContent = data.strategy;
+    
+    // Lista completa: cada elemento tiene su propio recommendation_id
+    // Los nombres de artista vienen del dataset: se insertan como texto, nunca como HTML
+    const slateList = document.getElementById('slateList');
+    slateList.replaceChildren(...data.slate.map((item, index) => {
+        const li = document.createElement('li');
+        li.className = 'slate-item';
+        li.addEventListener('click', () => selectSlateItem(index));
+        
+        const rank = document.createElement('span');
+        rank.className = 'slate-rank';
+        rank.textContent = item.rank;
+        
+        const name = document.createElement('span');
+        name.className = 'slate-name';
+        name.textContent = item.artist_name;
+        
+        li.append(rank, name);
+        return li;
+    }));
+    
+    selectSlateItem(0);
+}
+
+// Mostrar un elemento de la lista como recomendación activa (destino del feedback)
+function selectSlateItem(index) {
+    const rec = currentSlate.slate[index];
+    currentRecommendation = rec;
+    
     document.getElementById('artistName').textContent = rec.artist_name;
     document.getElementById('artistId').textContent = rec.artist_id;
-    document.getElementById('strategy').textContent = rec.strategy;
     document.getElementById('reason').textContent = rec.reason;
     document.getElementById('confidence').textContent = formatPercentage(rec.confidence);
     
     const confidenceFill = document.getElementById('confidenceFill');
     confidenceFill.style.width = formatPercentage(rec.confidence);
     
+    document.querySelectorAll('#slateList .slate-item').forEach((item, i) => {
+        item.classList.toggle('active', i === index);
+    });
+    
     // Limpiar feedback anterior
     document.getElementById('feedbackResult').innerHTML = '';
     document.getElementById('feedbackResult').className = 'feedback-result';
@@ -169,6 +205,7 @@ async function submitFeedback(feedbackType) {
             body: JSON.stringify({
                 user_id: currentUserId,
                 artist_id: currentRecommendation.artist_id,
+                recommendation_id: currentRecommendation.recommendation_id,
                 feedback_type: feedbackType
             })
         });
@@ -261,21 +298,6 @@ async function loadUserProfile(userId) {
                 <p>Sofisticación del usuario: ${formatPercentage(data.user_sophistication)}</p>
             `;
         } else {
-            let historyHTML = '';
-            if (data.interaction_history && data.interaction_history.length > 0) {
-                historyHTML = '<h4>Últimas interacciones:</h4><ul>';
-                data.interaction_history.forEach(interaction => {
-                    historyHTML += `
-                        <li>
-                            ${interaction.artist_name} (${interaction.strategy}) - 
-                            Recompensa: ${formatNumber(interaction.reward, 3)} - 
-                            ${interaction.outcome}
-                        </li>
-                    `;
-                });
-                historyHTML += '</ul>';
-            }
-            
             profileContent.innerHTML = `
                 <div class="profile-stats">
                     <p><strong>Interacciones totales:</strong> ${data.total_interactions}</p>
@@ -283,8 +305,21 @@ async function loadUserProfile(userId) {
                     <p><strong>Confianza del agente:</strong> ${formatPercentage(data.agent_confidence)}</p>
                     <p><strong>Sofisticación:</strong> ${formatPercentage(data.user_sophistication)}</p>
                 </div>
-                ${historyHTML}
             `;
+            
+            // Historial con nombres de artista del dataset: como texto, nunca como HTML
+            if (data.interaction_history && data.interaction_history.length > 0) {
+                const title = document.createElement('h4');
+                title.textContent = 'Últimas interacciones:';
+                const list = document.createElement('ul');
+                data.interaction_history.forEach(interaction => {
+                    const li = document.createElement('li');
+                    li.textContent = `${interaction.artist_name} (${interaction.strategy}) - ` +
+                        `Recompensa: ${formatNumber(interaction.reward, 3)} - ${interaction.outcome}`;
+                    list.append(li);
+                });
+                profileContent.append(title, list);
+            }
         }
         
     } catch (error) {
@@ -0,0 +1,101 @@
+"""Rutas de la API para la ingesta de interacciones"""
+from fastapi import APIRouter, HTTPException, Depends
+import logging
+
+from models.schemas import (
+    InteractionIngestRequest,
+    FriendshipIngestRequest,
+    TagIngestRequest,
+    IngestionResponse
+)
+from core.dependencies import get_ingestion_service, get_request_executor
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api", tags=["ingestion"])
+
+
+@router.post("/interactions", response_model=IngestionResponse)
+async def ingest_interactions(request: InteractionIngestRequest,
+                              ingestion_service = Depends(get_ingestion_service),
+                              executor = Depends(get_request_executor)):
+    """Ingerir eventos de escucha (se aplican en micro-batches)"""
+    try:
+        # ingest puede disparar un flush: se ejecuta fuera del event loop
+        accepted = await executor.run(
+            ingestion_service.ingest,
+            [(event.user_id, event.artist_id, event.weight) for event in request.events]
+        )
+        applied = await executor.run(ingestion_service.flush) if request.flush else 0
+        
+        return IngestionResponse(
+            accepted=accepted,
+            applied=applied,
+            pending_events=ingestion_service.pending,
+            statistics=ingestion_service.get_statistics()
+        )
+    
+    except ValueError as e:
+        # IDs fuera del catálogo: el batch se rechaza entero
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error ingiriendo interacciones: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/friendships", response_model=IngestionResponse)
+async def ingest_friendships(request: FriendshipIngestRequest,
+                             ingestion_service = Depends(get_ingestion_service),
+                             executor = Depends(get_request_executor)):
+    """Ingerir relaciones de amistad (se aplican de inmediato)"""
+    try:
+        applied = await executor.run(
+            ingestion_service.ingest_friendships,
+            [(f.user_id, f.friend_id) for f in request.friendships]
+        )
+        
+        return IngestionResponse(
+            accepted=len(request.friendships),
+            applied=applied,
+            pending_events=ingestion_service.pending,
+            statistics=ingestion_service.get_statistics()
+        )
+    
+    except ValueError as e:
+        # IDs fuera del catálogo: el batch se rechaza entero
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error ingiriendo amistades: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/tags", response_model=IngestionResponse)
+async def ingest_tags(request: TagIngestRequest,
+                      ingestion_service = Depends(get_ingestion_service),
+                      executor = Depends(get_request_executor)):
+    """Ingerir asignaciones de tags (se aplican de inmediato)"""
+    try:
+        applied = await executor.run(
+            ingestion_service.ingest_tags,
+            [(t.user_id, t.artist_id, t.tag_id) for t in request.tags]
+        )
+        
+        return IngestionResponse(
+            accepted=len(request.tags),
+            applied=applied,
+            pending_events=ingestion_service.pending,
+            statistics=ingestion_service.get_statistics()
+        )
+    
+    except ValueError as e:
+        # IDs fuera del catálogo: el batch se rechaza entero
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error ingiriendo tags: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/interactions/statistics")
+async def get_ingestion_statistics(ingestion_service = Depends(get_ingestion_service)):
+    """Obtener estadísticas de la ingesta"""
+    return ingestion_service.get_statistics()
@@ -1,25 +1,62 @@
 """Rutas de la API para el sistema de recomendación"""
-from fastapi import APIRouter, HTTPException, Depends
-from typing import Dict
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
+from pydantic import BaseModel
+from typing import Awaitable, Callable, Dict
 import logging
 
 from models.schemas import (
     RecommendationRequest,
     RecommendationResponse,
+    SlateItem,
     FeedbackRequest,
     FeedbackResponse,
+    BatchFeedbackRequest,
+    BatchFeedbackResponse,
     AgentStatisticsResponse,
     UserProfileResponse,
     UserStateResponse,
     AvailableUsersResponse
 )
-from core.dependencies import get_agent_service
+from core.dependencies import (
+    get_agent_service, get_request_executor, get_feedback_batcher, get_response_cache
+)
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api", tags=["recommendations"])
 
 
+async def _cached_response(http_request: Request, response_cache, kind: str, user_id: int,
+                           build: Callable[[], Awaitable[BaseModel]]) -> Response:
+    """
+    Servir una respuesta por usuario desde la caché versionada (con ETag y 304)
+    
+    Args:
+        http_request: Petición HTTP (para If-None-Match)
+        response_cache: Caché de respuestas (None = calcular siempre)
+        kind: Tipo de respuesta
+        user_id: ID del usuario
+        build: Corrutina que calcula el modelo de respuesta
+        
+    Returns:
+        Respuesta JSON ya serializada, o 304 si el cliente tiene la versión actual
+    """
+    if response_cache is None:
+        return Response(content=(await build()).model_dump_json(), media_type="application/json")
+    
+    cached = response_cache.get(kind, user_id)
+    if cached is None:
+        # Versión leída antes de calcular: si cambia entretanto no se guarda
+        version = response_cache.version(user_id)
+        body = (await build()).model_dump_json().encode()
+        cached = response_cache.put(kind, user_id, version, body)
+    
+    etag, body = cached
+    if response_cache.is_not_modified(etag, http_request.headers.get("if-none-match")):
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+
 @router.get("/users", response_model=AvailableUsersResponse)
 async def get_available_users(limit: int = 100, agent_service = Depends(get_agent_service)):
     """Obtener lista de usuarios disponibles"""
@@ -36,14 +73,19 @@ async def get_available_users(limit: int = 100, agent_service = Depends(get_agen
 
 
 @router.get("/users/{user_id}/state", response_model=UserStateResponse)
-async def get_user_state(user_id: int, agent_service = Depends(get_agent_service)):
+async def get_user_state(user_id: int, http_request: Request, agent_service = Depends(get_agent_service),
+                         executor = Depends(get_request_executor),
+                         response_cache = Depends(get_response_cache)):
     """Obtener estado actual de un usuario"""
     try:
         if not agent_service.data_repository.get_user_exists(user_id):
             raise HTTPException(status_code=404, detail=f"Usuario {user_id} no encontrado")
         
-        user_state = agent_service.perception.get_user_state(user_id)
-        return UserStateResponse(**user_state)
+        async def build():
+            user_state = await executor.run(agent_service.perception.get_user_state, user_id)
+            return UserStateResponse(**user_state)
+        
+        return await _cached_response(http_request, response_cache, "state", user_id, build)
     
     except HTTPException:
         raise
@@ -53,7 +95,8 @@ async def get_user_state(user_id: int, agent_service = Depends(get_agent_service
 
 
 @router.post("/recommend", response_model=RecommendationResponse)
-async def get_recommendation(request: RecommendationRequest, agent_service = Depends(get_agent_service)):
+async def get_recommendation(request: RecommendationRequest, agent_service = Depends(get_agent_service),
+                             executor = Depends(get_request_executor)):
     """Obtener recomendación para un usuario"""
     try:
         if not agent_service.data_repository.get_user_exists(request.user_id):
@@ -62,25 +105,47 @@ async def get_recommendation(request: RecommendationRequest, agent_service = Dep
                 detail=f"Usuario {request.user_id} no encontrado"
             )
         
-        # Generar recomendación
-        recommendation, decision_info = agent_service.recommend(
+        # Generar recomendaciones (fuera del event loop, serializada por usuario)
+        generate = (agent_service.recommend_hybrid if request.mode == 'hybrid'
+                    else agent_service.recommend_slate)
+        recommendations, decision_info = await executor.run(
+            generate,
             request.user_id,
-            request.context
+            request.top_k,
+            request.context,
+            user_id=request.user_id
         )
+        recommendation = recommendations[0]
+        
+        details = {
+            'action_type': decision_info.action_type,
+            'agent_confidence': decision_info.agent_confidence,
+            'user_sophistication': decision_info.user_state['overall_sophistication']
+        }
+        if decision_info.pipeline is not None:
+            details.update(decision_info.pipeline)
         
         # Preparar respuesta
         return RecommendationResponse(
+            recommendation_id=recommendation.recommendation_id,
             artist_id=recommendation.artist_id,
             artist_name=recommendation.artist_name,
             strategy=recommendation.strategy,
             reason=recommendation.reason,
             confidence=recommendation.confidence,
             timestamp=recommendation.timestamp,
-            decision_info={
-                'action_type': decision_info.action_type,
-                'agent_confidence': decision_info.agent_confidence,
-                'user_sophistication': decision_info.user_state['overall_sophistication']
-            }
+            decision_info=details,
+            slate=[
+                SlateItem(
+                    recommendation_id=rec.recommendation_id,
+                    rank=rank,
+                    artist_id=rec.artist_id,
+                    artist_name=rec.artist_name,
+                    reason=rec.reason,
+                    confidence=rec.confidence
+                )
+                for rank, rec in enumerate(recommendations, start=1)
+            ]
         )
     
     except HTTPException:
@@ -91,7 +156,9 @@ async def get_recommendation(request: RecommendationRequest, agent_service = Dep
 
 
 @router.post("/feedback", response_model=FeedbackResponse)
-async def submit_feedback(request: FeedbackRequest, agent_service = Depends(get_agent_service)):
+async def submit_feedback(request: FeedbackRequest, agent_service = Depends(get_agent_service),
+                          executor = Depends(get_request_executor),
+                          response_cache = Depends(get_response_cache)):
     """Enviar feedback sobre una recomendación"""
     try:
         if not agent_service.data_repository.get_user_exists(request.user_id):
@@ -100,37 +167,41 @@ async def submit_feedback(request: FeedbackRequest, agent_service = Depends(get_
                 detail=f"Usuario {request.user_id} no encontrado"
             )
         
-        # Crear objeto de recomendación para el feedback
-        from models.entities import Recommendation
-        from datetime import datetime
-        
-        # Buscar la última recomendación para este usuario/artista
-        recommendation = None
-        if request.user_id in agent_service.interaction_memory:
-            recent_interactions = agent_service.interaction_memory[request.user_id]
-            for interaction in reversed(recent_interactions):
-                if interaction['recommendation'].artist_id == request.artist_id:
-                    recommendation = interaction['recommendation']
-                    break
-        
-        # Si no se encuentra en el historial, crear una con estrategia por defecto válida
-        if recommendation is None:
-            recommendation = Recommendation(
-                artist_id=request.artist_id,
-                artist_name=agent_service.data_repository.get_artist_name(request.artist_id),
-                strategy="Traditional CF",  # Estrategia por defecto válida
-                reason="Feedback submission",
-                confidence=0.5,
-                timestamp=datetime.now()
+        def process_feedback():
+            if request.recommendation_id is not None:
+                # Decisión exacta por ID (O(1)); se consume para no acreditarla dos veces
+                recommendation = agent_service.resolve_recommendation(
+                    request.user_id, request.recommendation_id, request.artist_id
+                )
+                if recommendation is None:
+                    raise HTTPException(
+                        status_code=404,
+                        detail=f"Recomendación {request.recommendation_id} no encontrada, expirada "
+                               f"o de otro usuario/artista"
+                    )
+            else:
+                # Clientes sin ID: última recomendación pendiente para este usuario/artista
+                recommendation = agent_service.find_recommendation(request.user_id, request.artist_id)
+                if recommendation is None:
+                    # Igual que 'not_found' en el lote: no se aprende de una recomendación inventada
+                    raise HTTPException(
+                        status_code=404,
+                        detail=f"No hay ninguna recomendación pendiente del artista "
+                               f"{request.artist_id} para el usuario {request.user_id}"
+                    )
+            
+            # Procesar feedback
+            return agent_service.learn_from_feedback(
+                request.user_id,
+                recommendation,
+                request.feedback_type,
+                request.feedback_value
             )
         
-        # Procesar feedback
-        learning_info = agent_service.learn_from_feedback(
-            request.user_id,
-            recommendation,
-            request.feedback_type,
-            request.feedback_value
-        )
+        # Búsqueda y aprendizaje bajo el mismo lock del usuario
+        learning_info = await executor.run(process_feedback, user_id=request.user_id)
+        if response_cache is not None:
+            response_cache.bump([request.user_id])
         
         return FeedbackResponse(
             user_id=request.user_id,
@@ -148,26 +219,64 @@ async def submit_feedback(request: FeedbackRequest, agent_service = Depends(get_
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/statistics", response_model=AgentStatisticsResponse)
-async def get_statistics(agent_service = Depends(get_agent_service)):
-    """Obtener estadísticas del agente"""
+@router.post("/feedback/batch", response_model=BatchFeedbackResponse)
+async def submit_feedback_batch(request: BatchFeedbackRequest, agent_service = Depends(get_agent_service),
+                                batcher = Depends(get_feedback_batcher),
+                                response_cache = Depends(get_response_cache)):
+    """Enviar un lote de feedback (se aprende en micro-batches con actualización en bloque)"""
     try:
-        stats = agent_service.get_agent_statistics()
+        # Los eventos de usuarios desconocidos se rechazan uno a uno, no todo el lote
+        known_users = {
+            user_id for user_id in {event.user_id for event in request.events}
+            if agent_service.data_repository.get_user_exists(user_id)
+        }
+        accepted = [i for i, event in enumerate(request.events) if event.user_id in known_users]
         
-        # Preparar top usuarios
-        top_users = []
-        sorted_users = sorted(
-            stats.user_profiles.items(),
-            key=lambda x: x[1]['total_interactions'],
-            reverse=True
-        )[:10]
+        result = await batcher.submit([request.events[i].model_dump() for i in accepted])
         
-        for user_id, profile in sorted_users:
-            top_users.append({
-                'user_id': user_id,
-                **profile
+        statuses = ['unknown_user'] * len(request.events)
+        for i, status in zip(accepted, result['statuses']):
+            statuses[i] = status
+        applied = statuses.count('applied')
+        if response_cache is not None:
+            response_cache.bump({
+                event.user_id for event, status in zip(request.events, statuses) if status == 'applied'
             })
         
+        return BatchFeedbackResponse(
+            received=len(statuses),
+            applied=applied,
+            rejected=len(statuses) - applied,
+            statuses=statuses,
+            batch=result['batch']
+        )
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error procesando feedback en lote: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/feedback/statistics")
+async def get_feedback_statistics(batcher = Depends(get_feedback_batcher)):
+    """Obtener throughput de los micro-batches de feedback"""
+    return batcher.get_statistics()
+
+
+@router.get("/statistics", response_model=AgentStatisticsResponse)
+async def get_statistics(agent_service = Depends(get_agent_service),
+                         executor = Depends(get_request_executor)):
+    """Obtener estadísticas del agente"""
+    try:
+        stats = await executor.run(agent_service.get_agent_statistics)
+        
+        # Top usuarios (ya ordenados por interacciones)
+        top_users = [
+            {'user_id': user_id, **profile}
+            for user_id, profile in stats.user_profiles.items()
+        ]
+        
         return AgentStatisticsResponse(
             total_users=stats.total_users,
             total_recommendations=stats.total_recommendations,
@@ -183,48 +292,53 @@ async def get_statistics(agent_service = Depends(get_agent_service)):
 
 
 @router.get("/users/{user_id}/profile", response_model=UserProfileResponse)
-async def get_user_profile(user_id: int, agent_service = Depends(get_agent_service)):
+async def get_user_profile(user_id: int, http_request: Request, agent_service = Depends(get_agent_service),
+                           executor = Depends(get_request_executor),
+                           response_cache = Depends(get_response_cache)):
     """Obtener perfil detallado de un usuario"""
     try:
-        profile = agent_service.get_user_profile(user_id)
-        
-        if profile is None:
-            # Usuario existe pero no ha interactuado con el agente
-            if agent_service.data_repository.get_user_exists(user_id):
-                user_state = agent_service.perception.get_user_state(user_id)
-                return UserProfileResponse(
-                    user_id=user_id,
-                    total_interactions=0,
-                    preferred_strategy="None",
-                    agent_confidence=0.0,
-                    user_sophistication=user_state['overall_sophistication'],
-                    interaction_history=[]
-                )
-            else:
-                raise HTTPException(status_code=404, detail=f"Usuario {user_id} no encontrado")
-        
-        # Preparar historial de interacciones
-        interaction_history = []
-        for interaction in profile['interaction_history']:
-            rec = interaction['recommendation']
-            learning = interaction['learning']
-            interaction_history.append({
-                'timestamp': rec.timestamp.isoformat(),
-                'artist_id': rec.artist_id,
-                'artist_name': rec.artist_name,
-                'strategy': rec.strategy,
-                'reward': learning.reward,
-                'outcome': learning.outcome
-            })
+        async def build():
+            profile = await executor.run(agent_service.get_user_profile, user_id, user_id=user_id)
+            
+            if profile is None:
+                # Usuario existe pero no ha interactuado con el agente
+                if agent_service.data_repository.get_user_exists(user_id):
+                    user_state = agent_service.perception.get_user_state(user_id)
+                    return UserProfileResponse(
+                        user_id=user_id,
+                        total_interactions=0,
+                        preferred_strategy="None",
+                        agent_confidence=0.0,
+                        user_sophistication=user_state['overall_sophistication'],
+                        interaction_history=[]
+                    )
+                else:
+                    raise HTTPException(status_code=404, detail=f"Usuario {user_id} no encontrado")
+            
+            # Preparar historial de interacciones
+            interaction_history = []
+            for interaction in profile['interaction_history']:
+                rec = interaction['recommendation']
+                learning = interaction['learning']
+                interaction_history.append({
+                    'timestamp': rec.timestamp.isoformat(),
+                    'artist_id': rec.artist_id,
+                    'artist_name': rec.artist_name,
+                    'strategy': rec.strategy,
+                    'reward': learning.reward,
+                    'outcome': learning.outcome
+                })
+            
+            return UserProfileResponse(
+                user_id=profile['user_id'],
+                total_interactions=profile['total_interactions'],
+                preferred_strategy=profile['preferred_strategy'],
+                agent_confidence=profile['agent_confidence'],
+                user_sophistication=profile['user_sophistication'],
+                interaction_history=interaction_history
+            )
         
-        return UserProfileResponse(
-            user_id=profile['user_id'],
-            total_interactions=profile['total_interactions'],
-            preferred_strategy=profile['preferred_strategy'],
-            agent_confidence=profile['agent_confidence'],
-            user_sophistication=profile['user_sophistication'],
-            interaction_history=interaction_history
-        )
+        return await _cached_response(http_request, response_cache, "profile", user_id, build)
     
     except HTTPException:
         raise
@@ -232,3 +346,44 @@ async def get_user_profile(user_id: int, agent_service = Depends(get_agent_servi
         logger.error(f"Error obteniendo perfil del usuario {user_id}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+
+
+@router.get("/cache/statistics")
+async def get_cache_statistics(agent_service = Depends(get_agent_service),
+                               response_cache = Depends(get_response_cache)):
+    """Obtener estadísticas de las cachés"""
+    stats = {
+        'user_state': agent_service.perception.state_cache.get_statistics()
+    }
+    if response_cache is not None:
+        stats['responses'] = response_cache.get_statistics()
+    if agent_service.pending_decisions is not None:
+        stats['pending_decisions'] = agent_service.pending_decisions.get_statistics()
+    if agent_service.candidate_pools is not None:
+        stats['candidate_pools'] = agent_service.candidate_pools.get_statistics()
+    return stats
+
+
+@router.get("/persistence/statistics")
+async def get_persistence_statistics(agent_service = Depends(get_agent_service),
+                                     executor = Depends(get_request_executor)):
+    """Obtener estadísticas de persistencia (log, snapshots y última recuperación; por shard si hay shards)"""
+    # Con shards es una consulta por IPC: fuera del event loop
+    stats = await executor.run(agent_service.get_persistence_statistics)
+    if stats is None:
+        return {'enabled': False}
+    return {'enabled': True, **stats}
+
+
+@router.get("/pipeline/statistics")
+async def get_pipeline_statistics(agent_service = Depends(get_agent_service)):
+    """Obtener latencia media por etapa del pipeline híbrido"""
+    if agent_service.pipeline is None:
+        return {'enabled': False}
+    return {'enabled': True, **agent_service.pipeline.get_statistics()}
+
+
+@router.get("/executor/statistics")
+async def get_executor_statistics(executor = Depends(get_request_executor)):
+    """Obtener estadísticas del pool de ejecución (hilos, espera y ejecución media)"""
+    return executor.get_statistics()
@@ -0,0 +1,43 @@
+"""Rutas de la API para el sharding de agentes entre procesos"""
+from fastapi import APIRouter, HTTPException, Depends
+import logging
+
+from core.dependencies import get_agent_service, get_request_executor
+from services.sharding_service import ShardedAgentDispatcher
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api", tags=["sharding"])
+
+
+def _require_dispatcher(agent_service) -> ShardedAgentDispatcher:
+    """Comprobar que el sharding está activo"""
+    if not isinstance(agent_service, ShardedAgentDispatcher):
+        raise HTTPException(status_code=400, detail="Sharding desactivado (SHARD_WORKERS = 0)")
+    return agent_service
+
+
+@router.get("/shards")
+async def get_shards(agent_service = Depends(get_agent_service),
+                     executor = Depends(get_request_executor)):
+    """Obtener shards, usuarios por shard y rebalanceos realizados"""
+    dispatcher = _require_dispatcher(agent_service)
+    try:
+        # Consulta por IPC a todos los shards: fuera del event loop
+        return await executor.run(dispatcher.get_statistics)
+    except Exception as e:
+        logger.error(f"Error obteniendo estado de los shards: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/shards")
+async def add_shard(agent_service = Depends(get_agent_service),
+                    executor = Depends(get_request_executor)):
+    """Añadir un proceso de shard y migrarle los usuarios que le corresponden"""
+    dispatcher = _require_dispatcher(agent_service)
+    try:
+        # Arrancar el proceso y migrar tarda segundos: fuera del event loop
+        return await executor.run(dispatcher.add_worker)
+    except Exception as e:
+        logger.error(f"Error añadiendo shard: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,112 @@
+"""Benchmark de concurrencia de la API - latencias p50/p99 bajo carga paralela
+
+Compara la ejecución de las rutas en el event loop (--workers 0) con el
+executor de hilos: los clientes piden recomendación + feedback en bucle y
+una sonda consulta /health para medir cuánto se bloquea el event loop.
+
+Uso (desde src/backend):
+    python benchmarks/bench_concurrency.py [--requests 400] [--concurrency 32] [--workers 0 8]
+"""
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.config import settings  # noqa: E402
+from core.dependencies import get_agent_service, get_request_executor  # noqa: E402
+from services.executor_service import RequestExecutor  # noqa: E402
+
+
+def percentiles(latencies: list) -> str:
+    if not latencies:
+        return "-"
+    values = np.asarray(latencies) * 1000
+    return (f"p50={np.percentile(values, 50):7.2f} ms  p99={np.percentile(values, 99):7.2f} ms  "
+            f"(n={len(values)})")
+
+
+async def run_load(app, user_ids: np.ndarray, n_requests: int, concurrency: int,
+                   seed: int) -> dict:
+    """Lanzar `n_requests` ciclos recomendación+feedback con `concurrency` clientes"""
+    rng = np.random.default_rng(seed)
+    latencies = {'recommend': [], 'feedback': [], 'health': []}
+    remaining = iter(range(n_requests))
+    done = asyncio.Event()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def worker():
+            for _ in remaining:
+                user_id = int(rng.choice(user_ids))
+                start = time.perf_counter()
+                response = await client.post('/api/recommend', json={'user_id': user_id})
+                latencies['recommend'].append(time.perf_counter() - start)
+                artist_id = response.json()['artist_id']
+
+                start = time.perf_counter()
+                await client.post('/api/feedback', json={
+                    'user_id': user_id, 'artist_id': artist_id,
+                    'feedback_type': str(rng.choice(['positive', 'neutral', 'negative']))
+                })
+                latencies['feedback'].append(time.perf_counter() - start)
+
+        async def probe():
+            while not done.is_set():
+                start = time.perf_counter()
+                await client.get('/health')
+                latencies['health'].append(time.perf_counter() - start)
+                await asyncio.sleep(0.005)
+
+        probe_task = asyncio.create_task(probe())
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        done.set()
+        await probe_task
+
+    latencies['elapsed'] = elapsed
+    return latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--data-path', type=Path, default=settings.DATA_PATH)
+    parser.add_argument('--requests', type=int, default=400, help='ciclos recomendación+feedback')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--workers', type=int, nargs='+', default=[0, settings.EXECUTOR_WORKERS])
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger().setLevel(logging.WARNING)
+    settings.DATA_PATH = args.data_path
+
+    import main as api
+    agent = get_agent_service()
+    user_ids = agent.data_repository.user_artists['userID'].unique()
+
+    for workers in args.workers:
+        executor = RequestExecutor(max_workers=workers, lock_stripes=settings.EXECUTOR_LOCK_STRIPES)
+        api.app.dependency_overrides[get_request_executor] = lambda: executor
+
+        result = asyncio.run(run_load(api.app, user_ids, args.requests, args.concurrency, seed=0))
+        executor.shutdown()
+
+        mode = "event loop" if workers == 0 else f"{workers} hilos"
+        print(f"\n== {mode}: {args.requests} ciclos, {args.concurrency} clientes, "
+              f"{2 * args.requests / result['elapsed']:,.0f} peticiones/s")
+        for endpoint in ('recommend', 'feedback', 'health'):
+            print(f"  {endpoint:<10} {percentiles(result[endpoint])}")
+
+    api.app.dependency_overrides.clear()
+
+
+if __name__ == '__main__':
+    main()
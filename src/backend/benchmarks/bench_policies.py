@@ -0,0 +1,86 @@
+"""Benchmark de políticas de bandit - selecciones por segundo frente a UCB
+
+Uso (desde src/backend):
+    python benchmarks/bench_policies.py [--users 100000] [--batch 1024]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.config import settings  # noqa: E402
+from services.bandit_service import BANDIT_POLICIES, BanditStore, create_policy  # noqa: E402
+from services.perception_service import STATE_FEATURES  # noqa: E402
+
+
+def build_store(n_users: int, warmup_steps: int, rng: np.random.Generator) -> BanditStore:
+    """Crear un almacén con `n_users` usuarios y recompensas sintéticas"""
+    store = BanditStore(settings.RECOMMENDATION_STRATEGIES, initial_capacity=n_users)
+    for user_id in range(n_users):
+        store.add_user(user_id, settings.CONFIDENCE_LEVEL_NEW_USER)
+
+    n_events = n_users * warmup_steps
+    rows = rng.integers(0, n_users, n_events)
+    arms = rng.integers(0, store.n_arms, n_events)
+    store.update_many(rows, arms, rng.random(n_events, dtype=np.float32))
+    return store
+
+
+def bench_policy(name: str, store: BanditStore, contexts: np.ndarray, batch: int,
+                 duration: float, rng: np.random.Generator) -> dict:
+    """Medir selecciones/seg y coste de actualización de una política"""
+    policy = create_policy(name, store.n_arms, len(STATE_FEATURES), seed=0)
+
+    selections = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < duration:
+        rows = rng.integers(0, store.n_rows, batch)
+        policy.select_arms(store, rows, contexts[rows])
+        selections += batch
+    select_elapsed = time.perf_counter() - start
+
+    rows = rng.integers(0, store.n_rows, batch)
+    arms, _ = policy.select_arms(store, rows, contexts[rows])
+    start = time.perf_counter()
+    policy.update_many(rows, arms, rng.random(batch), contexts[rows])
+    update_elapsed = time.perf_counter() - start
+
+    return {
+        'policy': name,
+        'selections_per_sec': selections / select_elapsed,
+        'update_us_per_event': update_elapsed / batch * 1e6
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=100_000)
+    parser.add_argument('--batch', type=int, default=1024)
+    parser.add_argument('--warmup-steps', type=int, default=5)
+    parser.add_argument('--duration', type=float, default=2.0, help='segundos por política')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    store = build_store(args.users, args.warmup_steps, rng)
+    contexts = rng.random((args.users, len(STATE_FEATURES)), dtype=np.float32)
+
+    print(f"{args.users} usuarios, batches de {args.batch}, {store.n_arms} brazos")
+    results = [
+        bench_policy(name, store, contexts, args.batch, args.duration, rng)
+        for name in BANDIT_POLICIES
+    ]
+
+    baseline = results[0]['selections_per_sec']
+    print(f"{'política':<20}{'selecciones/s':>16}{'vs UCB':>10}{'update µs/evento':>20}")
+    for result in results:
+        print(f"{result['policy']:<20}{result['selections_per_sec']:>16,.0f}"
+              f"{result['selections_per_sec'] / baseline:>9.2f}x"
+              f"{result['update_us_per_event']:>20.2f}")
+
+
+if __name__ == '__main__':
+    main()
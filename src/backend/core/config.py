@@ -1,5 +1,6 @@
 """Configuración de la aplicación"""
 from pathlib import Path
+from typing import Optional
 
 
 class Settings:
@@ -20,6 +21,45 @@ class Settings:
     CONFIDENCE_LEVEL_NEW_USER: float = 2.0
     CONFIDENCE_LEVEL_EXPERIENCED_USER: float = 1.2
     MIN_INTERACTIONS_FOR_PERSONALIZATION: int = 5
+    USER_HISTORY_WINDOW: int = 50  # interacciones recientes guardadas por usuario
+    BANDIT_HISTORY_WINDOW: int = 10  # recompensas recientes por usuario (confianza del agente)
+    BANDIT_STORE_INITIAL_CAPACITY: int = 1024  # usuarios; crece duplicando
+    STATISTICS_TOP_USERS: int = 10
+    BANDIT_POLICY: str = 'ucb'  # 'ucb', 'thompson_beta', 'thompson_gaussian' o 'linucb'
+    LINUCB_ALPHA: float = 1.0
+    THOMPSON_NOISE_STD: float = 0.5
+    PENDING_DECISIONS_MAX_SIZE: int = 100000  # recomendaciones a la espera de feedback
+    PENDING_DECISIONS_TTL: Optional[float] = 3600.0  # segundos
+    
+    # Percepción
+    SOCIAL_ALIGNMENT_CHUNK_SIZE: int = 1024  # usuarios por bloque en productos dispersos
+    USER_STATE_CACHE_SIZE: int = 10000
+    USER_STATE_CACHE_TTL: Optional[float] = 300.0  # segundos
+    
+    # Respuestas serializadas de estado y perfil por usuario (versionadas, con ETag)
+    RESPONSE_CACHE_SIZE: int = 10000  # 0 = desactivada
+    RESPONSE_CACHE_TTL: Optional[float] = 300.0  # segundos
+    
+    # Candidatos pre-computados
+    SOCIAL_CANDIDATES_TOP_N: int = 50
+    SEMANTIC_USE_TFIDF: bool = False
+    SEMANTIC_CACHE_TOP_N: int = 50  # 0 = un producto disperso por petición
+    
+    # Filtrado colaborativo: factores SVD exportados por backend_colaborativo (memory-map)
+    CF_MODEL_PATH: Optional[Path] = Path(__file__).parent.parent.parent / "backend_colaborativo" / "factors"
+    
+    # Pools de candidatos pre-calculados para los usuarios activos
+    CANDIDATE_POOL_SIZE: int = 20  # por usuario y estrategia; 0 = calcular en cada petición
+    CANDIDATE_POOL_REFRESH_INTERVAL: float = 60.0  # segundos
+    
+    # Modo híbrido (candidatos de todas las estrategias re-ordenados)
+    HYBRID_CANDIDATES_PER_STRATEGY: int = 50
+    HYBRID_TEMPERATURE: float = 0.1  # softmax de las recompensas medias por estrategia
+    
+    # Exploración
+    EXPLORATION_MODE: str = 'uniform'  # 'uniform', 'long_tail' o 'popularity'
+    EXPLORATION_LONG_TAIL_ALPHA: float = 1.0
+    RANDOM_SEED: Optional[int] = None
     
     # Recommendation Strategies
     RECOMMENDATION_STRATEGIES: list = [
@@ -28,6 +68,32 @@ class Settings:
         'Exploration',
         'Traditional CF'
     ]
+    
+    # Ingesta de interacciones
+    INGESTION_BATCH_SIZE: int = 1000
+    INGESTION_FLUSH_INTERVAL: float = 2.0
+    INGESTION_TAIL_FILE: Optional[Path] = None  # p.ej. DATA_PATH / "user_artists.dat"
+    
+    # Feedback en lote (micro-batches de aprendizaje)
+    FEEDBACK_BATCH_MAX_SIZE: int = 5000  # eventos máximos por micro-batch
+    FEEDBACK_BATCH_MAX_WAIT: float = 0.05  # segundos esperando a completar un micro-batch
+    
+    # Persistencia del estado aprendido (log + snapshots)
+    PERSISTENCE_DIR: Optional[Path] = None  # None = solo en memoria
+    PERSISTENCE_FLUSH_BATCH_SIZE: int = 256  # registros por escritura del log
+    PERSISTENCE_FLUSH_INTERVAL: float = 1.0  # segundos máximos sin escribir el buffer
+    PERSISTENCE_SNAPSHOT_INTERVAL: int = 50000  # actualizaciones entre snapshots
+    PERSISTENCE_FSYNC: bool = False
+    
+    # Sharding de agentes entre procesos (0 = agente en el propio proceso)
+    SHARD_WORKERS: int = 0
+    SHARD_VIRTUAL_NODES: int = 64
+    SHARD_SHARED_DATA: bool = True  # los shards mapean las tablas del proceso principal en vez de leer DATA_PATH
+    SHARED_DATA_PATH: Optional[Path] = None  # volcado a mapear (lo fija el dispatcher en cada shard)
+    
+    # Ejecución de rutas fuera del event loop
+    EXECUTOR_WORKERS: int = 8  # hilos; 0 = ejecutar en el event loop
+    EXECUTOR_LOCK_STRIPES: int = 256  # locks por usuario (striped)
 
 
 settings = Settings()
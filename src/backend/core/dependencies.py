@@ -1,5 +1,6 @@
 """Inyección de dependencias para FastAPI"""
 from functools import lru_cache
+from typing import Optional
 import logging
 
 from core.config import settings
@@ -7,6 +8,12 @@ from repositories.data_repository import DataRepository
 from services.perception_service import PerceptionModule
 from services.reward_service import MultimodalRewardSystem
 from services.agent_service import IntelligentRecommendationAgent
+from services.ingestion_service import InteractionIngestionService
+from services.persistence_service import BanditPersistence
+from services.sharding_service import ShardedAgentDispatcher
+from services.executor_service import RequestExecutor
+from services.feedback_service import FeedbackBatcher
+from services.cache_service import VersionedResponseCache
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +22,11 @@ _data_repository = None
 _perception_module = None
 _reward_system = None
 _agent_service = None
+_ingestion_service = None
+_shard_dispatcher = None
+_request_executor = None
+_feedback_batcher = None
+_response_cache = None
 
 
 def get_data_repository() -> DataRepository:
@@ -22,7 +34,7 @@ def get_data_repository() -> DataRepository:
     global _data_repository
     if _data_repository is None:
         logger.info("Inicializando DataRepository...")
-        _data_repository = DataRepository(settings.DATA_PATH)
+        _data_repository = DataRepository(settings.DATA_PATH, shared_path=settings.SHARED_DATA_PATH)
     return _data_repository
 
 
@@ -37,7 +49,10 @@ def get_perception_module() -> PerceptionModule:
             data_repo.user_friends,
             data_repo.user_tagged,
             data_repo.artists,
-            data_repo.tags
+            data_repo.tags,
+            alignment_chunk_size=settings.SOCIAL_ALIGNMENT_CHUNK_SIZE,
+            state_cache_size=settings.USER_STATE_CACHE_SIZE,
+            state_cache_ttl=settings.USER_STATE_CACHE_TTL
         )
     return _perception_module
 
@@ -48,12 +63,17 @@ def get_reward_system() -> MultimodalRewardSystem:
     if _reward_system is None:
         logger.info("Inicializando MultimodalRewardSystem...")
         perception = get_perception_module()
-        _reward_system = MultimodalRewardSystem(perception)
+        _reward_system = MultimodalRewardSystem(
+            perception, settings.RECOMMENDATION_STRATEGIES, seed=settings.RANDOM_SEED
+        )
     return _reward_system
 
 
 def get_agent_service() -> IntelligentRecommendationAgent:
-    """Obtener instancia del agente inteligente"""
+    """Obtener instancia del agente inteligente (el dispatcher de shards si SHARD_WORKERS > 0)"""
+    if settings.SHARD_WORKERS > 0:
+        return get_shard_dispatcher()
+    
     global _agent_service
     if _agent_service is None:
         logger.info("Inicializando IntelligentRecommendationAgent...")
@@ -67,9 +87,115 @@ def get_agent_service() -> IntelligentRecommendationAgent:
             data_repository=data_repo,
             recommendation_strategies=settings.RECOMMENDATION_STRATEGIES,
             confidence_level_new_user=settings.CONFIDENCE_LEVEL_NEW_USER,
-            confidence_level_experienced_user=settings.CONFIDENCE_LEVEL_EXPERIENCED_USER
+            confidence_level_experienced_user=settings.CONFIDENCE_LEVEL_EXPERIENCED_USER,
+            social_candidates_top_n=settings.SOCIAL_CANDIDATES_TOP_N,
+            semantic_use_tfidf=settings.SEMANTIC_USE_TFIDF,
+            semantic_cache_top_n=settings.SEMANTIC_CACHE_TOP_N,
+            exploration_mode=settings.EXPLORATION_MODE,
+            exploration_long_tail_alpha=settings.EXPLORATION_LONG_TAIL_ALPHA,
+            random_seed=settings.RANDOM_SEED,
+            history_window=settings.USER_HISTORY_WINDOW,
+            bandit_history_window=settings.BANDIT_HISTORY_WINDOW,
+            bandit_initial_capacity=settings.BANDIT_STORE_INITIAL_CAPACITY,
+            statistics_top_users=settings.STATISTICS_TOP_USERS,
+            bandit_policy=settings.BANDIT_POLICY,
+            linucb_alpha=settings.LINUCB_ALPHA,
+            thompson_noise_std=settings.THOMPSON_NOISE_STD,
+            pending_decisions_max_size=settings.PENDING_DECISIONS_MAX_SIZE,
+            pending_decisions_ttl=settings.PENDING_DECISIONS_TTL,
+            hybrid_candidates_per_strategy=settings.HYBRID_CANDIDATES_PER_STRATEGY,
+            hybrid_temperature=settings.HYBRID_TEMPERATURE,
+            cf_model_path=settings.CF_MODEL_PATH,
+            candidate_pool_size=settings.CANDIDATE_POOL_SIZE,
+            candidate_pool_refresh_interval=settings.CANDIDATE_POOL_REFRESH_INTERVAL
         )
+        if settings.PERSISTENCE_DIR is not None:
+            _agent_service.attach_persistence(BanditPersistence(
+                settings.PERSISTENCE_DIR,
+                flush_batch_size=settings.PERSISTENCE_FLUSH_BATCH_SIZE,
+                flush_interval=settings.PERSISTENCE_FLUSH_INTERVAL,
+                snapshot_interval=settings.PERSISTENCE_SNAPSHOT_INTERVAL,
+                fsync=settings.PERSISTENCE_FSYNC
+            ))
+        if _agent_service.candidate_pools is not None:
+            # Tras recuperar la persistencia: el primer cálculo ya cubre a los usuarios restaurados
+            _agent_service.candidate_pools.start()
         logger.info("✅ Sistema de recomendación inicializado completamente")
     
     return _agent_service
 
+
+
+def get_shard_dispatcher() -> ShardedAgentDispatcher:
+    """Obtener instancia del dispatcher de agentes en procesos de shard"""
+    global _shard_dispatcher
+    if _shard_dispatcher is None:
+        logger.info(f"Inicializando ShardedAgentDispatcher ({settings.SHARD_WORKERS} shards)...")
+        _shard_dispatcher = ShardedAgentDispatcher(
+            get_data_repository(),
+            get_perception_module(),
+            n_workers=settings.SHARD_WORKERS,
+            virtual_nodes=settings.SHARD_VIRTUAL_NODES,
+            settings_overrides={
+                key: getattr(settings, key) for key in dir(settings) if key.isupper()
+            }
+        )
+    return _shard_dispatcher
+
+
+def get_ingestion_service() -> InteractionIngestionService:
+    """Obtener instancia del servicio de ingesta de interacciones"""
+    global _ingestion_service
+    if _ingestion_service is None:
+        logger.info("Inicializando InteractionIngestionService...")
+        _ingestion_service = InteractionIngestionService(
+            data_repository=get_data_repository(),
+            perception_module=get_perception_module(),
+            batch_size=settings.INGESTION_BATCH_SIZE,
+            flush_interval=settings.INGESTION_FLUSH_INTERVAL
+        )
+        _ingestion_service.add_listener(get_agent_service().on_data_ingested)
+        response_cache = get_response_cache()
+        if response_cache is not None:
+            perception = get_perception_module()
+            _ingestion_service.add_listener(
+                lambda kind, batch: response_cache.bump(perception.affected_users(kind, batch))
+            )
+        if settings.INGESTION_TAIL_FILE is not None:
+            _ingestion_service.tail_file(settings.INGESTION_TAIL_FILE)
+    return _ingestion_service
+
+
+def get_request_executor() -> RequestExecutor:
+    """Obtener instancia del executor de las rutas"""
+    global _request_executor
+    if _request_executor is None:
+        _request_executor = RequestExecutor(
+            max_workers=settings.EXECUTOR_WORKERS,
+            lock_stripes=settings.EXECUTOR_LOCK_STRIPES
+        )
+    return _request_executor
+
+
+def get_feedback_batcher() -> FeedbackBatcher:
+    """Obtener instancia del batcher de feedback"""
+    global _feedback_batcher
+    if _feedback_batcher is None:
+        _feedback_batcher = FeedbackBatcher(
+            get_agent_service(),
+            get_request_executor(),
+            max_batch_size=settings.FEEDBACK_BATCH_MAX_SIZE,
+            max_wait=settings.FEEDBACK_BATCH_MAX_WAIT
+        )
+    return _feedback_batcher
+
+
+def get_response_cache() -> Optional[VersionedResponseCache]:
+    """Obtener instancia de la caché de respuestas por usuario (None si está desactivada)"""
+    global _response_cache
+    if _response_cache is None and settings.RESPONSE_CACHE_SIZE > 0:
+        _response_cache = VersionedResponseCache(
+            maxsize=settings.RESPONSE_CACHE_SIZE,
+            ttl=settings.RESPONSE_CACHE_TTL
+        )
+    return _response_cache
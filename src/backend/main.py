@@ -5,8 +5,11 @@ from datetime import datetime
 import logging
 
 from core.config import settings
-from core.dependencies import get_data_repository, get_agent_service
-from api.routes import recommendations
+from core.dependencies import (
+    get_data_repository, get_agent_service, get_ingestion_service, get_request_executor,
+    get_feedback_batcher
+)
+from api.routes import recommendations, ingestion, sharding
 from models.schemas import HealthResponse
 
 # Configurar logging
@@ -34,6 +37,8 @@ app.add_middleware(
 
 # Incluir routers
 app.include_router(recommendations.router)
+app.include_router(ingestion.router)
+app.include_router(sharding.router)
 
 
 @app.on_event("startup")
@@ -47,12 +52,24 @@ async def startup_event():
     try:
         data_repo = get_data_repository()
         agent = get_agent_service()
+        get_ingestion_service().start()
         logger.info("✅ Todos los servicios inicializados correctamente")
     except Exception as e:
         logger.error(f"❌ Error inicializando servicios: {e}")
         raise
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Evento de cierre de la aplicación"""
+    # El batcher aprende lo encolado en el executor: se detiene antes que él
+    await get_feedback_batcher().stop()
+    get_request_executor().shutdown()
+    get_ingestion_service().stop()
+    get_agent_service().shutdown()
+    logger.info("🛑 Servicios detenidos")
+
+
 @app.get("/", response_model=HealthResponse)
 async def root():
     """Endpoint raíz - Health check"""
@@ -62,7 +79,7 @@ async def root():
         status="healthy",
         timestamp=datetime.now(),
         version=settings.API_VERSION,
-        users_loaded=len(data_repo.user_artists['userID'].unique()),
+        users_loaded=data_repo.get_user_count(),
         artists_loaded=len(data_repo.artists)
     )
 
@@ -76,7 +93,7 @@ async def health():
         status="healthy",
         timestamp=datetime.now(),
         version=settings.API_VERSION,
-        users_loaded=len(data_repo.user_artists['userID'].unique()),
+        users_loaded=data_repo.get_user_count(),
         artists_loaded=len(data_repo.artists)
     )
 
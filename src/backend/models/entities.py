@@ -27,6 +27,7 @@ class Recommendation:
     reason: str
     confidence: float
     timestamp: Optional[datetime] = None
+    recommendation_id: Optional[str] = None
 
 
 @dataclass
@@ -39,6 +40,7 @@ class DecisionInfo:
     user_state: Dict
     recommendation: Recommendation
     agent_confidence: float
+    pipeline: Optional[Dict] = None  # pesos y latencias del modo híbrido
 
 
 @dataclass
@@ -62,5 +64,5 @@ class AgentStatistics:
     average_reward: float
     active_sessions: int
     strategy_performance: Dict
-    user_profiles: Dict
+    user_profiles: Dict  # top de usuarios por interacciones, ordenado
 
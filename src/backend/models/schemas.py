@@ -3,6 +3,9 @@ from pydantic import BaseModel, Field
 from typing import Optional, Dict, List
 from datetime import datetime
 
+# Cota de los IDs ingeridos: los pares (usuario, artista/tag) se codifican en un int64
+MAX_ID = 2 ** 31
+
 
 class UserStateResponse(BaseModel):
     """Respuesta con el estado del usuario"""
@@ -21,10 +24,27 @@ class RecommendationRequest(BaseModel):
     """Petición de recomendación"""
     user_id: int = Field(gt=0, description="ID del usuario")
     context: Optional[Dict] = Field(default=None, description="Contexto adicional")
+    top_k: int = Field(default=1, ge=1, le=50, description="Número de recomendaciones (slate)")
+    mode: str = Field(
+        default='bandit',
+        pattern='^(bandit|hybrid)$',
+        description="'bandit' (una estrategia elegida) o 'hybrid' (candidatos de todas, re-ordenados)"
+    )
+
+
+class SlateItem(BaseModel):
+    """Elemento de una lista de recomendaciones"""
+    recommendation_id: str
+    rank: int
+    artist_id: int
+    artist_name: str
+    reason: str
+    confidence: float = Field(ge=0, le=1)
 
 
 class RecommendationResponse(BaseModel):
     """Respuesta con recomendación"""
+    recommendation_id: str
     artist_id: int
     artist_name: str
     strategy: str
@@ -32,12 +52,20 @@ class RecommendationResponse(BaseModel):
     confidence: float = Field(ge=0, le=1)
     timestamp: datetime
     decision_info: Dict
+    slate: List[SlateItem] = Field(
+        default_factory=list,
+        description="Recomendaciones ordenadas; la primera coincide con los campos principales"
+    )
 
 
 class FeedbackRequest(BaseModel):
     """Petición de feedback del usuario"""
     user_id: int = Field(gt=0)
     artist_id: int
+    recommendation_id: Optional[str] = Field(
+        default=None,
+        description="ID devuelto por /api/recommend (atribuye el feedback a la decisión exacta)"
+    )
     feedback_type: str = Field(
         description="Tipo de feedback: 'explicit_rating', 'implicit_behavior', 'positive', 'neutral', 'negative'"
     )
@@ -49,6 +77,25 @@ class FeedbackRequest(BaseModel):
     )
 
 
+class BatchFeedbackRequest(BaseModel):
+    """Petición de feedback en lote"""
+    events: List[FeedbackRequest] = Field(min_length=1)
+
+
+class BatchFeedbackResponse(BaseModel):
+    """Respuesta del procesamiento de feedback en lote"""
+    received: int
+    applied: int
+    rejected: int
+    statuses: List[str] = Field(
+        description="Estado de cada evento: 'applied', 'not_found' o 'unknown_user'"
+    )
+    batch: Optional[Dict] = Field(
+        default=None,
+        description="Throughput del micro-batch que procesó los eventos"
+    )
+
+
 class FeedbackResponse(BaseModel):
     """Respuesta del procesamiento de feedback"""
     user_id: int
@@ -94,3 +141,47 @@ class AvailableUsersResponse(BaseModel):
     users: List[int]
     sample_user: Optional[int] = None
 
+
+
+class InteractionEvent(BaseModel):
+    """Evento de escucha usuario-artista (el artista debe existir en el catálogo)"""
+    user_id: int = Field(gt=0, lt=MAX_ID)
+    artist_id: int = Field(gt=0, lt=MAX_ID)
+    weight: int = Field(default=1, ge=0, description="Número de reproducciones")
+
+
+class InteractionIngestRequest(BaseModel):
+    """Petición de ingesta de interacciones"""
+    events: List[InteractionEvent]
+    flush: bool = Field(default=False, description="Aplicar el batch inmediatamente")
+
+
+class FriendshipEvent(BaseModel):
+    """Relación de amistad entre dos usuarios"""
+    user_id: int = Field(gt=0, lt=MAX_ID)
+    friend_id: int = Field(gt=0, lt=MAX_ID)
+
+
+class FriendshipIngestRequest(BaseModel):
+    """Petición de ingesta de relaciones de amistad"""
+    friendships: List[FriendshipEvent]
+
+
+class TagEvent(BaseModel):
+    """Asignación de un tag a un artista por un usuario (artista y tag deben existir en el catálogo)"""
+    user_id: int = Field(gt=0, lt=MAX_ID)
+    artist_id: int = Field(gt=0, lt=MAX_ID)
+    tag_id: int = Field(gt=0, lt=MAX_ID)
+
+
+class TagIngestRequest(BaseModel):
+    """Petición de ingesta de asignaciones de tags"""
+    tags: List[TagEvent]
+
+
+class IngestionResponse(BaseModel):
+    """Respuesta de la ingesta de interacciones"""
+    accepted: int
+    applied: int
+    pending_events: int
+    statistics: Dict
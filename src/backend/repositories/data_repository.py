@@ -2,34 +2,66 @@
 import pandas as pd
 import numpy as np
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Optional
+import json
+import threading
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Tablas que se vuelcan para compartirlas con los procesos de shard
+SHARED_TABLES = ('_artists', '_user_artists', '_tags', '_user_tagged', '_user_friends')
+
+# Columnas de texto que usan los shards (el resto de texto no se vuelca)
+SHARED_TEXT_COLUMNS = {'_artists': ('name',)}
+
 
 class DataRepository:
     """Repositorio para acceso a datos del sistema"""
     
-    def __init__(self, data_path: Path):
+    def __init__(self, data_path: Path, compact_every: int = 64,
+                 shared_path: Optional[Path] = None):
         """
         Inicializar repositorio de datos
         
         Args:
             data_path: Ruta a los archivos de datos
+            compact_every: Micro-batches acumulados antes de concatenarlos a su tabla
+            shared_path: Volcado de export_shared a mapear en memoria en lugar
+                         de leer los ficheros (procesos de shard)
         """
         self.data_path = data_path
+        self.compact_every = compact_every
+        self.shared_path = shared_path
         self._artists: Optional[pd.DataFrame] = None
         self._user_artists: Optional[pd.DataFrame] = None
         self._tags: Optional[pd.DataFrame] = None
         self._user_tagged: Optional[pd.DataFrame] = None
         self._user_friends: Optional[pd.DataFrame] = None
         
+        # Micro-batches pendientes de concatenar, por tabla
+        self._pending_chunks: Dict[str, List[pd.DataFrame]] = {
+            '_user_artists': [], '_user_friends': [], '_user_tagged': []
+        }
+        self._tables_lock = threading.Lock()
+        
+        # Índices mantenidos incrementalmente
+        self._user_ids: set = set()
+        self._user_order: List[int] = []
+        self._user_history_index: Dict[int, np.ndarray] = {}
+        self._artist_popularity: Optional[pd.Series] = None
+        self._popularity_ranking: Optional[np.ndarray] = None
+        self._artist_names: Dict[int, str] = {}
+        
         # Cargar datos al inicializar
         self.load_data()
     
     def load_data(self) -> None:
         """Cargar todos los datasets"""
+        if self.shared_path is not None:
+            self._load_shared()
+            return
+        
         try:
             logger.info(f"Cargando datos desde {self.data_path}")
             
@@ -73,6 +105,8 @@ class DataRepository:
                 self._user_tagged[['year', 'month', 'day']]
             )
             
+            self._build_indexes()
+            
             logger.info(f"✅ Datos cargados: {len(self._artists)} artistas, "
                        f"{len(self._user_artists)} interacciones, "
                        f"{len(self._user_friends)} relaciones de amistad")
@@ -81,6 +115,195 @@ class DataRepository:
             logger.error(f"Error cargando datos: {e}")
             raise
     
+    def export_shared(self, directory: Path) -> Path:
+        """
+        Volcar las tablas por columnas para que otros procesos las mapeen en memoria
+        
+        Las columnas numéricas se guardan como .npy (mapeables); de las de
+        texto solo se serializan las de SHARED_TEXT_COLUMNS, que cada proceso
+        carga en su memoria.
+        
+        Args:
+            directory: Directorio nuevo donde escribir el volcado
+            
+        Returns:
+            Directorio del volcado
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True)
+        layout = {}
+        for table in SHARED_TABLES:
+            frame = self._table(table) if table in self._pending_chunks else getattr(self, table)
+            layout[table] = []
+            for column in frame.columns:
+                values = frame[column].to_numpy()
+                if values.dtype == object:
+                    if column not in SHARED_TEXT_COLUMNS.get(table, ()):
+                        continue
+                    frame[column].to_pickle(directory / f"{table}.{column}.pkl")
+                    layout[table].append([column, 'pickle'])
+                else:
+                    np.save(directory / f"{table}.{column}.npy", values)
+                    layout[table].append([column, 'npy'])
+        (directory / 'tables.json').write_text(json.dumps(layout))
+        
+        logger.info(f"Tablas volcadas en {directory} para compartir entre procesos")
+        return directory
+    
+    def _load_shared(self) -> None:
+        """
+        Cargar las tablas de un volcado de export_shared
+        
+        Las columnas numéricas se mapean copy-on-write: los procesos comparten
+        las páginas del sistema y solo copian las que modifican.
+        """
+        layout = json.loads((self.shared_path / 'tables.json').read_text())
+        for table, columns in layout.items():
+            data = {}
+            for column, kind in columns:
+                if kind == 'npy':
+                    data[column] = np.load(self.shared_path / f"{table}.{column}.npy", mmap_mode='c')
+                else:
+                    data[column] = pd.read_pickle(self.shared_path / f"{table}.{column}.pkl")
+            setattr(self, table, pd.DataFrame(data, copy=False))
+        
+        self._build_indexes()
+        
+        logger.info(f"✅ Datos mapeados desde {self.shared_path}: {len(self._artists)} artistas, "
+                   f"{len(self._user_artists)} interacciones")
+    
+    def _build_indexes(self) -> None:
+        """Construir índices de usuarios, historiales y popularidad"""
+        self._user_order = self._user_artists['userID'].unique().tolist()
+        self._user_ids = set(self._user_order)
+        self._user_history_index = self._group_artists_by_user(self._user_artists)
+        self._artist_popularity = self._user_artists.groupby('artistID')['weight'].sum()
+        self._popularity_ranking = None
+        self._artist_names = dict(zip(self._artists['id'].tolist(), self._artists['name'].tolist()))
+    
+    @staticmethod
+    def _group_artists_by_user(interactions: pd.DataFrame) -> Dict[int, np.ndarray]:
+        """Agrupar artistas únicos (ordenados) por usuario sin usar groupby"""
+        pairs = np.unique(
+            interactions[['userID', 'artistID']].to_numpy(dtype=np.int64), axis=0
+        )
+        if len(pairs) == 0:
+            return {}
+        user_ids, starts = np.unique(pairs[:, 0], return_index=True)
+        chunks = np.split(pairs[:, 1], starts[1:])
+        return {int(uid): chunk for uid, chunk in zip(user_ids, chunks)}
+    
+    def _append_chunk(self, table: str, batch: pd.DataFrame) -> None:
+        """Guardar un micro-batch de una tabla (se concatena cada `compact_every` batches)"""
+        with self._tables_lock:
+            # Se compactan los batches anteriores: si falla, el nuevo aún no se ha añadido
+            if len(self._pending_chunks[table]) >= self.compact_every:
+                self._compact(table)
+            self._pending_chunks[table].append(batch)
+    
+    def _compact(self, table: str) -> None:
+        """Concatenar a la tabla sus micro-batches pendientes (requiere _tables_lock)"""
+        chunks = self._pending_chunks[table]
+        if chunks:
+            setattr(self, table, pd.concat([getattr(self, table)] + chunks, ignore_index=True))
+            self._pending_chunks[table] = []
+    
+    def _table(self, table: str) -> pd.DataFrame:
+        """Obtener una tabla completa (concatena los micro-batches pendientes)"""
+        with self._tables_lock:
+            self._compact(table)
+            return getattr(self, table)
+    
+    def append_interactions(self, batch: pd.DataFrame) -> Dict:
+        """
+        Añadir un micro-batch de interacciones (append-only) y actualizar índices
+        
+        Todo lo que puede fallar (conversiones, agrupados) se calcula antes de
+        modificar nada: si lanza una excepción, el repositorio queda intacto.
+        
+        Args:
+            batch: DataFrame con columnas userID, artistID y weight
+            
+        Returns:
+            Diccionario con usuarios afectados, usuarios nuevos y artistas afectados
+        """
+        batch = batch[['userID', 'artistID', 'weight']].astype(
+            self._user_artists[['userID', 'artistID', 'weight']].dtypes.to_dict()
+        )
+        
+        # Usuarios nuevos
+        batch_users = batch['userID'].unique().tolist()
+        new_users = [uid for uid in batch_users if uid not in self._user_ids]
+        
+        # Historial por usuario (solo usuarios del batch)
+        histories = {}
+        for user_id, artist_ids in self._group_artists_by_user(batch).items():
+            current = self._user_history_index.get(user_id)
+            histories[user_id] = artist_ids if current is None else np.union1d(current, artist_ids)
+        
+        # Contadores de popularidad (sobre una copia)
+        batch_popularity = batch.groupby('artistID')['weight'].sum()
+        known = batch_popularity.index.isin(self._artist_popularity.index)
+        popularity = self._artist_popularity.copy()
+        popularity.loc[batch_popularity.index[known]] += batch_popularity[known]
+        if not known.all():
+            popularity = pd.concat([popularity, batch_popularity[~known]])
+        
+        # Publicar
+        self._append_chunk('_user_artists', batch)
+        self._user_ids.update(new_users)
+        self._user_order.extend(new_users)
+        self._user_history_index.update(histories)
+        self._artist_popularity = popularity
+        self._popularity_ranking = None  # se reordena en la próxima lectura
+        
+        logger.debug(f"Batch de {len(batch)} interacciones aplicado "
+                     f"({len(new_users)} usuarios nuevos)")
+        
+        return {
+            'affected_users': batch_users,
+            'new_users': new_users,
+            'affected_artists': batch_popularity.index.tolist()
+        }
+    
+    def append_friendships(self, batch: pd.DataFrame) -> Dict:
+        """
+        Añadir relaciones de amistad (append-only)
+        
+        Args:
+            batch: DataFrame con columnas userID y friendID
+            
+        Returns:
+            Diccionario con los usuarios afectados
+        """
+        batch = batch[['userID', 'friendID']].astype(
+            self._user_friends[['userID', 'friendID']].dtypes.to_dict()
+        )
+        self._append_chunk('_user_friends', batch)
+        
+        return {'affected_users': batch['userID'].unique().tolist()}
+    
+    def append_tags(self, batch: pd.DataFrame) -> Dict:
+        """
+        Añadir asignaciones de tags (append-only)
+        
+        Args:
+            batch: DataFrame con columnas userID, artistID, tagID y date
+            
+        Returns:
+            Diccionario con los usuarios afectados
+        """
+        batch = batch[['userID', 'artistID', 'tagID', 'date']].copy()
+        batch['date'] = pd.to_datetime(batch['date'])
+        batch['day'] = batch['date'].dt.day
+        batch['month'] = batch['date'].dt.month
+        batch['year'] = batch['date'].dt.year
+        batch = batch[self._user_tagged.columns].astype(self._user_tagged.dtypes.to_dict())
+        
+        self._append_chunk('_user_tagged', batch)
+        
+        return {'affected_users': batch['userID'].unique().tolist()}
+    
     @property
     def artists(self) -> pd.DataFrame:
         """Obtener DataFrame de artistas"""
@@ -89,7 +312,7 @@ class DataRepository:
     @property
     def user_artists(self) -> pd.DataFrame:
         """Obtener DataFrame de interacciones usuario-artista"""
-        return self._user_artists
+        return self._table('_user_artists')
     
     @property
     def tags(self) -> pd.DataFrame:
@@ -99,12 +322,12 @@ class DataRepository:
     @property
     def user_tagged(self) -> pd.DataFrame:
         """Obtener DataFrame de tags de usuarios"""
-        return self._user_tagged
+        return self._table('_user_tagged')
     
     @property
     def user_friends(self) -> pd.DataFrame:
         """Obtener DataFrame de amigos"""
-        return self._user_friends
+        return self._table('_user_friends')
     
     def get_artist_name(self, artist_id: int) -> str:
         """
@@ -116,9 +339,9 @@ class DataRepository:
         Returns:
             Nombre del artista o ID como string si no se encuentra
         """
-        result = self._artists[self._artists['id'] == artist_id]
-        if len(result) > 0:
-            return result['name'].iloc[0]
+        name = self._artist_names.get(int(artist_id))
+        if name is not None:
+            return name
         return f"Artist_{artist_id}"
     
     def get_user_exists(self, user_id: int) -> bool:
@@ -131,7 +354,11 @@ class DataRepository:
         Returns:
             True si el usuario existe, False en caso contrario
         """
-        return user_id in self._user_artists['userID'].values
+        return user_id in self._user_ids
+    
+    def get_user_count(self) -> int:
+        """Obtener número de usuarios con interacciones"""
+        return len(self._user_ids)
     
     def get_available_users(self, limit: int = 100) -> list:
         """
@@ -143,7 +370,7 @@ class DataRepository:
         Returns:
             Lista de IDs de usuarios
         """
-        return self._user_artists['userID'].unique()[:limit].tolist()
+        return self._user_order[:limit]
     
     def get_user_listening_history(self, user_id: int) -> pd.DataFrame:
         """
@@ -155,7 +382,47 @@ class DataRepository:
         Returns:
             DataFrame con historial de escucha
         """
-        return self._user_artists[self._user_artists['userID'] == user_id]
+        user_artists = self.user_artists
+        return user_artists[user_artists['userID'] == user_id]
+    
+    def get_user_artist_ids(self, user_id: int) -> np.ndarray:
+        """
+        Obtener IDs (únicos y ordenados) de los artistas escuchados por un usuario
+        
+        Args:
+            user_id: ID del usuario
+            
+        Returns:
+            Array de IDs de artistas
+        """
+        return self._user_history_index.get(user_id, np.empty(0, dtype=np.int64))
+    
+    def get_artist_popularity(self) -> pd.Series:
+        """
+        Obtener reproducciones totales por artista
+        
+        Returns:
+            Serie indexada por artistID con la suma de weight
+        """
+        return self._artist_popularity
+    
+    def get_popularity_ranking(self) -> np.ndarray:
+        """
+        Obtener artistas ordenados por reproducciones totales (descendente)
+        
+        El ranking se calcula una vez y solo se reordena tras aplicar nuevas
+        interacciones.
+        
+        Returns:
+            Array de artistID ordenado por popularidad
+        """
+        ranking = self._popularity_ranking
+        if ranking is None:
+            popularity = self._artist_popularity
+            order = np.argsort(-popularity.to_numpy(), kind='stable')
+            ranking = popularity.index.to_numpy(dtype=np.int64)[order]
+            self._popularity_ranking = ranking
+        return ranking
     
     def get_user_friends_list(self, user_id: int) -> list:
         """
@@ -167,7 +434,8 @@ class DataRepository:
         Returns:
             Lista de IDs de amigos
         """
-        friends = self._user_friends[self._user_friends['userID'] == user_id]
+        user_friends = self.user_friends
+        friends = user_friends[user_friends['userID'] == user_id]
         return friends['friendID'].tolist()
     
     def get_user_tags(self, user_id: int) -> pd.DataFrame:
@@ -180,5 +448,6 @@ class DataRepository:
         Returns:
             DataFrame con tags del usuario
         """
-        return self._user_tagged[self._user_tagged['userID'] == user_id]
+        user_tagged = self.user_tagged
+        return user_tagged[user_tagged['userID'] == user_id]
 
@@ -1,13 +1,25 @@
 """Servicio del Agente Inteligente - Lógica principal del agente de recomendación"""
 import numpy as np
 from datetime import datetime
-from typing import Dict, Optional, Tuple
-from collections import defaultdict, Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from collections import defaultdict, deque
+import threading
+import time
+import uuid
 import logging
 
-from services.perception_service import PerceptionModule
-from services.reward_service import MultimodalRewardSystem
-from services.bandit_service import UCBBandit
+from services.perception_service import PerceptionModule, STATE_FEATURES
+from services.reward_service import MultimodalRewardSystem, REWARD_COMPONENTS
+from services.bandit_service import BanditStore, create_policy
+from services.stats_service import RunningStats, TopKTracker
+from services.persistence_service import BanditPersistence
+from services.cache_service import TTLCache
+from services.pipeline_service import HybridCandidatePipeline
+from services.pool_service import CandidatePoolService
+from services.candidate_service import (
+    SocialCandidateIndex, SemanticCandidateIndex, ExplorationSampler, FactorCandidateIndex
+)
 from repositories.data_repository import DataRepository
 from models.entities import (
     Recommendation, DecisionInfo, LearningInfo, AgentStatistics, UserState
@@ -24,7 +36,27 @@ class IntelligentRecommendationAgent:
                  data_repository: DataRepository,
                  recommendation_strategies: list,
                  confidence_level_new_user: float = 2.0,
-                 confidence_level_experienced_user: float = 1.2):
+                 confidence_level_experienced_user: float = 1.2,
+                 social_candidates_top_n: int = 50,
+                 semantic_use_tfidf: bool = False,
+                 semantic_cache_top_n: int = 0,
+                 exploration_mode: str = 'uniform',
+                 exploration_long_tail_alpha: float = 1.0,
+                 random_seed: Optional[int] = None,
+                 history_window: int = 50,
+                 bandit_history_window: int = 10,
+                 bandit_initial_capacity: int = 1024,
+                 statistics_top_users: int = 10,
+                 bandit_policy: str = 'ucb',
+                 linucb_alpha: float = 1.0,
+                 thompson_noise_std: float = 0.5,
+                 pending_decisions_max_size: int = 100000,
+                 pending_decisions_ttl: Optional[float] = 3600.0,
+                 hybrid_candidates_per_strategy: int = 50,
+                 hybrid_temperature: float = 0.1,
+                 cf_model_path: Optional[Path] = None,
+                 candidate_pool_size: int = 0,
+                 candidate_pool_refresh_interval: float = 60.0):
         """
         Inicializar agente inteligente
         
@@ -35,6 +67,26 @@ class IntelligentRecommendationAgent:
             recommendation_strategies: Lista de estrategias disponibles
             confidence_level_new_user: Nivel de confianza para usuarios nuevos
             confidence_level_experienced_user: Nivel de confianza para usuarios experimentados
+            social_candidates_top_n: Candidatos sociales pre-computados por usuario
+            semantic_use_tfidf: Ponderar el índice tag→artista con TF-IDF
+            semantic_cache_top_n: Candidatos semánticos pre-computados por usuario (0 = bajo demanda)
+            exploration_mode: Modo de muestreo exploratorio ('uniform', 'long_tail', 'popularity')
+            exploration_long_tail_alpha: Exponente del modo long_tail
+            random_seed: Semilla del generador aleatorio del proceso (None = aleatoria)
+            history_window: Interacciones recientes guardadas por usuario
+            bandit_history_window: Recompensas recientes guardadas por usuario en el bandit
+            bandit_initial_capacity: Usuarios reservados inicialmente en el almacén de bandits
+            statistics_top_users: Usuarios con más interacciones incluidos en las estadísticas
+            bandit_policy: Política de selección ('ucb', 'thompson_beta', 'thompson_gaussian', 'linucb')
+            linucb_alpha: Peso del bonus de exploración de LinUCB
+            thompson_noise_std: Desviación estándar de Thompson gaussiano
+            pending_decisions_max_size: Recomendaciones pendientes de feedback guardadas
+            pending_decisions_ttl: Segundos que una recomendación admite feedback
+            hybrid_candidates_per_strategy: Candidatos por estrategia en el modo híbrido
+            hybrid_temperature: Temperatura de los pesos por estrategia del modo híbrido
+            cf_model_path: Directorio de los factores SVD exportados por backend_colaborativo
+            candidate_pool_size: Candidatos pre-calculados por usuario y estrategia (0 = sin pools)
+            candidate_pool_refresh_interval: Segundos entre recálculos de los pools
         """
         # Módulos core
         self.perception = perception_module
@@ -42,55 +94,164 @@ class IntelligentRecommendationAgent:
         self.data_repository = data_repository
         self.strategies = recommendation_strategies
         
-        # Estado del agente
-        self.user_agents: Dict[int, UCBBandit] = {}
-        self.global_statistics = {
-            'total_recommendations': 0,
-            'total_reward': 0,
-            'user_sessions': defaultdict(list),
-            'strategy_performance': defaultdict(list)
-        }
-        
         # Configuración adaptativa
         self.adaptation_config = {
             'min_interactions_for_personalization': 5,
             'confidence_level_new_user': confidence_level_new_user,
             'confidence_level_experienced_user': confidence_level_experienced_user,
-            'reward_history_window': 50
+            'reward_history_window': history_window,
+            'bandit_history_window': bandit_history_window
+        }
+        
+        # Estado del agente (memoria acotada: ventanas por usuario y agregados en streaming)
+        self.bandit_store = BanditStore(
+            self.strategies, initial_capacity=bandit_initial_capacity,
+            recent_window=bandit_history_window
+        )
+        self.bandit_policy = create_policy(
+            bandit_policy, len(self.strategies), len(STATE_FEATURES),
+            linucb_alpha=linucb_alpha, thompson_noise_std=thompson_noise_std,
+            seed=random_seed
+        )
+        self.global_statistics = {
+            'total_recommendations': 0,
+            'total_reward': 0,
+            'user_sessions': defaultdict(lambda: deque(maxlen=history_window)),
+            'strategy_performance': defaultdict(RunningStats),
+            'top_users': TopKTracker(statistics_top_users)
         }
         
-        # Memoria de interacciones
-        self.interaction_memory = defaultdict(list)
+        # Memoria de interacciones (últimas `history_window` por usuario)
+        self.interaction_memory = defaultdict(lambda: deque(maxlen=history_window))
+        
+        # Decisiones pendientes de feedback: recommendation_id -> (user_id, Recomendación)
+        self.pending_decisions = TTLCache(maxsize=pending_decisions_max_size, ttl=pending_decisions_ttl)
+        # Índice para feedback sin ID: (user_id, artist_id) -> recommendation_id más reciente
+        self.pending_by_artist = TTLCache(maxsize=pending_decisions_max_size, ttl=pending_decisions_ttl)
+        
+        # Persistencia opcional del estado aprendido (ver attach_persistence)
+        self.persistence: Optional[BanditPersistence] = None
+        self._update_lock = threading.RLock()
+        
+        # Índices de candidatos pre-computados
+        self.social_candidates = SocialCandidateIndex(
+            self.perception.matrices, social_candidates_top_n
+        )
+        self.semantic_candidates = SemanticCandidateIndex(
+            self.perception.matrices, self.data_repository.user_tagged,
+            use_tfidf=semantic_use_tfidf, cache_top_n=semantic_cache_top_n
+        )
+        self.exploration_mode = exploration_mode
+        self.exploration_sampler = ExplorationSampler(
+            self.data_repository.artists['id'].to_numpy(), self.perception.matrices,
+            long_tail_alpha=exploration_long_tail_alpha, seed=random_seed
+        )
+        
+        # Filtrado colaborativo con los factores del servicio colaborativo (si existen)
+        self.cf_candidates: Optional[FactorCandidateIndex] = None
+        if FactorCandidateIndex.available(cf_model_path):
+            self.cf_candidates = FactorCandidateIndex(cf_model_path)
+        else:
+            logger.warning(f"Sin factores CF en {cf_model_path}: 'Traditional CF' recomienda por popularidad")
+        
+        # Pipeline híbrido: candidatos de todas las estrategias re-ordenados
+        self.pipeline = HybridCandidatePipeline(
+            self.strategies, self._strategy_candidates,
+            candidates_per_strategy=hybrid_candidates_per_strategy,
+            temperature=hybrid_temperature
+        )
+        
+        # Pools pre-calculados para los usuarios activos (el hilo se arranca con start())
+        self.candidate_pools: Optional[CandidatePoolService] = None
+        if candidate_pool_size > 0:
+            self.candidate_pools = CandidatePoolService(
+                self.strategies, self._strategy_candidates,
+                user_ids_source=lambda: self.bandit_store.user_ids[:self.bandit_store.n_rows].copy(),
+                exclusions=self._history_exclusions,
+                pool_size=candidate_pool_size,
+                refresh_interval=candidate_pool_refresh_interval,
+                lock=self._update_lock
+            )
         
         logger.info(f"IntelligentRecommendationAgent inicializado con {len(self.strategies)} estrategias")
     
-    def get_user_agent(self, user_id: int) -> UCBBandit:
+    def on_data_ingested(self, kind: str, batch) -> None:
+        """
+        Refrescar los índices de candidatos tras aplicar un batch de datos
+        
+        Args:
+            kind: Tipo de batch ('interactions', 'friendships' o 'tags')
+            batch: DataFrame del batch aplicado
+        """
+        # Bajo _update_lock para no cruzarse con el recálculo de los pools
+        with self._update_lock:
+            if kind in ('interactions', 'friendships'):
+                rows = self.perception.matrices.affected_rows(kind, batch)
+                self.social_candidates.refresh(rows)
+            if kind == 'interactions':
+                self.exploration_sampler.invalidate_weights()
+                # El historial de escucha cambia las exclusiones de los candidatos semánticos
+                self.semantic_candidates.refresh(self.perception.matrices.affected_rows(kind, batch))
+            elif kind == 'tags':
+                self.semantic_candidates.add_tags(batch)
+        
+        if self.candidate_pools is not None:
+            users = batch['userID'].to_numpy()
+            if kind == 'friendships':
+                users = np.concatenate([users, batch['friendID'].to_numpy()])
+            self.candidate_pools.invalidate(np.unique(users).tolist())
+    
+    def get_user_agent(self, user_id: int) -> int:
         """
-        Obtener o crear agente bandit personalizado para usuario
+        Obtener o crear el bandit personalizado de un usuario
         
         Args:
             user_id: ID del usuario
             
         Returns:
-            Agente UCBBandit del usuario
+            Fila del usuario en el almacén de bandits
         """
-        if user_id not in self.user_agents:
-            # Determinar configuración inicial basada en perfil del usuario
-            user_state = self.perception.get_user_state(user_id)
-            
-            # Usuarios más sofisticados obtienen configuración más conservadora
-            if user_state['overall_sophistication'] > 0.7:
-                confidence_level = self.adaptation_config['confidence_level_experienced_user']
-            else:
-                confidence_level = self.adaptation_config['confidence_level_new_user']
-            
-            # Crear agente bandit personalizado
-            self.user_agents[user_id] = UCBBandit(self.strategies, confidence_level)
-            
-            logger.info(f"Nuevo agente UCB creado para usuario {user_id} "
-                       f"(confidence={confidence_level:.2f})")
+        row = self.bandit_store.get_row(user_id)
+        if row is not None:
+            return row
+        
+        # Determinar configuración inicial basada en perfil del usuario
+        user_state = self.perception.get_user_state(user_id)
+        
+        # Usuarios más sofisticados obtienen configuración más conservadora
+        if user_state['overall_sophistication'] > 0.7:
+            confidence_level = self.adaptation_config['confidence_level_experienced_user']
+        else:
+            confidence_level = self.adaptation_config['confidence_level_new_user']
+        
+        # Crear bandit personalizado (el alta de filas no admite concurrencia)
+        with self._update_lock:
+            row = self.bandit_store.get_row(user_id)
+            if row is None:
+                row = self.bandit_store.add_user(user_id, confidence_level)
+                logger.info(f"Nuevo agente UCB creado para usuario {user_id} "
+                           f"(confidence={confidence_level:.2f})")
         
-        return self.user_agents[user_id]
+        return row
+    
+    def select_strategies(self, user_ids: List[int]) -> List[Tuple[str, str]]:
+        """
+        Seleccionar estrategia para varios usuarios en una sola operación vectorizada
+        
+        Args:
+            user_ids: IDs de usuario
+            
+        Returns:
+            Lista de tuplas (estrategia, tipo de acción)
+        """
+        rows = np.fromiter((self.get_user_agent(uid) for uid in user_ids), dtype=np.int64)
+        contexts = self.perception.get_user_states(user_ids) if self.bandit_policy.uses_context else None
+        arms, explore = self.bandit_policy.select_arms(self.bandit_store, rows, contexts)
+        action_type = self.bandit_policy.action_type
+        return [
+            (self.strategies[arm], 'explore_unplayed' if is_explore else action_type)
+            for arm, is_explore in zip(arms.tolist(), explore.tolist())
+        ]
     
     def recommend(self, user_id: int, context: Optional[Dict] = None) -> Tuple[Recommendation, DecisionInfo]:
         """
@@ -103,22 +264,40 @@ class IntelligentRecommendationAgent:
         Returns:
             Tupla (Recomendación, Información de decisión)
         """
-        logger.info(f"Generando recomendación para usuario {user_id}")
+        recommendations, decision_info = self.recommend_slate(user_id, 1, context)
+        return recommendations[0], decision_info
+    
+    def recommend_slate(self, user_id: int, top_k: int,
+                        context: Optional[Dict] = None) -> Tuple[List[Recommendation], DecisionInfo]:
+        """
+        Ciclo completo para una lista de recomendaciones (slate)
+        
+        La estrategia se elige una vez y produce la lista ordenada en una sola
+        pasada; cada elemento recibe su propio ID, así que el feedback de cada
+        uno se atribuye por separado.
+        
+        Args:
+            user_id: ID del usuario
+            top_k: Número de recomendaciones
+            context: Contexto adicional (opcional)
+            
+        Returns:
+            Tupla (Recomendaciones ordenadas, Información de decisión)
+        """
+        logger.info(f"Generando {top_k} recomendación(es) para usuario {user_id}")
         
         # PASO 1: PERCEPCIÓN - Obtener estado actual del usuario
         user_state = self.perception.get_user_state(user_id)
         
         # PASO 2: RAZONAMIENTO - Seleccionar estrategia óptima
-        user_agent = self.get_user_agent(user_id)
-        strategy_idx, action_type = user_agent.select_arm()
-        selected_strategy = self.strategies[strategy_idx]
+        selected_strategy, action_type = self.select_strategies([user_id])[0]
         
         logger.info(f"Estrategia seleccionada: {selected_strategy} (tipo={action_type})")
         
-        # PASO 3: ACCIÓN - Generar recomendación específica
-        recommendation = self._generate_specific_recommendation(
-            user_id, selected_strategy, user_state
-        )
+        # PASO 3: ACCIÓN - Generar recomendaciones específicas
+        recommendations = self._generate_slate(user_id, selected_strategy, top_k)
+        for recommendation in recommendations:
+            self._register_pending(user_id, recommendation)
         
         # Registrar decisión del agente
         decision_info = DecisionInfo(
@@ -127,159 +306,243 @@ class IntelligentRecommendationAgent:
             strategy=selected_strategy,
             action_type=action_type,
             user_state=user_state.copy(),
-            recommendation=recommendation,
-            agent_confidence=self._calculate_agent_confidence(user_agent)
+            recommendation=recommendations[0],
+            agent_confidence=self._calculate_agent_confidence(user_id)
         )
         
-        return recommendation, decision_info
+        return recommendations, decision_info
+    
+    def _register_pending(self, user_id: int, recommendation: Recommendation) -> str:
+        """Asignar un ID a la recomendación y guardarla a la espera de feedback"""
+        recommendation.recommendation_id = uuid.uuid4().hex
+        self.pending_decisions.put(recommendation.recommendation_id, (user_id, recommendation))
+        self.pending_by_artist.put((user_id, recommendation.artist_id), recommendation.recommendation_id)
+        return recommendation.recommendation_id
+    
+    def resolve_recommendation(self, user_id: int, recommendation_id: str,
+                               artist_id: Optional[int] = None) -> Optional[Recommendation]:
+        """
+        Recuperar (y consumir) una recomendación pendiente por su ID
+        
+        Cada recomendación admite un único feedback: una segunda llamada con el
+        mismo ID no la encuentra, así que no se acredita dos veces al bandit.
+        
+        Args:
+            user_id: ID del usuario que envía el feedback
+            recommendation_id: ID devuelto por recommend
+            artist_id: Artista valorado (None = no comprobar)
+            
+        Returns:
+            Recomendación, o None si no existe, expiró o no corresponde al usuario/artista
+        """
+        # Una petición errónea no consume la decisión
+        entry = self.pending_decisions.pop_if(
+            recommendation_id,
+            lambda entry: entry[0] == user_id and (artist_id is None or entry[1].artist_id == artist_id)
+        )
+        if entry is None:
+            return None
+        recommendation = entry[1]
+        self.pending_by_artist.pop_if(
+            (user_id, recommendation.artist_id), lambda pending_id: pending_id == recommendation_id
+        )
+        return recommendation
     
-    def _generate_specific_recommendation(self, user_id: int, strategy: str,
-                                         user_state: Dict) -> Recommendation:
+    def _history_exclusions(self, user_id: int) -> np.ndarray:
+        """artistID escuchados o ya valorados recientemente por el usuario (ordenados)"""
+        listened = self.data_repository.get_user_artist_ids(user_id)
+        recent = [interaction['recommendation'].artist_id
+                  for interaction in self.interaction_memory.get(user_id, ())]
+        if not recent:
+            return listened
+        return np.union1d(listened, recent)
+    
+    def _strategy_candidates(self, user_id: int, strategy: str, k: int,
+                             exclude: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
         """
-        Generar recomendación específica basada en estrategia
+        Candidatos ordenados de una estrategia, sin los artistas de `exclude`
+        
+        Las estrategias sin score propio (exploración, popularidad) puntúan
+        por posición: 1 / (1 + posición).
         
         Args:
             user_id: ID del usuario
             strategy: Estrategia de recomendación
-            user_state: Estado del usuario
+            k: Número de candidatos
+            exclude: artistID a excluir, ordenados
             
         Returns:
-            Recomendación generada
+            Tupla (hasta k artistID, scores descendentes)
         """
+        if strategy == 'Exploration':
+            ids = self.exploration_sampler.sample(exclude, k=k, mode=self.exploration_mode)
+            return ids, 1.0 / (1.0 + np.arange(len(ids)))
+        
         if strategy == 'Social Influence':
-            return self._social_influence_recommendation(user_id)
+            # Los índices ya excluyen lo escuchado: basta con cubrir las valoraciones recientes
+            ids, scores = self.social_candidates.get_candidates(
+                user_id, k=k + len(self.interaction_memory.get(user_id, ()))
+            )
         elif strategy == 'Semantic Coherence':
-            return self._semantic_coherence_recommendation(user_id)
+            fetch = k + len(self.interaction_memory.get(user_id, ()))
+            if self.semantic_candidates.cache_top_n >= k:
+                # Sin salir de la caché pre-computada (fuera de ella hay un producto disperso)
+                fetch = min(fetch, self.semantic_candidates.cache_top_n)
+            ids, scores = self.semantic_candidates.get_candidates(user_id, k=fetch)
+        else:  # Traditional CF
+            if self.cf_candidates is not None:
+                ids, scores = self.cf_candidates.get_candidates(user_id, k, exclude)
+                if len(ids) > 0:
+                    return ids, scores
+            # Sin factores para el usuario: artistas populares no escuchados.
+            # Entre los len(exclude) + k más populares hay al menos k no excluidos
+            ids = self.data_repository.get_popularity_ranking()[:len(exclude) + k]
+            scores = 1.0 / (1.0 + np.arange(len(ids)))
+        
+        ids = np.asarray(ids, dtype=np.int64)
+        keep = ~np.isin(ids, exclude)
+        return ids[keep][:k], np.asarray(scores, dtype=np.float64)[keep][:k]
+    
+    def _strategy_reason(self, user_id: int, strategy: str) -> Tuple[str, float]:
+        """Motivo y confianza de los candidatos de una estrategia"""
+        if strategy == 'Social Influence':
+            return f"Popular entre tus {self.perception.matrices.friend_count(user_id)} amigos", 0.8
+        elif strategy == 'Semantic Coherence':
+            return "Coherente con tus tags musicales", 0.7
         elif strategy == 'Exploration':
-            return self._exploration_recommendation(user_id)
+            return "Descubre algo nuevo", 0.6
         else:  # Traditional CF
-            return self._traditional_cf_recommendation(user_id)
-    
-    def _social_influence_recommendation(self, user_id: int) -> Recommendation:
-        """Generar recomendación basada en influencia social"""
-        friends = self.data_repository.get_user_friends_list(user_id)
-        
-        if friends:
-            friends_music = self.data_repository.user_artists[
-                self.data_repository.user_artists['userID'].isin(friends)
-            ]
-            if len(friends_music) > 0:
-                popular_among_friends = friends_music.groupby('artistID')['weight'].sum().idxmax()
-                artist_name = self.data_repository.get_artist_name(popular_among_friends)
-                
-                return Recommendation(
-                    artist_id=int(popular_among_friends),
-                    artist_name=artist_name,
-                    strategy='Social Influence',
-                    reason=f"Popular entre tus {len(friends)} amigos",
-                    confidence=0.8,
-                    timestamp=datetime.now()
-                )
+            if self.cf_candidates is not None and self.cf_candidates.user_row(user_id) is not None:
+                return "Escuchado por usuarios con gustos similares", 0.7
+            return "Popular globalmente", 0.7
+    
+    def _generate_slate(self, user_id: int, strategy: str, k: int) -> List[Recommendation]:
+        """
+        Generar recomendaciones basadas en estrategia
         
-        # Fallback
-        return self._random_recommendation('Social Influence')
-    
-    def _semantic_coherence_recommendation(self, user_id: int) -> Recommendation:
-        """Generar recomendación basada en coherencia semántica"""
-        user_tags = self.data_repository.get_user_tags(user_id)
-        
-        if len(user_tags) > 0:
-            user_tag_ids = user_tags['tagID'].unique()
-            similar_tagged = self.data_repository.user_tagged[
-                self.data_repository.user_tagged['tagID'].isin(user_tag_ids)
-            ]
-            if len(similar_tagged) > 0:
-                candidate_artist = similar_tagged['artistID'].value_counts().index[0]
-                artist_name = self.data_repository.get_artist_name(candidate_artist)
-                
-                return Recommendation(
-                    artist_id=int(candidate_artist),
-                    artist_name=artist_name,
-                    strategy='Semantic Coherence',
-                    reason="Coherente con tus tags musicales",
-                    confidence=0.7,
-                    timestamp=datetime.now()
-                )
+        Args:
+            user_id: ID del usuario
+            strategy: Estrategia de recomendación
+            k: Número de recomendaciones
+            
+        Returns:
+            Lista ordenada de recomendaciones
+        """
+        exclude = self._history_exclusions(user_id)
+        candidates = None
+        if self.candidate_pools is not None:
+            candidates = self.candidate_pools.take(user_id, self.strategies.index(strategy), k, exclude)
+        if candidates is None:
+            candidates, _ = self._strategy_candidates(user_id, strategy, k, exclude)
+        n_ranked = len(candidates)
+        candidates = self._fill_candidates(candidates, k, exclude)
+        return self._build_recommendations(user_id, candidates, [strategy] * len(candidates), n_ranked)
+    
+    def _fill_candidates(self, candidates: np.ndarray, k: int, exclude: np.ndarray) -> np.ndarray:
+        """
+        Completar hasta k candidatos sin repetir artistas ni incluir el historial
         
-        # Fallback
-        return self._random_recommendation('Semantic Coherence')
+        El relleno se muestrea ponderado por número de oyentes, como muestrear
+        una fila de user_artists.
+        """
+        if len(candidates) >= k:
+            return candidates
+        filler = self.exploration_sampler.sample(
+            np.union1d(exclude, candidates), k=k - len(candidates), mode='popularity'
+        )
+        return np.concatenate([candidates, filler])
     
-    def _exploration_recommendation(self, user_id: int) -> Recommendation:
-        """Generar recomendación exploratoria"""
-        # Obtener artistas no escuchados por el usuario
-        user_history = self.data_repository.get_user_listening_history(user_id)
-        listened_artists = set(user_history['artistID'].values)
+    def _build_recommendations(self, user_id: int, candidates: np.ndarray,
+                               strategies: List[str], n_ranked: int) -> List[Recommendation]:
+        """
+        Crear las recomendaciones de una lista de candidatos
         
-        all_artists = self.data_repository.artists['id'].values
-        unlistened = [a for a in all_artists if a not in listened_artists]
+        Args:
+            user_id: ID del usuario
+            candidates: artistID ordenados
+            strategies: Estrategia a la que se atribuye cada candidato
+            n_ranked: Candidatos generados por las estrategias (el resto es relleno)
+            
+        Returns:
+            Lista ordenada de recomendaciones
+        """
+        reasons = {strategy: self._strategy_reason(user_id, strategy) for strategy in set(strategies)}
+        timestamp = datetime.now()
+        recommendations = []
+        for position, (artist_id, strategy) in enumerate(zip(candidates.tolist(), strategies)):
+            reason, confidence = reasons[strategy]
+            if position >= n_ranked:
+                reason, confidence = f"Recomendación basada en {strategy}", 0.5
+            recommendations.append(Recommendation(
+                artist_id=artist_id,
+                artist_name=self.data_repository.get_artist_name(artist_id),
+                strategy=strategy,
+                reason=reason,
+                confidence=confidence,
+                timestamp=timestamp
+            ))
+        return recommendations
+    
+    def recommend_hybrid(self, user_id: int, top_k: int,
+                         context: Optional[Dict] = None) -> Tuple[List[Recommendation], DecisionInfo]:
+        """
+        Recomendaciones mezclando los candidatos de todas las estrategias
         
-        if unlistened:
-            artist_id = int(np.random.choice(unlistened))
-        else:
-            artist_id = int(np.random.choice(all_artists))
+        En lugar de elegir una sola estrategia, el bandit del usuario aporta
+        el peso de cada una y el pipeline re-ordena todos los candidatos. Cada
+        recomendación se atribuye a la estrategia que más contribuyó a su score.
         
-        artist_name = self.data_repository.get_artist_name(artist_id)
+        Args:
+            user_id: ID del usuario
+            top_k: Número de recomendaciones
+            context: Contexto adicional (opcional)
+            
+        Returns:
+            Tupla (Recomendaciones ordenadas, Información de decisión)
+        """
+        logger.info(f"Generando {top_k} recomendación(es) híbridas para usuario {user_id}")
         
-        return Recommendation(
-            artist_id=artist_id,
-            artist_name=artist_name,
-            strategy='Exploration',
-            reason="Descubre algo nuevo",
-            confidence=0.6,
-            timestamp=datetime.now()
+        user_state = self.perception.get_user_state(user_id)
+        row = self.get_user_agent(user_id)
+        weights = self.pipeline.strategy_weights(
+            self.bandit_store.arm_means[row], self.bandit_store.arm_counts[row]
         )
-    
-    def _traditional_cf_recommendation(self, user_id: int) -> Recommendation:
-        """Generar recomendación con filtrado colaborativo tradicional"""
-        # Simplificación: recomendar artista popular no escuchado
-        user_history = self.data_repository.get_user_listening_history(user_id)
-        listened_artists = set(user_history['artistID'].values)
-        
-        popular_artists = self.data_repository.user_artists.groupby('artistID')['weight'].sum().sort_values(ascending=False)
-        
-        for artist_id in popular_artists.index:
-            if artist_id not in listened_artists:
-                artist_name = self.data_repository.get_artist_name(artist_id)
-                return Recommendation(
-                    artist_id=int(artist_id),
-                    artist_name=artist_name,
-                    strategy='Traditional CF',
-                    reason="Popular globalmente",
-                    confidence=0.7,
-                    timestamp=datetime.now()
-                )
         
-        # Fallback
-        return self._random_recommendation('Traditional CF')
-    
-    def _random_recommendation(self, strategy: str) -> Recommendation:
-        """Generar recomendación aleatoria como fallback"""
-        random_artist_id = self.data_repository.user_artists['artistID'].sample(1).iloc[0]
-        artist_name = self.data_repository.get_artist_name(random_artist_id)
-        
-        return Recommendation(
-            artist_id=int(random_artist_id),
-            artist_name=artist_name,
-            strategy=strategy,
-            reason=f"Recomendación basada en {strategy}",
-            confidence=0.5,
-            timestamp=datetime.now()
+        exclude = self._history_exclusions(user_id)
+        candidates, _, arms, timings = self.pipeline.rank(user_id, weights, top_k, exclude)
+        n_ranked = len(candidates)
+        candidates = self._fill_candidates(candidates, top_k, exclude)
+        
+        # El relleno se atribuye a la estrategia de mayor peso
+        arms = np.concatenate([arms, np.full(len(candidates) - n_ranked, np.argmax(weights))])
+        recommendations = self._build_recommendations(
+            user_id, candidates, [self.strategies[arm] for arm in arms.tolist()], n_ranked
         )
+        for recommendation in recommendations:
+            self._register_pending(user_id, recommendation)
+        
+        decision_info = DecisionInfo(
+            timestamp=datetime.now(),
+            user_id=user_id,
+            strategy='Hybrid',
+            action_type='hybrid',
+            user_state=user_state.copy(),
+            recommendation=recommendations[0],
+            agent_confidence=self._calculate_agent_confidence(user_id),
+            pipeline={
+                'strategy_weights': dict(zip(self.strategies, weights.tolist())),
+                'stage_ms': timings
+            }
+        )
+        
+        return recommendations, decision_info
     
-    def _calculate_agent_confidence(self, user_agent: UCBBandit) -> float:
+    def _calculate_agent_confidence(self, user_id: int) -> float:
         """Calcular confianza del agente en sus decisiones"""
-        if user_agent.total_steps == 0:
+        row = self.bandit_store.get_row(user_id)
+        if row is None:
             return 0.0
-        
-        interaction_confidence = min(1.0, user_agent.total_steps / 50)
-        
-        if user_agent.total_steps > 5:
-            recent_rewards = [h['reward'] for h in user_agent.history[-10:]]
-            reward_stability = 1 / (1 + np.std(recent_rewards))
-        else:
-            reward_stability = 0.5
-        
-        return (interaction_confidence + reward_stability) / 2
+        return float(self.bandit_store.confidence_of(np.array([row]))[0])
     
     def learn_from_feedback(self, user_id: int, recommendation: Recommendation,
                            feedback_type: str, feedback_value: Optional[float] = None) -> LearningInfo:
@@ -301,15 +564,13 @@ class IntelligentRecommendationAgent:
         outcome = self._convert_feedback_to_outcome(feedback_type, feedback_value)
         
         # Calcular recompensa usando sistema multimodal
-        user_state = self.perception.get_user_state(user_id)
         reward, reward_components = self.reward_system.calculate_reward(
-            user_id, recommendation.strategy, outcome, user_state
+            user_id, recommendation.strategy, outcome
         )
         
-        # Actualizar agente bandit del usuario
-        user_agent = self.get_user_agent(user_id)
+        # Actualizar agente bandit del usuario y agregados globales
         strategy_idx = self.strategies.index(recommendation.strategy)
-        user_agent.update(strategy_idx, reward)
+        self.apply_updates(np.array([user_id]), np.array([strategy_idx]), np.array([reward]))
         
         # Registrar aprendizaje
         learning_info = LearningInfo(
@@ -323,22 +584,347 @@ class IntelligentRecommendationAgent:
             strategy=recommendation.strategy
         )
         
-        # Actualizar estadísticas globales
-        self.global_statistics['total_recommendations'] += 1
-        self.global_statistics['total_reward'] += reward
+        # Registrar sesión del usuario
         self.global_statistics['user_sessions'][user_id].append(learning_info)
-        self.global_statistics['strategy_performance'][recommendation.strategy].append(reward)
         
-        # Guardar en memoria de interacciones
-        self.interaction_memory[user_id].append({
-            'recommendation': recommendation,
-            'learning': learning_info
-        })
+        # Guardar en memoria de interacciones (el recálculo de pools la lee bajo el lock)
+        with self._update_lock:
+            self.interaction_memory[user_id].append({
+                'recommendation': recommendation,
+                'learning': learning_info
+            })
         
         logger.info(f"Aprendizaje completado: reward={reward:.3f}, outcome={outcome}")
         
         return learning_info
     
+    def learn_from_feedback_batch(self, events: List[Dict]) -> Dict:
+        """
+        Aprender de un lote de eventos de feedback con una sola actualización en bloque
+        
+        Cada evento se resuelve a su recomendación pendiente (por
+        recommendation_id o, si no lo trae, por usuario + artista). Los que no se resuelven se
+        descartan en lugar de atribuirse a una estrategia por defecto. Las
+        recompensas se calculan en una pasada vectorizada y se aplican con
+        apply_updates.
+        
+        Args:
+            events: Dicts con user_id, artist_id, feedback_type y, opcionalmente,
+                    recommendation_id y feedback_value
+            
+        Returns:
+            Informe con el estado de cada evento ('applied' o 'not_found') y recompensas
+        """
+        statuses = []
+        resolved = []
+        for event in events:
+            user_id = event['user_id']
+            if event.get('recommendation_id') is not None:
+                recommendation = self.resolve_recommendation(
+                    user_id, event['recommendation_id'], event['artist_id']
+                )
+            else:
+                recommendation = self.find_recommendation(user_id, event['artist_id'])
+            
+            if recommendation is None:
+                statuses.append('not_found')
+                continue
+            statuses.append('applied')
+            resolved.append((event, recommendation))
+        
+        if not resolved:
+            return {'statuses': statuses, 'applied': 0, 'total_reward': 0.0}
+        
+        user_ids = np.array([event['user_id'] for event, _ in resolved], dtype=np.int64)
+        strategies = [recommendation.strategy for _, recommendation in resolved]
+        outcomes = [
+            self._convert_feedback_to_outcome(event['feedback_type'], event.get('feedback_value'))
+            for event, _ in resolved
+        ]
+        
+        rewards, components = self.reward_system.calculate_rewards(user_ids, strategies, outcomes)
+        arms = np.array([self.strategies.index(strategy) for strategy in strategies], dtype=np.int64)
+        self.apply_updates(user_ids, arms, rewards)
+        
+        # Registrar sesiones y memoria como en learn_from_feedback
+        timestamp = datetime.now()
+        component_rows = components.tolist()
+        with self._update_lock:
+            for i, (event, recommendation) in enumerate(resolved):
+                learning_info = LearningInfo(
+                    timestamp=timestamp,
+                    user_id=event['user_id'],
+                    feedback_type=event['feedback_type'],
+                    feedback_value=event.get('feedback_value'),
+                    outcome=outcomes[i],
+                    reward=float(rewards[i]),
+                    reward_components=dict(zip(REWARD_COMPONENTS, component_rows[i])),
+                    strategy=recommendation.strategy
+                )
+                self.global_statistics['user_sessions'][event['user_id']].append(learning_info)
+                self.interaction_memory[event['user_id']].append({
+                    'recommendation': recommendation,
+                    'learning': learning_info
+                })
+        
+        logger.info(f"Feedback en lote: {len(resolved)}/{len(events)} eventos aplicados")
+        
+        return {'statuses': statuses, 'applied': len(resolved), 'total_reward': float(rewards.sum())}
+    
+    def apply_updates(self, user_ids: np.ndarray, arms: np.ndarray, rewards: np.ndarray,
+                      log: bool = True) -> np.ndarray:
+        """
+        Aplicar un lote de recompensas al bandit, la política y los agregados globales
+        
+        Es el único punto de escritura del estado aprendido: lo que se aplica
+        aquí es lo que se registra en el log de persistencia.
+        
+        Args:
+            user_ids: IDs de usuario
+            arms: Índices de estrategia jugados
+            rewards: Recompensas recibidas
+            log: Registrar en el log (False al reproducirlo durante la recuperación)
+            
+        Returns:
+            Filas de los usuarios en el almacén de bandits
+        """
+        user_ids = np.asarray(user_ids, dtype=np.int64)
+        arms = np.asarray(arms, dtype=np.int64)
+        rewards = np.asarray(rewards, dtype=np.float64)
+        
+        with self._update_lock:
+            rows = np.fromiter(
+                (self.get_user_agent(uid) for uid in user_ids.tolist()),
+                dtype=np.int64, count=len(user_ids)
+            )
+            self.bandit_store.update_many(rows, arms, rewards)
+            if self.bandit_policy.uses_context:
+                self.bandit_policy.update_many(
+                    rows, arms, rewards, self.perception.get_user_states(user_ids)
+                )
+            
+            stats = self.global_statistics
+            stats['total_recommendations'] += len(rewards)
+            stats['total_reward'] += float(rewards.sum())
+            for arm in np.unique(arms).tolist():
+                stats['strategy_performance'][self.strategies[arm]].update_many(rewards[arms == arm])
+            unique_users, first = np.unique(user_ids, return_index=True)
+            for uid, row in zip(unique_users.tolist(), rows[first].tolist()):
+                stats['top_users'].update(uid, int(self.bandit_store.total_steps[row]))
+            
+            if log and self.persistence is not None:
+                self.persistence.append(user_ids, arms, rewards)
+                if self.persistence.snapshot_due:
+                    self.save_snapshot()
+        
+        return rows
+    
+    def attach_persistence(self, persistence: BanditPersistence) -> Dict:
+        """
+        Recuperar el estado persistido y registrar las actualizaciones siguientes
+        
+        Carga el último snapshot, reproduce en bloque el tramo de log posterior
+        y arranca el flush periódico del log.
+        
+        Args:
+            persistence: Persistencia a utilizar
+            
+        Returns:
+            Informe de la recuperación (tiempos y registros reproducidos)
+        """
+        start = time.perf_counter()
+        snapshot, records = persistence.recover()
+        read_done = time.perf_counter()
+        
+        with self._update_lock:
+            if snapshot is not None:
+                self._load_snapshot(snapshot)
+            snapshot_done = time.perf_counter()
+            
+            if len(records):
+                self.apply_updates(records['user_id'], records['arm'], records['reward'], log=False)
+            self.persistence = persistence
+        persistence.start()
+        end = time.perf_counter()
+        
+        report = {
+            'snapshot_loaded': snapshot is not None,
+            'users_restored': self.bandit_store.n_rows,
+            'log_records_replayed': int(len(records)),
+            'read_ms': (read_done - start) * 1000,
+            'snapshot_apply_ms': (snapshot_done - read_done) * 1000,
+            'log_replay_ms': (end - snapshot_done) * 1000,
+            'total_ms': (end - start) * 1000
+        }
+        persistence.record_recovery(report)
+        
+        logger.info(f"Estado del agente recuperado en {report['total_ms']:.1f} ms: "
+                    f"{report['users_restored']} usuarios, "
+                    f"{report['log_records_replayed']} registros de log reproducidos")
+        
+        return report
+    
+    def _snapshot_arrays(self) -> Dict[str, np.ndarray]:
+        """Volcar el estado aprendido a arrays planos"""
+        arrays = {f"store_{name}": array for name, array in self.bandit_store.export_rows().items()}
+        arrays.update({f"policy_{name}": array for name, array in self.bandit_policy.get_state().items()})
+        
+        performance = self.global_statistics['strategy_performance']
+        arrays['stats_strategy_performance'] = np.vstack([
+            performance[s].get_state() if s in performance else RunningStats().get_state()
+            for s in self.strategies
+        ])
+        arrays['stats_totals'] = np.array([
+            self.global_statistics['total_recommendations'],
+            self.global_statistics['total_reward']
+        ], dtype=np.float64)
+        arrays['meta_strategies'] = np.array(self.strategies)
+        arrays['meta_policy'] = np.array(self.bandit_policy.name)
+        return arrays
+    
+    def _load_snapshot(self, snapshot: Dict[str, np.ndarray]) -> None:
+        """Restaurar el estado aprendido desde los arrays de un snapshot"""
+        if snapshot['meta_strategies'].tolist() != list(self.strategies):
+            raise ValueError(f"El snapshot usa otras estrategias: {snapshot['meta_strategies'].tolist()}")
+        
+        self.bandit_store.import_rows({
+            key[len('store_'):]: value for key, value in snapshot.items() if key.startswith('store_')
+        })
+        
+        if str(snapshot['meta_policy']) == self.bandit_policy.name:
+            self.bandit_policy.set_state({
+                key[len('policy_'):]: value for key, value in snapshot.items() if key.startswith('policy_')
+            })
+        else:
+            logger.warning(f"Snapshot de la política {snapshot['meta_policy']}; "
+                           f"la política {self.bandit_policy.name} empieza sin estado propio")
+        
+        stats = self.global_statistics
+        for strategy, state in zip(self.strategies, snapshot['stats_strategy_performance']):
+            if state[0] > 0:
+                stats['strategy_performance'][strategy].set_state(state)
+        stats['total_recommendations'] = int(snapshot['stats_totals'][0])
+        stats['total_reward'] = float(snapshot['stats_totals'][1])
+        self._rebuild_top_users()
+    
+    def _rebuild_top_users(self) -> None:
+        """Recalcular el top de usuarios desde los pasos del almacén de bandits"""
+        store = self.bandit_store
+        self.global_statistics['top_users'].reset(
+            store.user_ids[:store.n_rows], store.total_steps[:store.n_rows]
+        )
+    
+    def get_persistence_statistics(self) -> Optional[Dict]:
+        """Obtener estadísticas de persistencia (None si no está activa)"""
+        if self.persistence is None:
+            return None
+        return self.persistence.get_statistics()
+    
+    def save_snapshot(self) -> None:
+        """Escribir un snapshot del estado aprendido (requiere persistencia)"""
+        if self.persistence is None:
+            return
+        with self._update_lock:
+            self.persistence.write_snapshot(self._snapshot_arrays())
+    
+    def close_persistence(self) -> None:
+        """Escribir un snapshot final y cerrar el log"""
+        if self.persistence is None:
+            return
+        self.save_snapshot()
+        self.persistence.close()
+    
+    def shutdown(self) -> None:
+        """Liberar los recursos del agente al cerrar la aplicación"""
+        if self.candidate_pools is not None:
+            self.candidate_pools.stop()
+        self.close_persistence()
+    
+    def export_users(self, user_ids: List[int]) -> Dict:
+        """
+        Extraer el estado de varios usuarios y eliminarlo de este agente
+        
+        Se usa al migrar usuarios entre procesos: el estado por usuario (fila
+        del bandit, memorias recientes y recomendaciones pendientes de
+        feedback) viaja completo; los agregados globales se quedan, ya que
+        resumen el historial de este proceso.
+        
+        Args:
+            user_ids: IDs de usuario
+            
+        Returns:
+            Payload serializable para import_users
+        """
+        with self._update_lock:
+            present = [uid for uid in user_ids if self.bandit_store.get_row(uid) is not None]
+            moving = set(user_ids)
+            rows = np.array([self.bandit_store.get_row(uid) for uid in present], dtype=np.int64)
+            payload = {
+                'store': self.bandit_store.export_rows(rows),
+                'interaction_memory': {
+                    uid: list(self.interaction_memory.pop(uid, [])) for uid in present
+                },
+                'user_sessions': {
+                    uid: list(self.global_statistics['user_sessions'].pop(uid, [])) for uid in present
+                },
+                'pending_decisions': self.pending_decisions.extract(
+                    lambda _, entry: entry[0] in moving
+                ),
+                'pending_by_artist': self.pending_by_artist.extract(
+                    lambda key, _: key[0] in moving
+                )
+            }
+            
+            self.bandit_store.remove_users(present)
+            self._rebuild_top_users()
+        
+        return payload
+    
+    def import_users(self, payload: Dict) -> int:
+        """
+        Incorporar usuarios exportados por otro agente
+        
+        Args:
+            payload: Resultado de export_users
+            
+        Returns:
+            Número de usuarios importados
+        """
+        with self._update_lock:
+            rows = self.bandit_store.import_rows(payload['store'])
+            for uid, entries in payload['interaction_memory'].items():
+                self.interaction_memory[uid].extend(entries)
+            for uid, entries in payload['user_sessions'].items():
+                self.global_statistics['user_sessions'][uid].extend(entries)
+            for recommendation_id, entry in payload.get('pending_decisions', {}).items():
+                self.pending_decisions.put(recommendation_id, entry)
+            for key, recommendation_id in payload.get('pending_by_artist', {}).items():
+                self.pending_by_artist.put(key, recommendation_id)
+            self._rebuild_top_users()
+        
+        return len(rows)
+    
+    def find_recommendation(self, user_id: int, artist_id: int) -> Optional[Recommendation]:
+        """
+        Recuperar (y consumir) la recomendación pendiente más reciente de un artista
+        
+        Para clientes que envían feedback sin recommendation_id. Solo se
+        resuelven decisiones pendientes: una recomendación que ya recibió
+        feedback, expiró o nunca se hizo no se encuentra, así que no se
+        acredita a ninguna estrategia.
+        
+        Args:
+            user_id: ID del usuario
+            artist_id: ID del artista
+            
+        Returns:
+            Recomendación o None si no hay ninguna pendiente para ese usuario/artista
+        """
+        recommendation_id = self.pending_by_artist.pop((user_id, artist_id))
+        if recommendation_id is None:
+            return None
+        return self.resolve_recommendation(user_id, recommendation_id, artist_id)
+    
     def _convert_feedback_to_outcome(self, feedback_type: str,
                                     feedback_value: Optional[float]) -> str:
         """Convertir feedback a outcome categórico"""
@@ -361,58 +947,57 @@ class IntelligentRecommendationAgent:
             return feedback_type if feedback_type in ['positive', 'neutral', 'negative'] else 'neutral'
     
     def get_agent_statistics(self) -> AgentStatistics:
-        """Obtener estadísticas comprehensivas del agente"""
+        """
+        Obtener estadísticas comprehensivas del agente
+        
+        Todos los agregados se mantienen en cada `learn_from_feedback`, por lo que
+        el coste no depende del número de usuarios: `user_profiles` solo incluye
+        el top de usuarios por interacciones (ordenado).
+        """
         strategy_performance = {}
         
-        for strategy, rewards in self.global_statistics['strategy_performance'].items():
-            if rewards:
-                strategy_performance[strategy] = {
-                    'count': len(rewards),
-                    'avg_reward': float(np.mean(rewards)),
-                    'std_reward': float(np.std(rewards)),
-                    'success_rate': sum(1 for r in rewards if r > 0.6) / len(rewards)
-                }
+        for strategy, running_stats in self.global_statistics['strategy_performance'].items():
+            if running_stats.count > 0:
+                strategy_performance[strategy] = running_stats.to_dict()
         
         user_profiles = {}
-        for user_id, user_agent in self.user_agents.items():
-            if user_agent.total_steps > 0:
-                user_state = self.perception.get_user_state(user_id)
-                user_profiles[user_id] = {
-                    'total_interactions': user_agent.total_steps,
-                    'preferred_strategy': self.strategies[np.argmax(user_agent.arm_means)],
-                    'agent_confidence': self._calculate_agent_confidence(user_agent),
-                    'user_sophistication': user_state['overall_sophistication']
-                }
+        for user_id, total_interactions in self.global_statistics['top_users'].top():
+            row = self.bandit_store.get_row(user_id)
+            user_state = self.perception.get_user_state(user_id)
+            user_profiles[user_id] = {
+                'total_interactions': total_interactions,
+                'preferred_strategy': self.strategies[np.argmax(self.bandit_store.arm_means[row])],
+                'agent_confidence': self._calculate_agent_confidence(user_id),
+                'user_sophistication': user_state['overall_sophistication']
+            }
         
         return AgentStatistics(
-            total_users=len(self.user_agents),
+            total_users=self.bandit_store.n_rows,
             total_recommendations=self.global_statistics['total_recommendations'],
             average_reward=(
                 self.global_statistics['total_reward'] / 
                 max(1, self.global_statistics['total_recommendations'])
             ),
-            active_sessions=len([
-                uid for uid, sessions in self.global_statistics['user_sessions'].items()
-                if sessions
-            ]),
+            active_sessions=len(self.global_statistics['user_sessions']),
             strategy_performance=strategy_performance,
             user_profiles=user_profiles
         )
     
     def get_user_profile(self, user_id: int) -> Dict:
         """Obtener perfil detallado de un usuario"""
-        if user_id not in self.user_agents:
+        row = self.bandit_store.get_row(user_id)
+        if row is None:
             return None
         
-        user_agent = self.user_agents[user_id]
+        total_steps = int(self.bandit_store.total_steps[row])
         user_state = self.perception.get_user_state(user_id)
         
         return {
             'user_id': user_id,
-            'total_interactions': user_agent.total_steps,
-            'preferred_strategy': self.strategies[np.argmax(user_agent.arm_means)] if user_agent.total_steps > 0 else 'None',
-            'agent_confidence': self._calculate_agent_confidence(user_agent),
+            'total_interactions': total_steps,
+            'preferred_strategy': self.strategies[np.argmax(self.bandit_store.arm_means[row])] if total_steps > 0 else 'None',
+            'agent_confidence': self._calculate_agent_confidence(user_id),
             'user_sophistication': user_state['overall_sophistication'],
-            'interaction_history': self.interaction_memory.get(user_id, [])[-10:]
+            'interaction_history': list(self.interaction_memory.get(user_id, []))[-10:]
         }
 
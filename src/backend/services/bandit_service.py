@@ -1,107 +1,614 @@
-"""Servicio de Multi-Armed Bandit - Algoritmo UCB"""
+"""Servicio de Multi-Armed Bandit - Algoritmos UCB, Thompson sampling y LinUCB"""
+from abc import ABC, abstractmethod
 import numpy as np
-from typing import List, Tuple, Dict
+from typing import List, Tuple, Dict, Optional
+import threading
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Arrays por fila del BanditStore (exportables/importables en bloque)
+STORE_FIELDS = ('user_ids', 'arm_counts', 'arm_rewards', 'arm_means',
+                'total_steps', 'confidence_levels', 'recent_rewards')
 
-class UCBBandit:
-    """Implementación del algoritmo Upper Confidence Bound (UCB) para Multi-Armed Bandit"""
+# Agregados derivados de recent_rewards (no se exportan: se recalculan al importar)
+DERIVED_FIELDS = ('recent_sums', 'recent_sums_sq')
+
+
+class BanditStore:
+    """Almacén UCB de toda la población en estructura de arrays (usuarios × brazos)"""
     
-    def __init__(self, arms: List[str], confidence_level: float = 1.5):
+    def __init__(self, arms: List[str], initial_capacity: int = 1024,
+                 recent_window: int = 10):
         """
-        Inicializar UCB Bandit
+        Inicializar almacén
         
         Args:
             arms: Lista de brazos (estrategias) disponibles
-            confidence_level: Nivel de confianza para el bound
+            initial_capacity: Filas reservadas inicialmente (crece duplicando)
+            recent_window: Recompensas recientes guardadas por usuario
         """
         self.arms = arms
         self.n_arms = len(arms)
-        self.confidence_level = confidence_level
+        self.recent_window = recent_window
+        
+        self.user_index: Dict[int, int] = {}
+        self.n_rows = 0
+        self.capacity = 0
+        
+        self.user_ids = np.empty(0, dtype=np.int64)
+        self.arm_counts = np.empty((0, self.n_arms), dtype=np.int32)
+        self.arm_rewards = np.empty((0, self.n_arms), dtype=np.float32)
+        self.arm_means = np.empty((0, self.n_arms), dtype=np.float32)
+        self.total_steps = np.empty(0, dtype=np.int32)
+        self.confidence_levels = np.empty(0, dtype=np.float32)
+        self.recent_rewards = np.empty((0, recent_window), dtype=np.float32)
+        
+        # Suma y suma de cuadrados de la ventana reciente de cada fila (los huecos
+        # sin usar del buffer circular valen 0, así que suman todo el buffer)
+        self.recent_sums = np.empty(0, dtype=np.float64)
+        self.recent_sums_sq = np.empty(0, dtype=np.float64)
+        
+        # Buffers de trabajo por hilo para seleccionar brazos sin temporales
+        self._local = threading.local()
+        
+        self._grow(initial_capacity)
+        
+        logger.info(f"BanditStore inicializado con {self.n_arms} brazos "
+                    f"(capacidad={self.capacity}, {self.bytes_per_user} bytes/usuario)")
+    
+    def _grow(self, capacity: int) -> None:
+        """Ampliar la capacidad de todos los arrays conservando los datos"""
+        def grown(array: np.ndarray) -> np.ndarray:
+            new_array = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+            new_array[:self.n_rows] = array[:self.n_rows]
+            return new_array
+        
+        for name in STORE_FIELDS + DERIVED_FIELDS:
+            setattr(self, name, grown(getattr(self, name)))
+        self.capacity = capacity
+    
+    def _workspace(self, n: int) -> Dict[str, np.ndarray]:
+        """
+        Obtener los buffers de trabajo del hilo actual con al menos n filas
+        
+        Crecen duplicando y se reutilizan entre llamadas; cada hilo tiene los
+        suyos porque la selección se ejecuta concurrentemente.
+        """
+        workspace = getattr(self._local, 'workspace', None)
+        if workspace is None or workspace['rows'] < n:
+            rows = max(n, 2 * workspace['rows'] if workspace is not None else 64)
+            workspace = {
+                'rows': rows,
+                'counts': np.empty((rows, self.n_arms), dtype=self.arm_counts.dtype),
+                'means': np.empty((rows, self.n_arms), dtype=self.arm_means.dtype),
+                'values': np.empty((rows, self.n_arms), dtype=np.float64),
+                'unplayed': np.empty((rows, self.n_arms), dtype=bool),
+                'first_unplayed': np.empty(rows, dtype=np.intp),
+                'steps': np.empty(rows, dtype=self.total_steps.dtype),
+                'confidence': np.empty(rows, dtype=self.confidence_levels.dtype),
+                'column': np.empty(rows, dtype=np.float64),
+                'column_2': np.empty(rows, dtype=np.float64),
+                'column_3': np.empty(rows, dtype=np.float64),
+                'mask': np.empty(rows, dtype=bool)
+            }
+            self._local.workspace = workspace
+        return workspace
+    
+    def _refresh_recent(self, rows: np.ndarray) -> None:
+        """Recalcular los agregados de la ventana reciente de varias filas"""
+        recent = self.recent_rewards[rows].astype(np.float64)
+        self.recent_sums[rows] = recent.sum(axis=1)
+        self.recent_sums_sq[rows] = (recent * recent).sum(axis=1)
+    
+    @property
+    def bytes_per_user(self) -> int:
+        """Memoria ocupada por cada fila"""
+        return (self.user_ids.itemsize
+                + self.n_arms * (self.arm_counts.itemsize + self.arm_rewards.itemsize
+                                 + self.arm_means.itemsize)
+                + self.total_steps.itemsize + self.confidence_levels.itemsize
+                + self.recent_window * self.recent_rewards.itemsize)
+    
+    def get_row(self, user_id: int) -> Optional[int]:
+        """Obtener la fila de un usuario (None si no existe)"""
+        return self.user_index.get(user_id)
+    
+    def add_user(self, user_id: int, confidence_level: float) -> int:
+        """
+        Registrar un usuario nuevo
+        
+        Args:
+            user_id: ID del usuario
+            confidence_level: Nivel de confianza para el bound del usuario
+            
+        Returns:
+            Fila asignada
+        """
+        if self.n_rows == self.capacity:
+            self._grow(max(1, 2 * self.capacity))
+        
+        row = self.n_rows
+        self.user_index[user_id] = row
+        self.user_ids[row] = user_id
+        self.confidence_levels[row] = confidence_level
+        self.n_rows += 1
+        return row
+    
+    def export_rows(self, rows: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+        """
+        Copiar el estado de varias filas
+        
+        Args:
+            rows: Filas a exportar (None = todas)
+            
+        Returns:
+            Diccionario campo -> array (ver STORE_FIELDS)
+        """
+        if rows is None:
+            rows = np.arange(self.n_rows)
+        return {name: getattr(self, name)[rows].copy() for name in STORE_FIELDS}
+    
+    def import_rows(self, state: Dict[str, np.ndarray]) -> np.ndarray:
+        """
+        Cargar filas exportadas (sobrescribe usuarios existentes, añade los nuevos)
+        
+        Args:
+            state: Diccionario campo -> array, como el de export_rows
+            
+        Returns:
+            Filas asignadas a cada usuario importado
+        """
+        if state['recent_rewards'].shape[1:] != (self.recent_window,):
+            raise ValueError(f"Ventana de recompensas incompatible: "
+                             f"{state['recent_rewards'].shape[1:]} != ({self.recent_window},)")
+        if state['arm_counts'].shape[1:] != (self.n_arms,):
+            raise ValueError(f"Número de brazos incompatible: "
+                             f"{state['arm_counts'].shape[1:]} != ({self.n_arms},)")
+        
+        user_ids = np.asarray(state['user_ids'], dtype=np.int64)
+        rows = np.fromiter(
+            (self.user_index.get(uid, -1) for uid in user_ids.tolist()),
+            dtype=np.int64, count=len(user_ids)
+        )
+        new = rows < 0
+        n_new = int(new.sum())
+        if self.n_rows + n_new > self.capacity:
+            self._grow(max(2 * self.capacity, self.n_rows + n_new))
+        
+        rows[new] = np.arange(self.n_rows, self.n_rows + n_new)
+        self.user_index.update(zip(user_ids[new].tolist(), rows[new].tolist()))
+        self.n_rows += n_new
         
-        # Estadísticas por brazo
-        self.arm_counts = np.zeros(self.n_arms)
-        self.arm_rewards = np.zeros(self.n_arms)
-        self.arm_means = np.zeros(self.n_arms)
-        self.ucb_values = np.full(self.n_arms, float('inf'))
+        for name in STORE_FIELDS:
+            getattr(self, name)[rows] = state[name]
+        self._refresh_recent(rows)
+        return rows
+    
+    def remove_users(self, user_ids: List[int]) -> int:
+        """
+        Eliminar usuarios compactando los arrays (las filas restantes cambian)
+        
+        Args:
+            user_ids: IDs de usuario
+            
+        Returns:
+            Número de usuarios eliminados
+        """
+        removed = [self.user_index[uid] for uid in user_ids if uid in self.user_index]
+        if not removed:
+            return 0
         
-        # Historial
-        self.history = []
-        self.total_steps = 0
+        keep = np.ones(self.n_rows, dtype=bool)
+        keep[removed] = False
+        n_keep = int(keep.sum())
+        for name in STORE_FIELDS + DERIVED_FIELDS:
+            array = getattr(self, name)
+            array[:n_keep] = array[:self.n_rows][keep]
+            array[n_keep:self.n_rows] = 0
         
-        logger.info(f"UCBBandit inicializado con {self.n_arms} brazos: {arms}")
+        self.n_rows = n_keep
+        self.user_index = {uid: row for row, uid in enumerate(self.user_ids[:n_keep].tolist())}
+        return len(removed)
     
-    def select_arm(self) -> Tuple[int, str]:
+    def select_arms(self, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
         """
-        Seleccionar brazo usando UCB
+        Seleccionar brazo para varios usuarios con UCB
         
+        Primero se juega cualquier brazo sin jugar; después el de mayor
+        media + confidence_level * sqrt(log(pasos + 1) / jugadas). Los
+        intermedios se calculan en los buffers de trabajo del hilo: solo se
+        reservan los dos arrays devueltos.
+        
+        Args:
+            rows: Filas de usuario
+            
         Returns:
-            Tupla (índice del brazo, tipo de acción)
+            Tupla (brazos, máscara de exploración de brazos no jugados)
         """
-        # Primero explorar todos los brazos no jugados
-        unplayed_arms = np.where(self.arm_counts == 0)[0]
-        if len(unplayed_arms) > 0:
-            selected_arm = unplayed_arms[0]
-            logger.debug(f"Seleccionando brazo no jugado: {self.arms[selected_arm]}")
-            return selected_arm, 'explore_unplayed'
+        n = len(rows)
+        workspace = self._workspace(n)
+        counts = np.take(self.arm_counts, rows, axis=0, out=workspace['counts'][:n])
+        unplayed = np.equal(counts, 0, out=workspace['unplayed'][:n])
+        explore = np.any(unplayed, axis=1)
         
-        # Calcular UCB values y seleccionar el mejor
-        self._calculate_ucb_values()
-        selected_arm = int(np.argmax(self.ucb_values))
+        log_steps = np.take(self.total_steps, rows, out=workspace['steps'][:n])
+        log_steps = np.add(log_steps, 1.0, out=workspace['column'][:n])
+        np.log(log_steps, out=log_steps)
+        confidence = np.take(self.confidence_levels, rows, out=workspace['confidence'][:n])
         
-        logger.debug(f"Seleccionando brazo UCB: {self.arms[selected_arm]} "
-                    f"(UCB={self.ucb_values[selected_arm]:.3f})")
+        ucb_values = np.maximum(counts, 1, out=workspace['values'][:n])
+        np.divide(log_steps[:, np.newaxis], ucb_values, out=ucb_values)
+        np.sqrt(ucb_values, out=ucb_values)
+        np.multiply(ucb_values, confidence[:, np.newaxis], out=ucb_values)
+        ucb_values += np.take(self.arm_means, rows, axis=0, out=workspace['means'][:n])
         
-        return selected_arm, 'ucb_optimistic'
+        arms = np.argmax(ucb_values, axis=1)
+        first_unplayed = np.argmax(unplayed, axis=1, out=workspace['first_unplayed'][:n])
+        np.copyto(arms, first_unplayed, where=explore)
+        return arms, explore
     
-    def _calculate_ucb_values(self) -> None:
-        """Calcular Upper Confidence Bounds para cada brazo"""
-        for i in range(self.n_arms):
-            if self.arm_counts[i] > 0:
-                confidence_bonus = self.confidence_level * np.sqrt(
-                    np.log(self.total_steps + 1) / self.arm_counts[i]
-                )
-                self.ucb_values[i] = self.arm_means[i] + confidence_bonus
+    def update_many(self, rows: np.ndarray, arms: np.ndarray, rewards: np.ndarray) -> None:
+        """
+        Actualizar estadísticas con un lote de recompensas
+        
+        Args:
+            rows: Filas de usuario
+            arms: Brazos jugados
+            rewards: Recompensas recibidas
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        arms = np.asarray(arms, dtype=np.int64)
+        rewards = np.asarray(rewards, dtype=np.float32)
+        
+        # Posición en la ventana reciente: pasos previos + orden dentro del lote
+        order = np.argsort(rows, kind='stable')
+        sorted_rows = rows[order]
+        group_start = np.r_[0, np.flatnonzero(np.diff(sorted_rows)) + 1]
+        occurrence = np.arange(len(rows)) - np.repeat(group_start, np.diff(np.r_[group_start, len(rows)]))
+        positions = np.empty(len(rows), dtype=np.int64)
+        positions[order] = self.total_steps[sorted_rows] + occurrence
+        self.recent_rewards[rows, positions % self.recent_window] = rewards
+        
+        np.add.at(self.arm_counts, (rows, arms), 1)
+        np.add.at(self.arm_rewards, (rows, arms), rewards)
+        np.add.at(self.total_steps, rows, 1)
+        self.arm_means[rows, arms] = self.arm_rewards[rows, arms] / self.arm_counts[rows, arms]
+        self._refresh_recent(np.unique(rows))
     
-    def update(self, arm: int, reward: float) -> None:
+    def update(self, row: int, arm: int, reward: float) -> None:
         """
-        Actualizar estadísticas después de recibir recompensa
+        Actualizar estadísticas de un usuario
         
         Args:
-            arm: Índice del brazo seleccionado
+            row: Fila del usuario
+            arm: Brazo jugado
             reward: Recompensa recibida
         """
-        self.arm_counts[arm] += 1
-        self.arm_rewards[arm] += reward
-        self.arm_means[arm] = self.arm_rewards[arm] / self.arm_counts[arm]
+        position = self.total_steps[row] % self.recent_window
+        evicted = float(self.recent_rewards[row, position])
+        self.recent_rewards[row, position] = reward
+        stored = float(self.recent_rewards[row, position])
+        self.recent_sums[row] += stored - evicted
+        self.recent_sums_sq[row] += stored * stored - evicted * evicted
+        self.arm_counts[row, arm] += 1
+        self.arm_rewards[row, arm] += reward
+        self.arm_means[row, arm] = self.arm_rewards[row, arm] / self.arm_counts[row, arm]
+        self.total_steps[row] += 1
+    
+    def confidence_of(self, rows: np.ndarray) -> np.ndarray:
+        """
+        Calcular la confianza del agente para varios usuarios
+        
+        Media entre la experiencia (pasos / 50) y la estabilidad de las
+        recompensas recientes (1 / (1 + std)). La desviación sale de los
+        agregados de la ventana, con los buffers de trabajo del hilo.
         
-        self.history.append({
-            'step': self.total_steps,
-            'arm': arm,
-            'arm_name': self.arms[arm],
-            'reward': reward
-        })
+        Args:
+            rows: Filas de usuario
+            
+        Returns:
+            Array de confianzas en [0, 1]
+        """
+        n = len(rows)
+        workspace = self._workspace(n)
+        steps = np.take(self.total_steps, rows, out=workspace['steps'][:n])
         
-        self.total_steps += 1
+        n_valid = np.minimum(steps, self.recent_window, out=workspace['column'][:n])
+        np.maximum(n_valid, 1, out=n_valid)
+        mean = np.take(self.recent_sums, rows, out=workspace['column_2'][:n])
+        mean /= n_valid
+        stability = np.take(self.recent_sums_sq, rows, out=workspace['column_3'][:n])
+        stability /= n_valid
+        np.multiply(mean, mean, out=mean)
+        stability -= mean
+        np.maximum(stability, 0.0, out=stability)
+        np.sqrt(stability, out=stability)
+        stability += 1.0
+        np.divide(1.0, stability, out=stability)
+        np.copyto(stability, 0.5, where=np.less_equal(steps, 5, out=workspace['mask'][:n]))
         
-        logger.debug(f"Brazo {self.arms[arm]} actualizado: "
-                    f"count={self.arm_counts[arm]}, mean={self.arm_means[arm]:.3f}")
+        confidence = np.divide(steps, 50.0)
+        np.minimum(confidence, 1.0, out=confidence)
+        confidence += stability
+        confidence /= 2
+        np.copyto(confidence, 0.0, where=np.equal(steps, 0, out=workspace['mask'][:n]))
+        return confidence
     
-    def get_statistics(self) -> Dict:
+    def recent_reward_stats(self, row: int) -> Tuple[float, float]:
         """
-        Obtener estadísticas del bandit
+        Obtener media y desviación estándar de las recompensas recientes de una fila
         
+        Args:
+            row: Fila del usuario
+            
         Returns:
-            Diccionario con estadísticas
+            Tupla (media, desviación estándar); (0.0, 0.0) sin historial
+        """
+        n = min(int(self.total_steps[row]), self.recent_window)
+        if n == 0:
+            return 0.0, 0.0
+        mean = self.recent_sums[row] / n
+        variance = max(self.recent_sums_sq[row] / n - mean * mean, 0.0)
+        return float(mean), float(np.sqrt(variance))
+    
+    def get_user_statistics(self, user_id: int) -> Optional[Dict]:
         """
+        Obtener estadísticas del bandit de un usuario
+        
+        Args:
+            user_id: ID del usuario
+            
+        Returns:
+            Diccionario con estadísticas o None si el usuario no existe
+        """
+        row = self.get_row(user_id)
+        if row is None:
+            return None
+        recent_mean, recent_std = self.recent_reward_stats(row)
         return {
-            'total_steps': self.total_steps,
-            'arm_counts': self.arm_counts.tolist(),
-            'arm_means': self.arm_means.tolist(),
+            'total_steps': int(self.total_steps[row]),
+            'arm_counts': self.arm_counts[row].tolist(),
+            'arm_means': self.arm_means[row].tolist(),
             'arm_names': self.arms,
-            'ucb_values': self.ucb_values.tolist(),
-            'history': self.history[-10:]  # Últimas 10 interacciones
+            'confidence_level': float(self.confidence_levels[row]),
+            'recent_avg_reward': recent_mean,
+            'recent_std_reward': recent_std
         }
 
+
+class BanditPolicy(ABC):
+    """Política de selección de brazos sobre las filas de un BanditStore"""
+    
+    name = 'base'
+    action_type = 'optimistic'
+    uses_context = False
+    
+    @abstractmethod
+    def select_arms(self, store: BanditStore, rows: np.ndarray,
+                    contexts: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Seleccionar brazo para varios usuarios
+        
+        Args:
+            store: Almacén con los contadores por usuario y brazo
+            rows: Filas de usuario
+            contexts: Matriz de estados de usuario (solo políticas contextuales)
+            
+        Returns:
+            Tupla (brazos, máscara de brazos elegidos sin jugar)
+        """
+    
+    def update_many(self, rows: np.ndarray, arms: np.ndarray, rewards: np.ndarray,
+                    contexts: Optional[np.ndarray] = None) -> None:
+        """
+        Actualizar el estado propio de la política (los contadores los actualiza el store)
+        
+        Args:
+            rows: Filas de usuario
+            arms: Brazos jugados
+            rewards: Recompensas recibidas
+            contexts: Matriz de estados de usuario (solo políticas contextuales)
+        """
+    
+    def get_statistics(self) -> Dict:
+        """Obtener estadísticas de la política"""
+        return {'policy': self.name}
+    
+    def get_state(self) -> Dict[str, np.ndarray]:
+        """Estado aprendido propio de la política (vacío si todo vive en el store)"""
+        return {}
+    
+    def set_state(self, state: Dict[str, np.ndarray]) -> None:
+        """Restaurar el estado devuelto por get_state"""
+    
+    @staticmethod
+    def _unplayed(store: BanditStore, rows: np.ndarray, arms: np.ndarray) -> np.ndarray:
+        """Máscara de brazos elegidos que el usuario aún no había jugado"""
+        return store.arm_counts[rows, arms] == 0
+
+
+class UCBPolicy(BanditPolicy):
+    """UCB por usuario (delegado en el cálculo vectorizado del store)"""
+    
+    name = 'ucb'
+    action_type = 'ucb_optimistic'
+    
+    def select_arms(self, store: BanditStore, rows: np.ndarray,
+                    contexts: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        return store.select_arms(rows)
+
+
+class BetaThompsonPolicy(BanditPolicy):
+    """Thompson sampling con posterior Beta por usuario y brazo"""
+    
+    name = 'thompson_beta'
+    action_type = 'thompson_sample'
+    
+    def __init__(self, seed: Optional[int] = None):
+        """
+        Inicializar política
+        
+        Las recompensas en [0, 1] se tratan como éxitos fraccionarios, así que
+        la posterior Beta(1 + suma, 1 + jugadas - suma) sale directamente de
+        los contadores del store sin estado adicional.
+        
+        Args:
+            seed: Semilla del generador aleatorio (None = aleatoria)
+        """
+        self.rng = np.random.default_rng(seed)
+    
+    def select_arms(self, store: BanditStore, rows: np.ndarray,
+                    contexts: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        successes = np.clip(store.arm_rewards[rows], 0.0, None)
+        failures = np.clip(store.arm_counts[rows] - successes, 0.0, None)
+        samples = self.rng.beta(1.0 + successes, 1.0 + failures)
+        arms = samples.argmax(axis=1)
+        return arms, self._unplayed(store, rows, arms)
+
+
+class GaussianThompsonPolicy(BanditPolicy):
+    """Thompson sampling con posterior Normal por usuario y brazo"""
+    
+    name = 'thompson_gaussian'
+    action_type = 'thompson_sample'
+    
+    def __init__(self, noise_std: float = 0.5, seed: Optional[int] = None):
+        """
+        Inicializar política
+        
+        Prior N(0, noise_std²) conjugado: la posterior de cada brazo es
+        N(suma / (jugadas + 1), noise_std² / (jugadas + 1)).
+        
+        Args:
+            noise_std: Desviación estándar supuesta de las recompensas
+            seed: Semilla del generador aleatorio (None = aleatoria)
+        """
+        self.noise_std = noise_std
+        self.rng = np.random.default_rng(seed)
+    
+    def select_arms(self, store: BanditStore, rows: np.ndarray,
+                    contexts: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        precision = store.arm_counts[rows] + 1.0
+        means = store.arm_rewards[rows] / precision
+        samples = means + self.noise_std / np.sqrt(precision) * self.rng.standard_normal(means.shape)
+        arms = samples.argmax(axis=1)
+        return arms, self._unplayed(store, rows, arms)
+    
+    def get_statistics(self) -> Dict:
+        return {'policy': self.name, 'noise_std': self.noise_std}
+
+
+class LinUCBPolicy(BanditPolicy):
+    """LinUCB disjunto sobre el vector de estado del usuario (modelo lineal por brazo)"""
+    
+    name = 'linucb'
+    action_type = 'linucb_optimistic'
+    uses_context = True
+    
+    def __init__(self, n_arms: int, n_features: int, alpha: float = 1.0,
+                 regularization: float = 1.0):
+        """
+        Inicializar política
+        
+        Cada brazo mantiene A⁻¹ y b sobre el contexto [estado, 1]; A⁻¹ se
+        actualiza con Sherman–Morrison (rango uno), sin invertir matrices.
+        
+        Args:
+            n_arms: Número de brazos
+            n_features: Dimensión del estado de usuario (sin el término de sesgo)
+            alpha: Peso del bonus de exploración
+            regularization: Regularización ridge inicial (A = regularization · I)
+        """
+        self.n_arms = n_arms
+        self.dim = n_features + 1
+        self.alpha = alpha
+        
+        self.A_inv = np.tile(np.eye(self.dim) / regularization, (n_arms, 1, 1))
+        self.b = np.zeros((n_arms, self.dim))
+        self.theta = np.zeros((n_arms, self.dim))
+        self.n_updates = 0
+    
+    def _with_bias(self, contexts: np.ndarray) -> np.ndarray:
+        """Añadir la columna de sesgo a los contextos"""
+        contexts = np.asarray(contexts, dtype=np.float64)
+        return np.hstack([contexts, np.ones((len(contexts), 1))])
+    
+    def select_arms(self, store: BanditStore, rows: np.ndarray,
+                    contexts: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        x = self._with_bias(contexts)
+        
+        # media = x·θ_a ; varianza = xᵀ A_a⁻¹ x, para todos los usuarios y brazos a la vez
+        means = x @ self.theta.T
+        variances = np.einsum('ni,aij,nj->na', x, self.A_inv, x)
+        ucb_values = means + self.alpha * np.sqrt(np.maximum(variances, 0.0))
+        
+        arms = ucb_values.argmax(axis=1)
+        return arms, self._unplayed(store, rows, arms)
+    
+    def update_many(self, rows: np.ndarray, arms: np.ndarray, rewards: np.ndarray,
+                    contexts: Optional[np.ndarray] = None) -> None:
+        x = self._with_bias(contexts)
+        arms = np.asarray(arms, dtype=np.int64)
+        rewards = np.asarray(rewards, dtype=np.float64)
+        
+        np.add.at(self.b, arms, x * rewards[:, np.newaxis])
+        for arm, xi in zip(arms.tolist(), x):
+            A_inv = self.A_inv[arm]
+            A_inv_x = A_inv @ xi
+            A_inv -= np.outer(A_inv_x, A_inv_x) / (1.0 + xi @ A_inv_x)
+        
+        updated = np.unique(arms)
+        self.theta[updated] = np.einsum('aij,aj->ai', self.A_inv[updated], self.b[updated])
+        self.n_updates += len(arms)
+    
+    def get_statistics(self) -> Dict:
+        return {
+            'policy': self.name,
+            'alpha': self.alpha,
+            'n_updates': self.n_updates,
+            'theta': self.theta.tolist()
+        }
+    
+    def get_state(self) -> Dict[str, np.ndarray]:
+        return {'A_inv': self.A_inv.copy(), 'b': self.b.copy(),
+                'n_updates': np.array(self.n_updates)}
+    
+    def set_state(self, state: Dict[str, np.ndarray]) -> None:
+        if state['A_inv'].shape != self.A_inv.shape:
+            raise ValueError(f"Estado LinUCB incompatible: {state['A_inv'].shape} != {self.A_inv.shape}")
+        self.A_inv[:] = state['A_inv']
+        self.b[:] = state['b']
+        self.theta = np.einsum('aij,aj->ai', self.A_inv, self.b)
+        self.n_updates = int(state['n_updates'])
+
+
+BANDIT_POLICIES = ('ucb', 'thompson_beta', 'thompson_gaussian', 'linucb')
+
+
+def create_policy(name: str, n_arms: int, n_features: int,
+                  linucb_alpha: float = 1.0, thompson_noise_std: float = 0.5,
+                  seed: Optional[int] = None) -> BanditPolicy:
+    """
+    Construir una política de bandit por nombre
+    
+    Args:
+        name: Nombre de la política (ver BANDIT_POLICIES)
+        n_arms: Número de brazos
+        n_features: Dimensión del estado de usuario (LinUCB)
+        linucb_alpha: Peso del bonus de exploración de LinUCB
+        thompson_noise_std: Desviación estándar de Thompson gaussiano
+        seed: Semilla de las políticas estocásticas
+        
+    Returns:
+        Instancia de la política
+    """
+    if name == 'ucb':
+        return UCBPolicy()
+    if name == 'thompson_beta':
+        return BetaThompsonPolicy(seed=seed)
+    if name == 'thompson_gaussian':
+        return GaussianThompsonPolicy(noise_std=thompson_noise_std, seed=seed)
+    if name == 'linucb':
+        return LinUCBPolicy(n_arms, n_features, alpha=linucb_alpha)
+    raise ValueError(f"Política de bandit desconocida: {name} (opciones: {BANDIT_POLICIES})")
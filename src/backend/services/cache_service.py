@@ -0,0 +1,326 @@
+"""Servicio de Caché - Caché LRU acotada con expiración por TTL y caché de respuestas versionada"""
+from collections import OrderedDict
+from hashlib import blake2b
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Tuple
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Caché LRU acotada con expiración por TTL y contadores de aciertos/fallos"""
+
+    def __init__(self, maxsize: int = 10000, ttl: Optional[float] = 300.0):
+        """
+        Inicializar caché
+
+        Args:
+            maxsize: Número máximo de entradas (se expulsa la menos usada)
+            ttl: Segundos de validez de cada entrada (None = sin expiración)
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Obtener una entrada (cuenta acierto o fallo)
+
+        Args:
+            key: Clave
+            default: Valor si no existe o expiró
+
+        Returns:
+            Valor almacenado o `default`
+        """
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+
+            expires_at, value = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """
+        Guardar una entrada
+
+        Args:
+            key: Clave
+            value: Valor
+        """
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Extraer una entrada no expirada
+
+        Args:
+            key: Clave
+            default: Valor si no existe o expiró
+
+        Returns:
+            Valor almacenado o `default`
+        """
+        with self._lock:
+            entry = self._entries.pop(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+
+            expires_at, value = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                self.expirations += 1
+                self.misses += 1
+                return default
+
+            self.hits += 1
+            return value
+
+    def pop_if(self, key: Hashable, predicate: Callable[[Any], bool], default: Any = None) -> Any:
+        """
+        Extraer una entrada no expirada solo si su valor cumple un predicado
+
+        La comprobación y la extracción son atómicas: si el predicado falla la
+        entrada se queda como estaba (sin renovar su TTL ni su posición LRU).
+
+        Args:
+            key: Clave
+            predicate: Función valor -> bool
+            default: Valor si no existe, expiró o no cumple el predicado
+
+        Returns:
+            Valor extraído o `default`
+        """
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+
+            expires_at, value = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+
+            if not predicate(value):
+                self.misses += 1
+                return default
+
+            del self._entries[key]
+            self.hits += 1
+            return value
+
+    def invalidate(self, keys: Iterable[Hashable]) -> int:
+        """
+        Eliminar entradas
+
+        Args:
+            keys: Claves a invalidar
+
+        Returns:
+            Número de entradas eliminadas
+        """
+        removed = 0
+        with self._lock:
+            for key in keys:
+                if self._entries.pop(key, _MISSING) is not _MISSING:
+                    removed += 1
+            self.invalidations += removed
+        return removed
+
+    def extract(self, predicate: Callable[[Hashable, Any], bool]) -> Dict:
+        """
+        Extraer las entradas no expiradas que cumplen un predicado
+
+        Recorre toda la caché: pensado para operaciones poco frecuentes
+        (p.ej. migrar las entradas de unos usuarios a otro proceso).
+
+        Args:
+            predicate: Función (clave, valor) -> bool
+
+        Returns:
+            Diccionario clave -> valor de las entradas extraídas
+        """
+        now = time.monotonic()
+        extracted = {}
+        with self._lock:
+            for key, (expires_at, value) in list(self._entries.items()):
+                if expires_at is not None and expires_at < now:
+                    continue
+                if predicate(key, value):
+                    del self._entries[key]
+                    extracted[key] = value
+        return extracted
+
+    def clear(self) -> None:
+        """Vaciar la caché"""
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_statistics(self) -> Dict:
+        """Obtener estadísticas de la caché"""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'invalidations': self.invalidations
+        }
+
+
+class VersionedResponseCache:
+    """Respuestas serializadas por usuario, válidas mientras no cambie la versión del usuario"""
+
+    def __init__(self, maxsize: int = 10000, ttl: Optional[float] = 300.0):
+        """
+        Inicializar caché
+
+        Cada usuario tiene un contador de versión que se incrementa cuando
+        cambian sus datos (feedback, ingesta). Una entrada guardada con una
+        versión anterior deja de servirse sin necesidad de buscarla.
+
+        Args:
+            maxsize: Número máximo de respuestas (se expulsa la menos usada)
+            ttl: Segundos de validez de cada respuesta (None = sin expiración)
+        """
+        self.entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._versions: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.not_modified = 0
+
+    def version(self, user_id: int) -> int:
+        """Versión actual de los datos de un usuario"""
+        return self._versions.get(user_id, 0)
+
+    def bump(self, user_ids: Iterable[int]) -> None:
+        """
+        Incrementar la versión de unos usuarios (sus respuestas guardadas dejan de ser válidas)
+
+        Args:
+            user_ids: IDs de usuario
+        """
+        with self._lock:
+            for user_id in user_ids:
+                self._versions[user_id] = self._versions.get(user_id, 0) + 1
+
+    def get(self, kind: str, user_id: int) -> Optional[Tuple[str, bytes]]:
+        """
+        Obtener una respuesta guardada si sigue siendo de la versión actual
+
+        Args:
+            kind: Tipo de respuesta (p.ej. 'state', 'profile')
+            user_id: ID del usuario
+
+        Returns:
+            Tupla (ETag, cuerpo JSON) o None
+        """
+        entry = self.entries.get((kind, user_id))
+        if entry is not None and entry[0] != self.version(user_id):
+            self.stale += 1
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[1], entry[2]
+
+    def put(self, kind: str, user_id: int, version: int, body: bytes) -> Tuple[str, bytes]:
+        """
+        Guardar una respuesta calculada con una versión dada
+
+        Si la versión cambió mientras se calculaba, la respuesta se devuelve
+        pero no se guarda.
+
+        Args:
+            kind: Tipo de respuesta
+            user_id: ID del usuario
+            version: Versión leída antes de calcular la respuesta
+            body: Cuerpo JSON serializado
+
+        Returns:
+            Tupla (ETag, cuerpo JSON)
+        """
+        etag = f'"{blake2b(body, digest_size=8).hexdigest()}"'
+        if version == self.version(user_id):
+            self.entries.put((kind, user_id), (version, etag, body))
+        return etag, body
+
+    def is_not_modified(self, etag: str, if_none_match: Optional[str]) -> bool:
+        """
+        Comprobar si la cabecera If-None-Match del cliente coincide con el ETag (cuenta los 304)
+
+        Args:
+            etag: ETag de la respuesta actual
+            if_none_match: Valor de la cabecera If-None-Match (None si no viene)
+
+        Returns:
+            True si se puede responder 304 Not Modified
+        """
+        if if_none_match is None:
+            return False
+        tags = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+        if '*' in tags or etag in tags:
+            self.not_modified += 1
+            return True
+        return False
+
+    def get_statistics(self) -> Dict:
+        """Obtener estadísticas de la caché de respuestas"""
+        lookups = self.hits + self.misses
+        entries = self.entries.get_statistics()
+        return {
+            'size': entries['size'],
+            'maxsize': entries['maxsize'],
+            'ttl': entries['ttl'],
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'stale': self.stale,
+            'not_modified': self.not_modified,
+            'evictions': entries['evictions'],
+            'expirations': entries['expirations'],
+            'versioned_users': len(self._versions)
+        }
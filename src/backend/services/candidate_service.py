@@ -0,0 +1,670 @@
+"""Servicio de Candidatos - Índices pre-computados de candidatos por estrategia"""
+import pandas as pd
+import numpy as np
+from scipy import sparse
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional, Tuple
+import json
+import threading
+import time
+import logging
+
+from services.matrix_service import InteractionMatrices, add_entries, with_shape
+
+logger = logging.getLogger(__name__)
+
+
+def top_n_per_row(scores: sparse.csr_matrix, n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Extraer las n columnas de mayor score de cada fila de una matriz CSR
+
+    Args:
+        scores: Matriz CSR de scores (filas = usuarios, columnas = artistas)
+        n: Número de candidatos por fila
+
+    Returns:
+        Tupla (columnas int32 rellenas con -1, scores float32) de forma (filas, n)
+    """
+    ids = np.full((scores.shape[0], n), -1, dtype=np.int32)
+    values = np.zeros((scores.shape[0], n), dtype=np.float32)
+
+    for row in range(scores.shape[0]):
+        start, end = scores.indptr[row], scores.indptr[row + 1]
+        if start == end:
+            continue
+        row_data = scores.data[start:end]
+        row_cols = scores.indices[start:end]
+        if len(row_data) > n:
+            top = np.argpartition(-row_data, n - 1)[:n]
+        else:
+            top = np.arange(len(row_data))
+        top = top[np.lexsort((row_cols[top], -row_data[top]))]
+        ids[row, :len(top)] = row_cols[top]
+        values[row, :len(top)] = row_data[top]
+
+    return ids, values
+
+
+class SocialCandidateIndex:
+    """Candidatos por influencia social: artistas más escuchados por los amigos"""
+
+    def __init__(self, matrices: InteractionMatrices, top_n: int = 50):
+        """
+        Inicializar índice
+
+        Args:
+            matrices: Matrices dispersas de interacciones y amistades
+            top_n: Candidatos almacenados por usuario
+        """
+        self.matrices = matrices
+        self.top_n = top_n
+
+        self.candidate_ids = np.full((0, top_n), -1, dtype=np.int32)
+        self.candidate_scores = np.zeros((0, top_n), dtype=np.float32)
+
+        self.refresh(np.arange(matrices.n_users))
+
+        logger.info(f"SocialCandidateIndex inicializado ({matrices.n_users} usuarios, top_n={top_n})")
+
+    def _compute(self, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Calcular candidatos de un conjunto de filas (por bloques)"""
+        ids = np.full((len(rows), self.top_n), -1, dtype=np.int32)
+        scores = np.zeros((len(rows), self.top_n), dtype=np.float32)
+        matrix_set = self.matrices.current
+
+        for start in range(0, len(rows), self.matrices.chunk_size):
+            chunk = rows[start:start + self.matrices.chunk_size]
+
+            # Reproducciones agregadas de los amigos = adyacencia × pesos
+            friends_music = (matrix_set.friends[chunk] @ matrix_set.user_items).tocsr()
+
+            # Excluir el historial propio
+            own = matrix_set.user_items[chunk]
+            own.data[:] = 1.0
+            friends_music = (friends_music - friends_music.multiply(own)).tocsr()
+            friends_music.eliminate_zeros()
+
+            chunk_columns, chunk_scores = top_n_per_row(friends_music, self.top_n)
+            ids[start:start + len(chunk)] = self.matrices.column_artists(chunk_columns)
+            scores[start:start + len(chunk)] = chunk_scores
+
+        return ids, scores
+
+    def refresh(self, rows: np.ndarray) -> None:
+        """
+        Recalcular los candidatos de las filas indicadas
+
+        Args:
+            rows: Filas de usuario a recalcular
+        """
+        missing_rows = self.matrices.n_users - len(self.candidate_ids)
+        if missing_rows > 0:
+            self.candidate_ids = np.vstack([
+                self.candidate_ids, np.full((missing_rows, self.top_n), -1, dtype=np.int32)
+            ])
+            self.candidate_scores = np.vstack([
+                self.candidate_scores, np.zeros((missing_rows, self.top_n), dtype=np.float32)
+            ])
+
+        rows = np.asarray(rows, dtype=np.int64)
+        if len(rows) > 0:
+            self.candidate_ids[rows], self.candidate_scores[rows] = self._compute(rows)
+
+    def get_candidates(self, user_id: int, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Obtener los k mejores candidatos sociales de un usuario
+
+        Args:
+            user_id: ID del usuario
+            k: Número de candidatos
+
+        Returns:
+            Tupla (artistID, scores), vacía si el usuario no tiene candidatos
+        """
+        row = self.matrices.user_index.get(user_id)
+        if row is None or row >= len(self.candidate_ids):
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+
+        ids = self.candidate_ids[row, :k]
+        valid = ids >= 0
+        return ids[valid], self.candidate_scores[row, :k][valid]
+
+
+class _TagIndex(NamedTuple):
+    """Matrices del índice semántico de un mismo estado (se publican juntas)"""
+    counts: sparse.csr_matrix  # tag × artista (asignaciones; columnas densas)
+    weights: sparse.csr_matrix  # counts, ponderada con TF-IDF si está activo
+    profiles: sparse.csr_matrix  # usuario × tag (binaria: tags usados por el usuario)
+
+
+class SemanticCandidateIndex:
+    """Candidatos por coherencia semántica: índice invertido tag → artista"""
+
+    def __init__(self, matrices: InteractionMatrices, user_tagged: pd.DataFrame,
+                 use_tfidf: bool = False, cache_top_n: int = 0):
+        """
+        Inicializar índice
+
+        Args:
+            matrices: Matrices dispersas (índice de usuarios e historial de escucha)
+            user_tagged: DataFrame de tags asignados (userID, artistID, tagID)
+            use_tfidf: Ponderar tag→artista con TF-IDF (penaliza artistas con todos los tags)
+            cache_top_n: Candidatos pre-computados por usuario (0 = calcular bajo demanda)
+        """
+        self.matrices = matrices
+        self.use_tfidf = use_tfidf
+        self.cache_top_n = cache_top_n
+
+        self.matrices.ensure_users(user_tagged['userID'].unique().tolist())
+        n_tag_cols = int(user_tagged['tagID'].max()) + 1 if len(user_tagged) else 1
+        tag_ids = user_tagged['tagID'].to_numpy(dtype=np.int64)
+        ones = np.ones(len(user_tagged), dtype=np.float32)
+
+        counts = sparse.csr_matrix(
+            (ones, (tag_ids, matrices.artist_columns(user_tagged['artistID']))),
+            shape=(n_tag_cols, matrices.n_artists)
+        )
+        counts.sum_duplicates()
+        profiles = sparse.csr_matrix(
+            (ones, (matrices.get_rows(user_tagged['userID']), tag_ids)),
+            shape=(matrices.n_users, n_tag_cols)
+        )
+        profiles.sum_duplicates()
+        profiles.data[:] = 1.0
+
+        # Contadores del IDF, mantenidos de forma incremental
+        self._n_tags = int((np.diff(counts.indptr) > 0).sum())
+        self._tags_per_artist = counts.getnnz(axis=0)
+        self._idf = self._compute_idf(self._n_tags, self._tags_per_artist)
+        self._index = _TagIndex(counts, self._weight(counts, self._idf), profiles)
+
+        self.candidate_ids = np.full((0, cache_top_n), -1, dtype=np.int32)
+        self.candidate_scores = np.zeros((0, cache_top_n), dtype=np.float32)
+        self.refresh(np.arange(matrices.n_users))
+
+        logger.info(f"SemanticCandidateIndex inicializado ({counts.nnz} pares "
+                    f"tag-artista, tfidf={use_tfidf}, cache_top_n={cache_top_n})")
+
+    @property
+    def tag_artist_counts(self) -> sparse.csr_matrix:
+        return self._index.counts
+
+    @property
+    def tag_artist_weights(self) -> sparse.csr_matrix:
+        return self._index.weights
+
+    @property
+    def user_profiles(self) -> sparse.csr_matrix:
+        return self._index.profiles
+
+    def add_tags(self, batch: pd.DataFrame) -> None:
+        """
+        Añadir asignaciones de tags al índice y refrescar los candidatos afectados
+
+        Las matrices se actualizan sin reconstruirse y solo se recalculan los
+        usuarios del batch y aquellos cuyo top-N puede cambiar (ver
+        _stale_rows). Con TF-IDF el IDF de un artista cambia cuando recibe un
+        tag nuevo; si aparece un tag sin asignaciones previas cambia el IDF de
+        todos los artistas y se recalculan todos los usuarios (raro: el
+        vocabulario de tags apenas crece).
+
+        Args:
+            batch: DataFrame con columnas userID, artistID y tagID
+        """
+        if len(batch) == 0:
+            return
+        batch_rows, affected_rows, columns = self._apply_tags(batch)
+        if self.cache_top_n <= 0:
+            return
+        if affected_rows is None:
+            self.refresh(np.arange(self.matrices.n_users))
+            return
+        self.refresh(np.union1d(batch_rows, self._stale_rows(affected_rows, columns)))
+
+    def _apply_tags(self, batch: pd.DataFrame) -> Tuple[np.ndarray, Optional[np.ndarray], np.ndarray]:
+        """
+        Insertar un batch en las matrices (copy-on-write) y publicarlas
+
+        Args:
+            batch: DataFrame con columnas userID, artistID y tagID
+
+        Returns:
+            Tupla (filas de los usuarios del batch, filas con algún score
+            modificado o None si cambian todas, columnas de artista modificadas)
+        """
+        self.matrices.ensure_users(batch['userID'].unique().tolist())
+
+        index = self._index
+        tag_ids = batch['tagID'].to_numpy(dtype=np.int64)
+        columns = self.matrices.artist_columns(batch['artistID'])
+        user_rows = self.matrices.get_rows(batch['userID'])
+        n_tag_cols = max(index.counts.shape[0], int(tag_ids.max()) + 1)
+        counts = with_shape(index.counts, (n_tag_cols, self.matrices.n_artists))
+        profiles = with_shape(index.profiles, (self.matrices.n_users, n_tag_cols))
+
+        # Pares tag-artista y tags que aparecen por primera vez (cambian el IDF)
+        pairs = np.unique(tag_ids * self.matrices.n_artists + columns)
+        pair_tags, pair_columns = np.divmod(pairs, self.matrices.n_artists)
+        new_pairs = np.asarray(counts[pair_tags, pair_columns]).ravel() == 0
+        batch_tags = np.unique(tag_ids)
+        n_tags = self._n_tags + int((np.diff(counts.indptr)[batch_tags] == 0).sum())
+        changed_columns = np.unique(pair_columns[new_pairs])
+        tags_per_artist = self._tags_per_artist + np.bincount(
+            pair_columns[new_pairs], minlength=self.matrices.n_artists
+        )
+
+        ones = np.ones(len(batch), dtype=np.float32)
+        counts = add_entries(counts, tag_ids, columns, ones)
+        profiles = add_entries(profiles, user_rows, tag_ids, ones, binary=True)
+
+        # Tags con algún peso modificado
+        changed_tags = batch_tags
+        idf = self._idf
+        if self.use_tfidf:
+            if n_tags != self._n_tags:
+                idf = self._compute_idf(n_tags, tags_per_artist)
+                changed_tags = None
+            elif len(changed_columns):
+                idf = idf.copy()
+                idf[changed_columns] = self._compute_idf(n_tags, tags_per_artist[changed_columns])
+                tag_rows = np.repeat(np.arange(n_tag_cols), np.diff(counts.indptr))
+                changed_tags = np.union1d(
+                    batch_tags, tag_rows[np.isin(counts.indices, changed_columns)]
+                )
+
+        self._n_tags, self._tags_per_artist, self._idf = n_tags, tags_per_artist, idf
+        self._index = _TagIndex(counts, self._weight(counts, idf), profiles)
+
+        batch_rows = np.unique(user_rows)
+        changed_columns = np.unique(pair_columns)
+        if changed_tags is None:
+            return batch_rows, None, changed_columns
+        profile_rows = np.repeat(np.arange(profiles.shape[0]), np.diff(profiles.indptr))
+        affected_rows = np.unique(profile_rows[np.isin(profiles.indices, changed_tags)])
+        return batch_rows, affected_rows, changed_columns
+
+    def _stale_rows(self, rows: np.ndarray, columns: np.ndarray) -> np.ndarray:
+        """
+        Filas cuyo top-N pre-computado puede cambiar al variar los scores de unos artistas
+
+        Solo cambian los scores de `columns`: el top-N de un usuario se
+        mantiene salvo que alguno de esos artistas ya esté en él (su score
+        pudo bajar con el IDF) o que su nuevo score alcance al último del
+        top-N (o sea positivo si el top-N no está completo).
+
+        Args:
+            rows: Filas con algún score modificado (perfil del usuario ya actualizado)
+            columns: Columnas de artista cuyos pesos cambiaron
+
+        Returns:
+            Filas a recalcular
+        """
+        index = self._index
+        n_cached = len(self.candidate_ids)
+        stale = [rows[rows >= n_cached]]
+        rows = rows[rows < n_cached]
+        changed_ids = self.matrices.column_artists(columns)
+        weights = index.weights[:, columns]
+
+        for start in range(0, len(rows), self.matrices.chunk_size):
+            chunk = rows[start:start + self.matrices.chunk_size]
+            scores = (index.profiles[chunk] @ weights).toarray()
+            scores[self.matrices.user_items[chunk][:, columns].toarray() > 0] = 0.0
+
+            full = self.candidate_ids[chunk, -1] >= 0
+            # Margen relativo: el orden de la suma puede diferir del cálculo completo
+            threshold = self.candidate_scores[chunk, -1] * (1 - 1e-5)
+            enters = np.where(full[:, np.newaxis], scores >= threshold[:, np.newaxis], scores > 0)
+            cached = np.isin(self.candidate_ids[chunk], changed_ids)
+            stale.append(chunk[enters.any(axis=1) | cached.any(axis=1)])
+
+        return np.concatenate(stale)
+
+    @staticmethod
+    def _compute_idf(n_tags: int, tags_per_artist: np.ndarray) -> np.ndarray:
+        """IDF por artista: log(n_tags / n_tags que lo etiquetan) + 1"""
+        return np.log(max(1, n_tags) / np.maximum(tags_per_artist, 1)).astype(np.float32) + 1.0
+
+    def _weight(self, counts: sparse.csr_matrix, idf: np.ndarray) -> sparse.csr_matrix:
+        """Aplicar (opcionalmente) el IDF a la matriz tag × artista (comparte su estructura)"""
+        if not self.use_tfidf:
+            return counts
+        weights = sparse.csr_matrix(
+            (counts.data * idf[counts.indices], counts.indices, counts.indptr), shape=counts.shape
+        )
+        weights.has_sorted_indices = True
+        return weights
+
+    def _score_rows(self, rows: np.ndarray) -> sparse.csr_matrix:
+        """Scores de artistas para las filas indicadas, sin artistas ya escuchados"""
+        index = self._index
+        scores = (index.profiles[rows] @ index.weights).tocsr()
+
+        own = self.matrices.user_items[rows]
+        own.data[:] = 1.0
+
+        scores = (scores - scores.multiply(own)).tocsr()
+        scores.eliminate_zeros()
+        return scores
+
+    def refresh(self, rows: np.ndarray) -> None:
+        """
+        Recalcular los candidatos pre-computados de las filas indicadas
+
+        Args:
+            rows: Filas de usuario a recalcular
+        """
+        if self.cache_top_n <= 0:
+            return
+
+        missing_rows = self.matrices.n_users - len(self.candidate_ids)
+        if missing_rows > 0:
+            self.candidate_ids = np.vstack([
+                self.candidate_ids, np.full((missing_rows, self.cache_top_n), -1, dtype=np.int32)
+            ])
+            self.candidate_scores = np.vstack([
+                self.candidate_scores, np.zeros((missing_rows, self.cache_top_n), dtype=np.float32)
+            ])
+
+        index = self._index
+        if index.profiles.shape[0] < self.matrices.n_users:
+            # Usuarios nuevos (p.ej. por interacciones): perfil vacío
+            self._index = index._replace(profiles=with_shape(
+                index.profiles, (self.matrices.n_users, index.profiles.shape[1])
+            ))
+
+        rows = np.asarray(rows, dtype=np.int64)
+        for start in range(0, len(rows), self.matrices.chunk_size):
+            chunk = rows[start:start + self.matrices.chunk_size]
+            columns, scores = top_n_per_row(self._score_rows(chunk), self.cache_top_n)
+            self.candidate_ids[chunk] = self.matrices.column_artists(columns)
+            self.candidate_scores[chunk] = scores
+
+    def get_candidates(self, user_id: int, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Obtener los k mejores candidatos semánticos de un usuario
+
+        Args:
+            user_id: ID del usuario
+            k: Número de candidatos
+
+        Returns:
+            Tupla (artistID, scores), vacía si el usuario no tiene tags
+        """
+        row = self.matrices.user_index.get(user_id)
+        if row is None or row >= self.user_profiles.shape[0]:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+
+        if self.cache_top_n >= k:
+            ids = self.candidate_ids[row, :k]
+            valid = ids >= 0
+            return ids[valid], self.candidate_scores[row, :k][valid]
+
+        columns, scores = top_n_per_row(self._score_rows(np.array([row])), k)
+        valid = columns[0] >= 0
+        return self.matrices.column_artists(columns[0][valid]).astype(np.int32), scores[0][valid]
+
+
+class ExplorationSampler:
+    """Muestreo de artistas no escuchados por rechazo sobre un array denso de IDs"""
+
+    MODES = ('uniform', 'long_tail', 'popularity')
+
+    def __init__(self, artist_ids: np.ndarray, matrices: InteractionMatrices,
+                 long_tail_alpha: float = 1.0, seed: Optional[int] = None,
+                 max_rounds: int = 8):
+        """
+        Inicializar muestreador
+
+        Args:
+            artist_ids: Catálogo de artistas (array denso de artistID)
+            matrices: Matrices dispersas (oyentes por artista)
+            long_tail_alpha: Exponente del modo long_tail (peso ∝ (1 + oyentes)^-alpha)
+            seed: Semilla del generador (None = aleatoria)
+            max_rounds: Rondas de rechazo antes de recurrir al cálculo exacto
+        """
+        self.artist_ids = np.asarray(artist_ids, dtype=np.int64)
+        self.matrices = matrices
+        self.long_tail_alpha = long_tail_alpha
+        self.max_rounds = max_rounds
+        self.rng = np.random.default_rng(seed)
+
+        # CDFs por modo ponderado (se recalculan de forma perezosa)
+        self._cdfs: Dict[str, np.ndarray] = {}
+
+        logger.info(f"ExplorationSampler inicializado ({len(self.artist_ids)} artistas)")
+
+    def invalidate_weights(self) -> None:
+        """Marcar los pesos como obsoletos (nuevas interacciones)"""
+        self._cdfs = {}
+
+    def _get_cdf(self, mode: str) -> np.ndarray:
+        """Obtener la CDF de un modo ponderado"""
+        cdf = self._cdfs.get(mode)
+        if cdf is None:
+            listeners = np.diff(self.matrices.user_items.tocsc().indptr)
+            columns = self.matrices.artist_columns(self.artist_ids)
+            known = columns >= 0
+            counts = np.zeros(len(self.artist_ids), dtype=np.float64)
+            counts[known] = listeners[columns[known]]
+
+            if mode == 'popularity':
+                weights = counts
+            else:  # long_tail
+                weights = (1.0 + counts) ** -self.long_tail_alpha
+
+            cdf = np.cumsum(weights)
+            self._cdfs[mode] = cdf
+        return cdf
+
+    def _draw(self, n: int, mode: str) -> np.ndarray:
+        """Extraer n artistas (con reemplazo) según el modo"""
+        if mode == 'uniform':
+            return self.artist_ids[self.rng.integers(0, len(self.artist_ids), size=n)]
+
+        cdf = self._get_cdf(mode)
+        if cdf[-1] <= 0:
+            return self.artist_ids[self.rng.integers(0, len(self.artist_ids), size=n)]
+        positions = np.searchsorted(cdf, self.rng.random(n) * cdf[-1], side='right')
+        return self.artist_ids[np.minimum(positions, len(self.artist_ids) - 1)]
+
+    def sample(self, exclude: np.ndarray, k: int = 1, mode: str = 'uniform') -> np.ndarray:
+        """
+        Extraer k artistas distintos que no estén en `exclude`
+
+        Coste esperado O(k log h) mientras el historial h sea pequeño frente
+        al catálogo; no recorre ni copia el catálogo.
+
+        Args:
+            exclude: artistID a excluir, ordenados (p.ej. el historial del usuario)
+            k: Número de artistas
+            mode: 'uniform', 'long_tail' o 'popularity'
+
+        Returns:
+            Array de hasta k artistID
+        """
+        if mode not in self.MODES:
+            raise ValueError(f"Modo de exploración desconocido: {mode}")
+
+        selected = np.empty(0, dtype=np.int64)
+        for _ in range(self.max_rounds):
+            draws = self._draw(2 * k + 8, mode)
+            if len(exclude) > 0:
+                positions = np.minimum(np.searchsorted(exclude, draws), len(exclude) - 1)
+                draws = draws[exclude[positions] != draws]
+            draws = np.concatenate([selected, draws])
+            _, first = np.unique(draws, return_index=True)
+            selected = draws[np.sort(first)]
+            if len(selected) >= k:
+                return selected[:k]
+
+        # Historial casi igual al catálogo: cálculo exacto
+        remaining = np.setdiff1d(self.artist_ids, np.concatenate([exclude, selected]))
+        extra = self.rng.choice(remaining, size=min(k - len(selected), len(remaining)), replace=False)
+        return np.concatenate([selected, extra]).astype(np.int64)
+
+
+# Manifiesto de export_factors: versión publicada y forma de cada array
+FACTORS_MANIFEST = 'manifest.json'
+
+
+class _FactorSet(NamedTuple):
+    """Arrays de una versión de los factores (se sustituyen juntos)"""
+    version: int
+    user_ids: np.ndarray
+    artist_ids: np.ndarray
+    user_factors: np.ndarray
+    artist_factors: np.ndarray
+
+
+class FactorCandidateIndex:
+    """Candidatos de filtrado colaborativo con los factores SVD compartidos (memory-map)"""
+
+    FILES = ('user_ids', 'artist_ids', 'user_factors', 'artist_factors')
+
+    def __init__(self, directory: Path, check_interval: float = 5.0):
+        """
+        Mapear los factores exportados por backend_colaborativo (export_factors)
+
+        Los ficheros se abren en modo memory-map de solo lectura: todos los
+        procesos que los usan (servicio colaborativo, agente, shards) comparten
+        las mismas páginas en memoria y no se re-entrena nada en el proceso.
+        Cada exportación escribe un directorio de versión y publica su
+        manifiesto con os.replace; el índice relee el manifiesto como mucho
+        cada check_interval segundos y remapea cuando cambia la versión.
+
+        Args:
+            directory: Directorio de export_factors (manifest.json y versiones)
+            check_interval: Segundos mínimos entre comprobaciones del manifiesto
+        """
+        self.directory = Path(directory)
+        self.check_interval = check_interval
+        self.reloads = 0
+        self._lock = threading.Lock()
+        self._next_check = time.monotonic() + check_interval
+        self._factors = self._load(self._read_manifest())
+
+        logger.info(f"FactorCandidateIndex mapeado desde {self.directory} "
+                    f"(versión {self.version}, {len(self.user_ids)} usuarios, "
+                    f"{len(self.artist_ids)} artistas, {self.artist_factors.shape[1]} factores)")
+
+    @staticmethod
+    def available(directory: Optional[Path]) -> bool:
+        """Indica si hay factores exportados en el directorio"""
+        if directory is None:
+            return False
+        directory = Path(directory)
+        return (directory / FACTORS_MANIFEST).exists() or (directory / 'user_factors.npy').exists()
+
+    def _read_manifest(self) -> Optional[Dict]:
+        """Leer el manifiesto (None si los factores están en el formato plano anterior)"""
+        path = self.directory / FACTORS_MANIFEST
+        if not path.exists():
+            return None
+        return json.loads(path.read_text())
+
+    def _load(self, manifest: Optional[Dict]) -> _FactorSet:
+        """Mapear una versión y comprobar que las formas de los arrays encajan"""
+        if manifest is None:
+            version, base = 0, self.directory
+        else:
+            version, base = int(manifest['version']), self.directory / manifest['path']
+        arrays = {name: np.load(base / f"{name}.npy", mmap_mode='r') for name in self.FILES}
+
+        shapes = {name: tuple(array.shape) for name, array in arrays.items()}
+        if manifest is not None:
+            expected = {name: tuple(shape) for name, shape in manifest['shapes'].items()}
+            if shapes != expected:
+                raise ValueError(f"Factores de la versión {version} incompletos: {shapes} != {expected}")
+        n_users, n_artists = len(arrays['user_ids']), len(arrays['artist_ids'])
+        if (arrays['user_factors'].ndim != 2 or arrays['artist_factors'].ndim != 2
+                or arrays['user_factors'].shape[0] != n_users
+                or arrays['artist_factors'].shape[0] != n_artists
+                or arrays['user_factors'].shape[1] != arrays['artist_factors'].shape[1]):
+            raise ValueError(f"Factores de la versión {version} inconsistentes: {shapes}")
+
+        return _FactorSet(version, arrays['user_ids'], arrays['artist_ids'],
+                          arrays['user_factors'], arrays['artist_factors'])
+
+    def _current(self) -> _FactorSet:
+        """Factores vigentes (remapeando si se publicó una versión nueva)"""
+        if time.monotonic() < self._next_check or not self._lock.acquire(blocking=False):
+            return self._factors
+        try:
+            self._next_check = time.monotonic() + self.check_interval
+            manifest = self._read_manifest()
+            version = int(manifest['version']) if manifest is not None else 0
+            if version != self._factors.version:
+                self._factors = self._load(manifest)
+                self.reloads += 1
+                logger.info(f"Factores CF remapeados a la versión {version}")
+        except Exception as e:
+            logger.warning(f"No se pudieron remapear los factores CF (se mantiene la versión "
+                           f"{self._factors.version}): {e}")
+        finally:
+            self._lock.release()
+        return self._factors
+
+    @property
+    def version(self) -> int:
+        return self._factors.version
+
+    @property
+    def user_ids(self) -> np.ndarray:
+        return self._factors.user_ids  # ordenados (índices del modelo)
+
+    @property
+    def artist_ids(self) -> np.ndarray:
+        return self._factors.artist_ids  # ordenados
+
+    @property
+    def user_factors(self) -> np.ndarray:
+        return self._factors.user_factors
+
+    @property
+    def artist_factors(self) -> np.ndarray:
+        return self._factors.artist_factors
+
+    @staticmethod
+    def _row_in(factors: _FactorSet, user_id: int) -> Optional[int]:
+        row = int(np.searchsorted(factors.user_ids, user_id))
+        if row < len(factors.user_ids) and factors.user_ids[row] == user_id:
+            return row
+        return None
+
+    def user_row(self, user_id: int) -> Optional[int]:
+        """Fila del usuario en los factores (None si el modelo no lo conoce)"""
+        return self._row_in(self._current(), user_id)
+
+    def get_candidates(self, user_id: int, k: int,
+                       exclude: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Obtener los k artistas con mayor score predicho que no estén en `exclude`
+
+        Args:
+            user_id: ID del usuario
+            k: Número de candidatos
+            exclude: artistID a excluir, ordenados (p.ej. el historial del usuario)
+
+        Returns:
+            Tupla (artistID, scores), vacía si el modelo no conoce al usuario
+        """
+        # Una sola versión de los factores para toda la consulta
+        factors = self._current()
+        row = self._row_in(factors, user_id)
+        if row is None or k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        artist_ids = factors.artist_ids
+        scores = factors.artist_factors @ factors.user_factors[row]
+
+        positions = np.searchsorted(artist_ids, exclude)
+        in_range = positions < len(artist_ids)
+        positions = positions[in_range]
+        scores[positions[artist_ids[positions] == exclude[in_range]]] = -np.inf
+
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind='stable')]
+        top = top[np.isfinite(scores[top])]
+        return artist_ids[top], scores[top]
@@ -0,0 +1,119 @@
+"""Servicio de Ejecución - Descarga de trabajo síncrono fuera del event loop"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Optional
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class StripedLock:
+    """Conjunto fijo de locks indexado por clave: serializa por usuario con memoria constante"""
+
+    def __init__(self, stripes: int = 256):
+        """
+        Inicializar locks
+
+        Args:
+            stripes: Número de locks (dos usuarios comparten lock con probabilidad 1/stripes)
+        """
+        self.stripes = stripes
+        self._locks = [threading.Lock() for _ in range(stripes)]
+
+    def for_key(self, key: int) -> threading.Lock:
+        """Lock asignado a una clave"""
+        return self._locks[hash(key) % self.stripes]
+
+
+class RequestExecutor:
+    """Pool de hilos para el trabajo CPU de las rutas, con serialización por usuario"""
+
+    def __init__(self, max_workers: int = 8, lock_stripes: int = 256):
+        """
+        Inicializar executor
+
+        NumPy, pandas y scipy liberan el GIL en sus bucles internos, así que
+        varios hilos progresan en paralelo y, sobre todo, el event loop sigue
+        atendiendo peticiones mientras otras calculan.
+
+        Args:
+            max_workers: Hilos del pool (0 = ejecutar en el propio event loop)
+            lock_stripes: Locks por usuario (striped)
+        """
+        self.max_workers = max_workers
+        self.user_locks = StripedLock(lock_stripes)
+        self._pool = (
+            ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="request")
+            if max_workers > 0 else None
+        )
+
+        self._stats_lock = threading.Lock()
+        self.stats = {
+            'calls': 0,
+            'in_flight': 0,
+            'max_in_flight': 0,
+            'total_wait_ms': 0.0,
+            'total_run_ms': 0.0
+        }
+
+        logger.info(f"RequestExecutor inicializado (max_workers={max_workers}, "
+                    f"lock_stripes={lock_stripes})")
+
+    def _execute(self, fn: Callable, user_id: Optional[int], submitted: float) -> Any:
+        """Ejecutar en un hilo del pool, bajo el lock del usuario si lo hay"""
+        started = time.perf_counter()
+        with self._stats_lock:
+            self.stats['in_flight'] += 1
+            self.stats['max_in_flight'] = max(self.stats['max_in_flight'], self.stats['in_flight'])
+        try:
+            if user_id is None:
+                return fn()
+            with self.user_locks.for_key(user_id):
+                return fn()
+        finally:
+            finished = time.perf_counter()
+            with self._stats_lock:
+                self.stats['in_flight'] -= 1
+                self.stats['calls'] += 1
+                self.stats['total_wait_ms'] += (started - submitted) * 1000
+                self.stats['total_run_ms'] += (finished - started) * 1000
+
+    async def run(self, fn: Callable, *args, user_id: Optional[int] = None, **kwargs) -> Any:
+        """
+        Ejecutar una función síncrona sin bloquear el event loop
+
+        Args:
+            fn: Función a ejecutar
+            *args: Argumentos posicionales
+            user_id: Usuario cuyas llamadas deben serializarse (None = sin lock)
+            **kwargs: Argumentos con nombre
+
+        Returns:
+            Resultado de la función
+        """
+        call = partial(fn, *args, **kwargs)
+        if self._pool is None:
+            return self._execute(call, user_id, time.perf_counter())
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._pool, self._execute, call, user_id, time.perf_counter()
+        )
+
+    def shutdown(self) -> None:
+        """Esperar a las tareas en curso y cerrar el pool"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+
+    def get_statistics(self) -> Dict:
+        """Obtener estadísticas del executor"""
+        calls = self.stats['calls']
+        return {
+            **self.stats,
+            'max_workers': self.max_workers,
+            'lock_stripes': self.user_locks.stripes,
+            'avg_wait_ms': self.stats['total_wait_ms'] / calls if calls else 0.0,
+            'avg_run_ms': self.stats['total_run_ms'] / calls if calls else 0.0
+        }
@@ -0,0 +1,176 @@
+"""Servicio de Feedback - Cola asíncrona que agrupa feedback en micro-batches de aprendizaje"""
+import asyncio
+from typing import Dict, List, Optional
+import threading
+import time
+import logging
+
+from services.executor_service import RequestExecutor
+from services.stats_service import RunningStats
+
+logger = logging.getLogger(__name__)
+
+
+class FeedbackBatcher:
+    """Agrupa los lotes de feedback recibidos en micro-batches y los aprende en bloque"""
+
+    def __init__(self, agent, executor: RequestExecutor,
+                 max_batch_size: int = 5000, max_wait: float = 0.05):
+        """
+        Inicializar batcher
+
+        Las peticiones encolan sus eventos y esperan a su future. Una única
+        tarea consumidora junta lo que haya llegado (hasta max_batch_size
+        eventos o max_wait segundos) y lo aprende con una sola llamada a
+        `learn_from_feedback_batch`, fuera del event loop.
+
+        El micro-batch no toma los locks por usuario del executor: con miles
+        de usuarios ocuparía casi todos y frenaría las peticiones mientras
+        aprende. No hacen falta: cada decisión pendiente se consume de forma
+        atómica (un evento no se acredita dos veces aunque llegue a la vez por
+        la ruta individual) y el agente aplica las actualizaciones bajo su
+        propio lock.
+
+        Args:
+            agent: Agente (o dispatcher de shards) con learn_from_feedback_batch
+            executor: Executor donde se ejecuta el aprendizaje
+            max_batch_size: Eventos máximos por micro-batch
+            max_wait: Segundos máximos esperando a completar un micro-batch
+        """
+        self.agent = agent
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+        self._stats_lock = threading.Lock()
+        self.stats = {
+            'events_received': 0,
+            'events_applied': 0,
+            'events_rejected': 0,
+            'batches': 0,
+            'last_batch_size': 0,
+            'last_batch_ms': 0.0,
+            'last_events_per_sec': 0.0
+        }
+        self.batch_size_stats = RunningStats()
+        self.batch_ms_stats = RunningStats()
+
+        logger.info(f"FeedbackBatcher inicializado (max_batch_size={max_batch_size}, "
+                    f"max_wait={max_wait}s)")
+
+    def _ensure_worker(self) -> None:
+        """Crear la cola y la tarea consumidora en el event loop actual (al primer uso)"""
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, events: List[Dict]) -> Dict:
+        """
+        Encolar eventos de feedback y esperar al micro-batch que los aprende
+
+        Args:
+            events: Dicts con user_id, artist_id, feedback_type y, opcionalmente,
+                    recommendation_id y feedback_value
+
+        Returns:
+            Estado de cada evento y estadísticas del micro-batch que los procesó
+        """
+        if not events:
+            return {'statuses': [], 'batch': None}
+
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((events, future))
+        return await future
+
+    async def _run(self) -> None:
+        """Bucle consumidor: juntar envíos, aprender en bloque y repartir los resultados"""
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await self._queue.get()
+            if item is None:
+                return
+            pending = [item]
+            size = len(item[0])
+
+            # Completar el micro-batch con lo que llegue antes del plazo
+            deadline = loop.time() + self.max_wait
+            stopping = False
+            while size < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                pending.append(item)
+                size += len(item[0])
+
+            await self._process(pending)
+            if stopping:
+                return
+
+    async def _process(self, pending: List[tuple]) -> None:
+        """Aprender un micro-batch y resolver el future de cada envío"""
+        events = [event for submitted, _ in pending for event in submitted]
+        start = time.perf_counter()
+        try:
+            report = await self.executor.run(self.agent.learn_from_feedback_batch, events)
+        except Exception as e:
+            logger.error(f"Error aprendiendo micro-batch de feedback: {e}")
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        batch = {
+            'size': len(events),
+            'submissions': len(pending),
+            'applied': report['applied'],
+            'total_reward': report['total_reward'],
+            'elapsed_ms': elapsed_ms,
+            'events_per_sec': len(events) / (elapsed_ms / 1000) if elapsed_ms > 0 else 0.0
+        }
+        with self._stats_lock:
+            self.stats['events_received'] += len(events)
+            self.stats['events_applied'] += report['applied']
+            self.stats['events_rejected'] += len(events) - report['applied']
+            self.stats['batches'] += 1
+            self.stats['last_batch_size'] = len(events)
+            self.stats['last_batch_ms'] = elapsed_ms
+            self.stats['last_events_per_sec'] = batch['events_per_sec']
+            self.batch_size_stats.update(len(events))
+            self.batch_ms_stats.update(elapsed_ms)
+
+        offset = 0
+        for submitted, future in pending:
+            statuses = report['statuses'][offset:offset + len(submitted)]
+            offset += len(submitted)
+            if not future.done():
+                future.set_result({'statuses': statuses, 'batch': batch})
+
+    async def stop(self) -> None:
+        """Procesar lo encolado y detener la tarea consumidora"""
+        if self._worker is None or self._worker.done():
+            return
+        await self._queue.put(None)
+        await self._worker
+        self._worker = None
+
+    def get_statistics(self) -> Dict:
+        """Obtener estadísticas de throughput de los micro-batches"""
+        return {
+            **self.stats,
+            'max_batch_size': self.max_batch_size,
+            'max_wait': self.max_wait,
+            'avg_batch_size': self.batch_size_stats.mean,
+            'avg_batch_ms': self.batch_ms_stats.mean
+        }
@@ -0,0 +1,375 @@
+"""Servicio de Ingesta - Ingesta append-only de interacciones en micro-batches"""
+import pandas as pd
+import numpy as np
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+import threading
+import time
+import logging
+
+from repositories.data_repository import DataRepository
+from services.perception_service import PerceptionModule
+
+logger = logging.getLogger(__name__)
+
+INTERACTION_COLUMNS = ['userID', 'artistID', 'weight']
+FRIENDSHIP_COLUMNS = ['userID', 'friendID']
+TAG_COLUMNS = ['userID', 'artistID', 'tagID']
+
+
+class InteractionIngestionService:
+    """Ingesta de eventos de escucha con mantenimiento incremental de índices"""
+
+    def __init__(self, data_repository: DataRepository,
+                 perception_module: PerceptionModule,
+                 batch_size: int = 1000,
+                 flush_interval: float = 2.0):
+        """
+        Inicializar servicio de ingesta
+
+        Args:
+            data_repository: Repositorio de datos
+            perception_module: Módulo de percepción
+            batch_size: Número de eventos que dispara un flush inmediato
+            flush_interval: Segundos entre flushes del hilo en segundo plano
+        """
+        self.data_repository = data_repository
+        self.perception = perception_module
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        # Buffer de eventos pendientes
+        self._buffer: List[tuple] = []
+        self._buffer_lock = threading.Lock()
+        self._apply_lock = threading.Lock()
+
+        # Suscriptores notificados tras cada batch aplicado
+        self._listeners: List[Callable[[str, pd.DataFrame], None]] = []
+
+        # Ficheros en modo tail: ruta -> offset en bytes
+        self._tailed_files: Dict[Path, int] = {}
+
+        # Hilo de flush periódico
+        self._stop_event = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+
+        self.stats = {
+            'events_received': 0,
+            'events_applied': 0,
+            'events_rejected': 0,
+            'failed_batches': 0,
+            'batches_applied': 0,
+            'last_batch_size': 0,
+            'last_flush_ms': 0.0,
+            'last_flush_at': None
+        }
+
+        logger.info(f"InteractionIngestionService inicializado "
+                    f"(batch_size={batch_size}, flush_interval={flush_interval}s)")
+
+    def add_listener(self, listener: Callable[[str, pd.DataFrame], None]) -> None:
+        """
+        Registrar un suscriptor de batches aplicados
+
+        Args:
+            listener: Callable que recibe (tipo de datos, batch)
+        """
+        self._listeners.append(listener)
+
+    def unknown_ids(self, kind: str, batch: pd.DataFrame) -> Dict[str, List[int]]:
+        """
+        Obtener los artistID y tagID de un batch que no están en el catálogo
+
+        Las columnas de las matrices son el índice denso del catálogo: un ID
+        desconocido no tiene columna y no puede aplicarse.
+
+        Args:
+            kind: Tipo de batch ('interactions', 'friendships' o 'tags')
+            batch: DataFrame con las columnas del tipo correspondiente
+
+        Returns:
+            Diccionario columna -> IDs desconocidos (vacío si todo es válido)
+        """
+        unknown = {}
+        if kind in ('interactions', 'tags'):
+            artist_ids = batch['artistID'].to_numpy(dtype=np.int64)
+            missing = artist_ids[self.perception.matrices.artist_columns(artist_ids) < 0]
+            if len(missing):
+                unknown['artistID'] = np.unique(missing).tolist()
+        if kind == 'tags':
+            tag_ids = batch['tagID'].to_numpy(dtype=np.int64)
+            missing = tag_ids[~np.isin(tag_ids, self.perception.tag_ids)]
+            if len(missing):
+                unknown['tagID'] = np.unique(missing).tolist()
+        return unknown
+
+    def _validate(self, kind: str, batch: pd.DataFrame) -> None:
+        """Rechazar un batch con IDs fuera del catálogo (antes de tocar ningún estado)"""
+        unknown = self.unknown_ids(kind, batch)
+        if unknown:
+            self.stats['events_rejected'] += len(batch)
+            details = ', '.join(f"{column} {ids[:10]}" for column, ids in unknown.items())
+            raise ValueError(f"IDs fuera del catálogo: {details}")
+
+    def ingest(self, events: Iterable) -> int:
+        """
+        Encolar eventos de escucha
+
+        Los eventos se validan contra el catálogo antes de encolarlos: un
+        artistID desconocido rechaza la llamada entera y no llega al buffer.
+
+        Args:
+            events: Iterable de tuplas (userID, artistID, weight) o dicts con esas claves
+
+        Returns:
+            Número de eventos aceptados
+
+        Raises:
+            ValueError: Si algún artistID no está en el catálogo
+        """
+        rows = [
+            (int(e['userID']), int(e['artistID']), int(e['weight']))
+            if isinstance(e, dict) else (int(e[0]), int(e[1]), int(e[2]))
+            for e in events
+        ]
+        if not rows:
+            return 0
+        self._validate('interactions', pd.DataFrame(rows, columns=INTERACTION_COLUMNS))
+
+        with self._buffer_lock:
+            self._buffer.extend(rows)
+            self.stats['events_received'] += len(rows)
+            should_flush = len(self._buffer) >= self.batch_size
+
+        if should_flush:
+            self.flush()
+
+        return len(rows)
+
+    @property
+    def pending(self) -> int:
+        """Número de eventos pendientes de aplicar"""
+        return len(self._buffer)
+
+    def flush(self) -> int:
+        """
+        Aplicar los eventos pendientes como un micro-batch
+
+        Si el batch no se puede aplicar, sus eventos vuelven al principio del
+        buffer (el batch no se aplicó en absoluto) y se propaga el error.
+
+        Returns:
+            Número de eventos aplicados
+        """
+        with self._apply_lock:
+            with self._buffer_lock:
+                rows, self._buffer = self._buffer, []
+            if not rows:
+                return 0
+
+            start = time.perf_counter()
+            batch = pd.DataFrame(np.asarray(rows, dtype=np.int64), columns=INTERACTION_COLUMNS)
+
+            try:
+                self._apply_batch('interactions', batch)
+            except Exception:
+                with self._buffer_lock:
+                    self._buffer = rows + self._buffer
+                raise
+
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self.stats['events_applied'] += len(batch)
+            self.stats['batches_applied'] += 1
+            self.stats['last_batch_size'] = len(batch)
+            self.stats['last_flush_ms'] = elapsed_ms
+            self.stats['last_flush_at'] = time.time()
+
+        logger.info(f"Batch de {len(batch)} interacciones aplicado en {elapsed_ms:.1f} ms")
+
+        return len(batch)
+
+    def ingest_friendships(self, pairs: Iterable) -> int:
+        """
+        Aplicar nuevas relaciones de amistad (se aplican de inmediato, son poco frecuentes)
+
+        Args:
+            pairs: Iterable de tuplas (userID, friendID)
+
+        Returns:
+            Número de relaciones aplicadas
+        """
+        rows = [(int(user_id), int(friend_id)) for user_id, friend_id in pairs]
+        if not rows:
+            return 0
+
+        with self._apply_lock:
+            batch = pd.DataFrame(np.asarray(rows, dtype=np.int64), columns=FRIENDSHIP_COLUMNS)
+
+            self._apply_batch('friendships', batch)
+
+        logger.info(f"{len(batch)} relaciones de amistad aplicadas")
+
+        return len(batch)
+
+    def ingest_tags(self, assignments: Iterable) -> int:
+        """
+        Aplicar nuevas asignaciones de tags (se aplican de inmediato)
+
+        Args:
+            assignments: Iterable de tuplas (userID, artistID, tagID)
+
+        Returns:
+            Número de asignaciones aplicadas
+        """
+        rows = [(int(user_id), int(artist_id), int(tag_id))
+                for user_id, artist_id, tag_id in assignments]
+        if not rows:
+            return 0
+
+        with self._apply_lock:
+            batch = pd.DataFrame(np.asarray(rows, dtype=np.int64), columns=TAG_COLUMNS)
+            batch['date'] = pd.Timestamp.now().normalize()
+
+            self._apply_batch('tags', batch)
+
+        logger.info(f"{len(batch)} asignaciones de tags aplicadas")
+
+        return len(batch)
+
+    def apply_batch(self, kind: str, batch: pd.DataFrame) -> None:
+        """
+        Aplicar un batch ya construido (p.ej. recibido de otro proceso)
+
+        Args:
+            kind: Tipo de batch ('interactions', 'friendships' o 'tags')
+            batch: DataFrame con las columnas del tipo correspondiente
+        """
+        with self._apply_lock:
+            self._apply_batch(kind, batch)
+
+    def _apply_batch(self, kind: str, batch: pd.DataFrame) -> None:
+        """
+        Actualizar repositorio y percepción y notificar (requiere _apply_lock)
+
+        Todo o nada: se valida el batch, la percepción calcula sus cambios sin
+        publicarlos, el repositorio lo añade (calcula antes de modificar nada)
+        y por último la percepción publica con simples asignaciones. Si algo
+        falla antes de ese último paso, no queda nada aplicado.
+        """
+        if kind == 'interactions':
+            prepare, append = self.perception.prepare_interactions, self.data_repository.append_interactions
+        elif kind == 'friendships':
+            prepare, append = self.perception.prepare_friendships, self.data_repository.append_friendships
+        elif kind == 'tags':
+            prepare, append = self.perception.prepare_tags, self.data_repository.append_tags
+        else:
+            raise ValueError(f"Tipo de batch desconocido: {kind}")
+
+        self._validate(kind, batch)
+        try:
+            update = prepare(batch)
+            append(batch)
+        except Exception:
+            self.stats['failed_batches'] += 1
+            raise
+        self.perception.commit(update)
+
+        self._notify(kind, batch)
+
+    def _notify(self, kind: str, batch: pd.DataFrame) -> None:
+        """Notificar un batch aplicado a los suscriptores"""
+        for listener in self._listeners:
+            try:
+                listener(kind, batch)
+            except Exception as e:
+                logger.error(f"Error notificando batch de {kind}: {e}")
+
+    def tail_file(self, path: Path, from_end: bool = True) -> None:
+        """
+        Registrar un fichero .dat para leer las filas que se le vayan añadiendo
+
+        Args:
+            path: Ruta al fichero (formato userID\\tartistID\\tweight)
+            from_end: Empezar desde el final actual del fichero (las filas
+                existentes ya fueron cargadas por el repositorio)
+        """
+        path = Path(path)
+        self._tailed_files[path] = path.stat().st_size if from_end and path.exists() else 0
+        logger.info(f"Tail activado sobre {path} (offset={self._tailed_files[path]})")
+
+    def poll_tailed_files(self) -> int:
+        """
+        Leer las filas completas añadidas a los ficheros en modo tail
+
+        Returns:
+            Número de eventos leídos
+        """
+        total = 0
+        for path, offset in list(self._tailed_files.items()):
+            if not path.exists():
+                continue
+            with open(path, 'rb') as f:
+                f.seek(offset)
+                chunk = f.read()
+
+            # Solo consumir hasta la última línea completa
+            end = chunk.rfind(b'\n')
+            if end < 0:
+                continue
+            self._tailed_files[path] = offset + end + 1
+
+            events = []
+            for line in chunk[:end].decode('latin-1').splitlines():
+                fields = line.split('\t')
+                if len(fields) < 3 or not all(f.strip().isdigit() for f in fields[:3]):
+                    continue  # cabecera o fila malformada
+                events.append([int(f) for f in fields[:3]])
+
+            # Las filas con artistas fuera del catálogo se descartan sin parar el tail
+            if events:
+                known = self.perception.matrices.artist_columns([e[1] for e in events]) >= 0
+                if not known.all():
+                    rejected = int((~known).sum())
+                    self.stats['events_rejected'] += rejected
+                    logger.warning(f"{rejected} filas de {path} con artistID fuera del catálogo")
+                    events = [e for e, ok in zip(events, known) if ok]
+
+            if events:
+                total += self.ingest(events)
+
+        return total
+
+    def start(self) -> None:
+        """Arrancar el hilo de flush periódico"""
+        if self._worker is not None and self._worker.is_alive():
+            return
+        self._stop_event.clear()
+        self._worker = threading.Thread(
+            target=self._run, name="interaction-ingestion", daemon=True
+        )
+        self._worker.start()
+
+    def stop(self) -> None:
+        """Detener el hilo de flush y aplicar lo pendiente"""
+        self._stop_event.set()
+        if self._worker is not None:
+            self._worker.join(timeout=self.flush_interval * 2)
+            self._worker = None
+        self.flush()
+
+    def _run(self) -> None:
+        """Bucle del hilo: leer ficheros en tail y aplicar el buffer"""
+        while not self._stop_event.wait(self.flush_interval):
+            try:
+                self.poll_tailed_files()
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error en ingesta periódica: {e}")
+
+    def get_statistics(self) -> Dict:
+        """Obtener estadísticas de ingesta"""
+        return {
+            **self.stats,
+            'pending_events': self.pending,
+            'tailed_files': [str(p) for p in self._tailed_files]
+        }
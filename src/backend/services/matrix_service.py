@@ -0,0 +1,510 @@
+"""Servicio de Matrices - Matrices dispersas usuario×artista y de amistad"""
+import pandas as pd
+import numpy as np
+from scipy import sparse
+from typing import Dict, Iterable, List, NamedTuple, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def with_shape(matrix: sparse.csr_matrix, shape: tuple) -> sparse.csr_matrix:
+    """Misma matriz con más filas/columnas vacías (comparte data e indices)"""
+    extra_rows = shape[0] - matrix.shape[0]
+    indptr = np.concatenate([
+        matrix.indptr, np.full(extra_rows, matrix.indptr[-1], dtype=matrix.indptr.dtype)
+    ])
+    result = sparse.csr_matrix((matrix.data, matrix.indices, indptr), shape=shape)
+    result.has_sorted_indices = True
+    return result
+
+
+def add_entries(matrix: sparse.csr_matrix, rows: np.ndarray, cols: np.ndarray,
+                values: np.ndarray, binary: bool = False) -> sparse.csr_matrix:
+    """
+    Sumar valores a una CSR con índices ordenados sin reconstruirla
+
+    Los pares existentes se incrementan sobre una copia de `data`; los
+    nuevos se insertan en la posición que les corresponde dentro de su
+    fila con un único desplazamiento de los arrays, sin suma dispersa ni
+    conversión de formato.
+
+    Args:
+        matrix: Matriz CSR con índices ordenados
+        rows: Filas de cada entrada
+        cols: Columnas de cada entrada
+        values: Valores a sumar
+        binary: Matriz binaria (los pares existentes no se incrementan)
+
+    Returns:
+        Matriz nueva (la de entrada no se modifica; si nada cambia se devuelve tal cual)
+    """
+    n_cols = matrix.shape[1]
+    keys, inverse = np.unique(rows * n_cols + cols, return_inverse=True)
+    values = np.bincount(inverse, weights=values).astype(matrix.dtype)
+    rows, cols = keys // n_cols, keys % n_cols
+
+    indptr, indices = matrix.indptr, matrix.indices
+    positions = np.empty(len(keys), dtype=np.int64)
+    found = np.zeros(len(keys), dtype=bool)
+    row_starts = np.flatnonzero(np.r_[True, np.diff(rows) != 0])
+    for start, end in zip(row_starts, np.r_[row_starts[1:], len(keys)]):
+        row = rows[start]
+        segment = indices[indptr[row]:indptr[row + 1]]
+        offsets = np.searchsorted(segment, cols[start:end])
+        positions[start:end] = indptr[row] + offsets
+        found[start:end] = (offsets < len(segment)) & (
+            segment[np.minimum(offsets, max(len(segment) - 1, 0))] == cols[start:end]
+        ) if len(segment) else False
+
+    new = ~found
+    if not new.any():
+        if binary:
+            return matrix
+        data = matrix.data.copy()
+        data[positions] += values
+        result = sparse.csr_matrix((data, indices, indptr), shape=matrix.shape)
+        result.has_sorted_indices = True
+        return result
+
+    # Las posiciones existentes se desplazan por las inserciones anteriores o en su sitio
+    new_positions = positions[new]
+    data = np.insert(matrix.data, new_positions, values[new])
+    if not binary:
+        shifted = positions[found] + np.searchsorted(new_positions, positions[found], side='right')
+        data[shifted] += values[found]
+    indptr = indptr + np.r_[0, np.cumsum(np.bincount(rows[new], minlength=matrix.shape[0]))]
+
+    result = sparse.csr_matrix(
+        (data, np.insert(indices, new_positions, cols[new]), indptr), shape=matrix.shape
+    )
+    result.has_sorted_indices = True
+    return result
+
+
+class MatrixSet(NamedTuple):
+    """Matrices de un mismo estado: se publican juntas con una sola asignación"""
+    user_ids: np.ndarray  # fila -> userID
+    user_items: sparse.csr_matrix  # usuario × artista (columnas del índice denso de artistas)
+    friends: sparse.csr_matrix  # usuario × usuario (binaria y simétrica)
+    followers: sparse.csr_matrix  # traspuesta de friends
+
+    @property
+    def n_users(self) -> int:
+        return len(self.user_ids)
+
+
+class InteractionMatrices:
+    """Matrices dispersas de interacciones y amistades con índice de usuarios compartido"""
+
+    def __init__(self, user_ids: Iterable[int], user_artists: pd.DataFrame,
+                 user_friends: pd.DataFrame, chunk_size: int = 1024,
+                 artist_ids: Optional[Iterable[int]] = None):
+        """
+        Inicializar matrices
+
+        Las columnas de la matriz usuario×artista son un índice denso del
+        catálogo de artistas (`artist_ids` ordenados), así su ancho depende
+        del número de artistas y no del mayor artistID.
+
+        Las matrices no se modifican en su sitio: cada actualización construye
+        un MatrixSet nuevo (compartiendo los arrays que no cambian) y lo
+        publica con una sola asignación, de modo que los lectores siempre ven
+        formas e indptr coherentes entre sí.
+
+        Args:
+            user_ids: IDs de usuario iniciales (definen el orden de las filas)
+            user_artists: DataFrame de interacciones usuario-artista
+            user_friends: DataFrame de relaciones de amistad
+            chunk_size: Filas procesadas por bloque en los productos dispersos
+            artist_ids: Catálogo de artistas (se le añaden los de user_artists)
+        """
+        self.chunk_size = chunk_size
+
+        catalog = user_artists['artistID'].to_numpy(dtype=np.int64)
+        if artist_ids is not None:
+            catalog = np.concatenate([catalog, np.asarray(list(artist_ids), dtype=np.int64)])
+        self.artist_ids = np.unique(catalog)  # columna -> artistID
+
+        self.user_index: Dict[int, int] = {}
+        for source in (user_ids, user_friends['friendID'].unique(), user_artists['userID'].unique()):
+            for uid in source:
+                self.user_index.setdefault(int(uid), len(self.user_index))
+        all_user_ids = np.fromiter(self.user_index, dtype=np.int64, count=len(self.user_index))
+        n_users = len(all_user_ids)
+
+        # Usuario × artista (pesos = reproducciones)
+        user_items = self._to_csr(
+            self.get_rows(user_artists['userID']),
+            self.artist_columns(user_artists['artistID']),
+            user_artists['weight'].to_numpy(dtype=np.float32),
+            (n_users, self.n_artists)
+        )
+
+        # Usuario × usuario (adyacencia de amistad, binaria y simétrica como en Last.fm)
+        user_rows = self.get_rows(user_friends['userID'])
+        friend_rows = self.get_rows(user_friends['friendID'])
+        friends = self._to_csr(
+            np.concatenate([user_rows, friend_rows]),
+            np.concatenate([friend_rows, user_rows]),
+            np.ones(2 * len(user_friends), dtype=np.float32),
+            (n_users, n_users)
+        )
+        friends.data[:] = 1.0
+
+        # Traspuesta (quién tiene a cada usuario como amigo), mantenida a la par
+        followers = friends.T.tocsr()
+        followers.sort_indices()
+
+        self._current = MatrixSet(all_user_ids, user_items, friends, followers)
+
+        logger.info(f"InteractionMatrices inicializadas: {user_items.shape} interacciones, "
+                    f"{friends.nnz} amistades")
+
+    @staticmethod
+    def _to_csr(rows: np.ndarray, cols: np.ndarray, data: np.ndarray,
+                shape: tuple) -> sparse.csr_matrix:
+        """Construir una matriz CSR sumando duplicados"""
+        matrix = sparse.csr_matrix((data, (rows, cols)), shape=shape, dtype=np.float32)
+        matrix.sum_duplicates()
+        return matrix
+
+    @property
+    def current(self) -> MatrixSet:
+        """Matrices publicadas (leer una vez para usar varias de forma coherente)"""
+        return self._current
+
+    @property
+    def user_ids(self) -> np.ndarray:
+        """IDs de usuario en el orden de las filas"""
+        return self._current.user_ids
+
+    @property
+    def user_items(self) -> sparse.csr_matrix:
+        """Matriz usuario × artista publicada"""
+        return self._current.user_items
+
+    @property
+    def friends(self) -> sparse.csr_matrix:
+        """Adyacencia de amistad publicada"""
+        return self._current.friends
+
+    @property
+    def followers(self) -> sparse.csr_matrix:
+        """Traspuesta de la adyacencia de amistad publicada"""
+        return self._current.followers
+
+    @property
+    def n_users(self) -> int:
+        """Número de filas (usuarios) de las matrices"""
+        return self._current.n_users
+
+    @property
+    def n_artists(self) -> int:
+        """Número de columnas (artistas del catálogo) de la matriz usuario×artista"""
+        return len(self.artist_ids)
+
+    def artist_columns(self, artist_ids: Iterable[int]) -> np.ndarray:
+        """
+        Obtener la columna de cada artista
+
+        Args:
+            artist_ids: artistID
+
+        Returns:
+            Array de columnas (-1 para artistas fuera del catálogo)
+        """
+        artist_ids = np.asarray(artist_ids, dtype=np.int64)
+        if len(self.artist_ids) == 0:
+            return np.full(len(artist_ids), -1, dtype=np.int64)
+        cols = np.minimum(np.searchsorted(self.artist_ids, artist_ids), len(self.artist_ids) - 1)
+        return np.where(self.artist_ids[cols] == artist_ids, cols, -1)
+
+    def column_artists(self, columns: np.ndarray) -> np.ndarray:
+        """
+        Obtener el artistID de cada columna
+
+        Args:
+            columns: Columnas (los huecos -1 se conservan)
+
+        Returns:
+            Array de artistID (-1 en los huecos)
+        """
+        columns = np.asarray(columns)
+        return np.where(columns >= 0, self.artist_ids[np.maximum(columns, 0)], -1)
+
+    def stage_users(self, user_ids: Iterable[int], base: Optional[MatrixSet] = None) -> MatrixSet:
+        """
+        Preparar (sin publicar) las matrices con filas vacías para los usuarios nuevos
+
+        Args:
+            user_ids: IDs de usuario
+            base: Matrices de partida (None = las publicadas)
+
+        Returns:
+            MatrixSet con los usuarios que faltaban al final
+        """
+        base = base if base is not None else self._current
+        staged = self._staged_index(base)
+        new_users = []
+        for uid in user_ids:
+            uid = int(uid)
+            if uid not in self.user_index and uid not in staged:
+                staged[uid] = base.n_users + len(new_users)
+                new_users.append(uid)
+        if not new_users:
+            return base
+
+        n_users = base.n_users + len(new_users)
+        return MatrixSet(
+            np.concatenate([base.user_ids, np.asarray(new_users, dtype=np.int64)]),
+            with_shape(base.user_items, (n_users, base.user_items.shape[1])),
+            with_shape(base.friends, (n_users, n_users)),
+            with_shape(base.followers, (n_users, n_users))
+        )
+
+    def publish(self, matrix_set: MatrixSet) -> List[int]:
+        """
+        Publicar unas matrices preparadas y dar de alta a sus usuarios nuevos
+
+        Las escrituras deben estar serializadas (lock de la ingesta). Las
+        matrices se publican antes que las filas del índice, así ningún
+        lector obtiene una fila que aún no exista.
+
+        Args:
+            matrix_set: Matrices preparadas a partir de las publicadas
+
+        Returns:
+            Lista de usuarios añadidos
+        """
+        n_published = len(self.user_index)
+        new_users = matrix_set.user_ids[n_published:].tolist()
+        self._current = matrix_set
+        for row, uid in enumerate(new_users, start=n_published):
+            self.user_index[uid] = row
+        return new_users
+
+    def ensure_users(self, user_ids: Iterable[int]) -> List[int]:
+        """
+        Añadir al índice los usuarios que no existan
+
+        Args:
+            user_ids: IDs de usuario
+
+        Returns:
+            Lista de usuarios añadidos
+        """
+        staged = self.stage_users(user_ids)
+        if staged is self._current:
+            return []
+        return self.publish(staged)
+
+    def _staged_index(self, matrix_set: MatrixSet) -> Dict[int, int]:
+        """Filas de los usuarios preparados en `matrix_set` que aún no están en el índice"""
+        n_published = len(self.user_index)
+        return {
+            int(uid): row
+            for row, uid in enumerate(matrix_set.user_ids[n_published:].tolist(), start=n_published)
+        }
+
+    def get_rows(self, user_ids: Iterable[int], matrix_set: Optional[MatrixSet] = None) -> np.ndarray:
+        """
+        Obtener la fila de cada usuario
+
+        Args:
+            user_ids: IDs de usuario
+            matrix_set: Matrices preparadas cuyos usuarios nuevos también cuentan
+
+        Returns:
+            Array de filas (-1 para usuarios desconocidos)
+        """
+        index = self.user_index
+        if matrix_set is not None and matrix_set.n_users > len(index):
+            index = {**index, **self._staged_index(matrix_set)}
+        return np.fromiter(
+            (index.get(int(uid), -1) for uid in user_ids), dtype=np.int64
+        )
+
+    def friend_count(self, user_id: int) -> int:
+        """
+        Obtener el número de amigos de un usuario
+
+        Args:
+            user_id: ID del usuario
+
+        Returns:
+            Número de amigos (0 si el usuario no existe)
+        """
+        row = self.user_index.get(user_id)
+        if row is None:
+            return 0
+        indptr = self.friends.indptr
+        return int(indptr[row + 1] - indptr[row])
+
+    def followers_of(self, rows: np.ndarray, matrix_set: Optional[MatrixSet] = None) -> np.ndarray:
+        """
+        Obtener las filas de los usuarios que tienen como amigo a alguno de `rows`
+
+        Args:
+            rows: Filas de usuario
+            matrix_set: Matrices a consultar (None = las publicadas)
+
+        Returns:
+            Array de filas
+        """
+        if len(rows) == 0:
+            return np.empty(0, dtype=np.int64)
+        followers = (matrix_set or self._current).followers
+        return np.unique(followers[rows].indices).astype(np.int64)
+
+    def new_item_rows(self, rows: np.ndarray, columns: np.ndarray,
+                      matrix_set: Optional[MatrixSet] = None) -> np.ndarray:
+        """
+        Obtener la fila de cada par (fila, artista) distinto que aún no está en la matriz
+
+        Solo consulta los segmentos CSR de las filas del batch.
+
+        Args:
+            rows: Filas de usuario
+            columns: Columna del artista de cada par (artist_columns)
+            matrix_set: Matrices a consultar (None = las publicadas)
+
+        Returns:
+            Array con la fila de cada par nuevo
+        """
+        user_items = (matrix_set or self._current).user_items
+        pairs = np.unique(np.column_stack([rows, columns]), axis=0)
+        indptr, indices = user_items.indptr, user_items.indices
+
+        is_new = np.ones(len(pairs), dtype=bool)
+        row_starts = np.flatnonzero(np.r_[True, np.diff(pairs[:, 0]) != 0])
+        for start, end in zip(row_starts, np.r_[row_starts[1:], len(pairs)]):
+            row = pairs[start, 0]
+            if row >= len(indptr) - 1:
+                continue
+            known = indices[indptr[row]:indptr[row + 1]]
+            is_new[start:end] = ~np.isin(pairs[start:end, 1], known)
+        return pairs[is_new, 0]
+
+    def with_interactions(self, batch: pd.DataFrame,
+                          base: Optional[MatrixSet] = None) -> MatrixSet:
+        """
+        Preparar (sin publicar) las matrices con un batch de interacciones sumado
+
+        Args:
+            batch: DataFrame con columnas userID, artistID y weight
+            base: Matrices de partida (None = las publicadas)
+
+        Returns:
+            MatrixSet nuevo
+
+        Raises:
+            ValueError: Si algún artistID no está en el catálogo
+        """
+        columns = self.artist_columns(batch['artistID'])
+        if (columns < 0).any():
+            unknown = np.unique(batch['artistID'].to_numpy()[columns < 0])
+            raise ValueError(f"artistID fuera del catálogo: {unknown[:10].tolist()}")
+
+        base = self.stage_users(batch['userID'].unique().tolist(), base)
+        user_items = add_entries(
+            base.user_items,
+            self.get_rows(batch['userID'], base),
+            columns,
+            batch['weight'].to_numpy(dtype=np.float64)
+        )
+        return base._replace(user_items=user_items)
+
+    def with_friendships(self, batch: pd.DataFrame,
+                         base: Optional[MatrixSet] = None) -> MatrixSet:
+        """
+        Preparar (sin publicar) las matrices con relaciones de amistad añadidas
+
+        Se añaden en ambos sentidos; las ya existentes se ignoran.
+
+        Args:
+            batch: DataFrame con columnas userID y friendID
+            base: Matrices de partida (None = las publicadas)
+
+        Returns:
+            MatrixSet nuevo
+        """
+        base = self.stage_users(batch['userID'].unique().tolist(), base)
+        base = self.stage_users(batch['friendID'].unique().tolist(), base)
+
+        user_rows = self.get_rows(batch['userID'], base)
+        friend_rows = self.get_rows(batch['friendID'], base)
+        rows = np.concatenate([user_rows, friend_rows])
+        cols = np.concatenate([friend_rows, user_rows])
+        ones = np.ones(len(rows))
+        return base._replace(
+            friends=add_entries(base.friends, rows, cols, ones, binary=True),
+            followers=add_entries(base.followers, cols, rows, ones, binary=True)
+        )
+
+    def affected_rows(self, kind: str, batch, matrix_set: Optional[MatrixSet] = None) -> np.ndarray:
+        """
+        Obtener las filas cuyas señales derivadas cambian con un batch ya aplicado
+
+        Las interacciones de un usuario afectan también a quienes lo tienen
+        como amigo; una amistad afecta a sus dos extremos y los tags solo al
+        propio usuario.
+
+        Args:
+            kind: Tipo de batch ('interactions', 'friendships' o 'tags')
+            batch: DataFrame con al menos la columna userID
+            matrix_set: Matrices con el batch aplicado (None = las publicadas)
+
+        Returns:
+            Array de filas
+        """
+        users = batch['userID'].unique()
+        if kind == 'friendships':
+            users = np.union1d(users, batch['friendID'].unique())
+        rows = np.unique(self.get_rows(users, matrix_set))
+        rows = rows[rows >= 0]
+        if kind == 'interactions':
+            rows = np.union1d(rows, self.followers_of(rows, matrix_set))
+        return rows
+
+    def social_alignment(self, rows: np.ndarray, matrix_set: Optional[MatrixSet] = None) -> np.ndarray:
+        """
+        Calcular el Jaccard entre los artistas de cada usuario y la unión de los de sus amigos
+
+        Por bloques de `chunk_size` filas: unión de amigos = adyacencia × items,
+        intersección = items ⊙ unión. Solo se extraen las filas del bloque y
+        las de sus amigos.
+
+        Args:
+            rows: Filas de usuario
+            matrix_set: Matrices a usar (None = las publicadas)
+
+        Returns:
+            Array con la alineación social de cada fila
+        """
+        matrix_set = matrix_set or self._current
+        items = matrix_set.user_items
+
+        alignment = np.zeros(len(rows), dtype=np.float64)
+        for start in range(0, len(rows), self.chunk_size):
+            chunk = rows[start:start + self.chunk_size]
+
+            own = items[chunk]
+            own.data[:] = 1.0
+            adjacency = matrix_set.friends[chunk]
+            friend_rows = np.unique(adjacency.indices)
+            friend_items = items[friend_rows]
+            friend_items.data[:] = 1.0
+            friends_music = adjacency[:, friend_rows] @ friend_items
+
+            n_own = own.getnnz(axis=1)
+            n_friends = friends_music.getnnz(axis=1)
+            n_common = own.multiply(friends_music).getnnz(axis=1)
+
+            union = n_own + n_friends - n_common
+            valid = (n_own > 0) & (n_friends > 0)
+            alignment[start:start + len(chunk)] = np.where(
+                valid, n_common / np.maximum(union, 1), 0.0
+            )
+
+        return alignment
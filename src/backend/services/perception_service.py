@@ -1,126 +1,466 @@
 """Servicio de Percepción - Módulo de percepción multimodal"""
 import pandas as pd
 import numpy as np
-from typing import Dict
+from typing import Dict, List, NamedTuple, Optional
 import logging
 
+from services.matrix_service import InteractionMatrices, MatrixSet
+from services.cache_service import TTLCache
+
 logger = logging.getLogger(__name__)
 
+# Espacio de claves para codificar pares (usuario, artista) en un int64
+PAIR_KEY_SPACE = 1 << 32
+
+# Columnas de la matriz de estado de usuarios
+STATE_FEATURES = (
+    'music_engagement',
+    'music_diversity',
+    'music_intensity',
+    'social_connectivity',
+    'social_alignment',
+    'semantic_activity',
+    'semantic_diversity',
+    'overall_sophistication'
+)
+
+# Acumuladores por usuario (columnas de los arrays de estadísticas)
+MUSIC_STATS = ('total_plays', 'total_interactions', 'unique_artists')
+SEMANTIC_STATS = ('total_tags', 'unique_tags', 'tagged_artists')
+
+
+class PerceptionUpdate(NamedTuple):
+    """Cambios de un batch calculados sin tocar el estado publicado (ver PerceptionModule.commit)"""
+    matrices: MatrixSet  # matrices con el batch aplicado, aún sin publicar
+    rows: np.ndarray  # filas cuyo estado cambia (únicas y ordenadas)
+    music_delta: np.ndarray  # (len(rows), len(MUSIC_STATS))
+    semantic_delta: np.ndarray  # (len(rows), len(SEMANTIC_STATS))
+    states: np.ndarray  # estado nuevo de cada fila
+    tag_pair_keys: List[int]  # pares (usuario, tag) nuevos
+    tagged_artist_keys: List[int]  # pares (usuario, artista etiquetado) nuevos
+
 
 class PerceptionModule:
     """Módulo de percepción multimodal para análisis de usuarios"""
     
     def __init__(self, user_artists: pd.DataFrame, user_friends: pd.DataFrame,
-                 user_tagged: pd.DataFrame, artists: pd.DataFrame, tags: pd.DataFrame):
+                 user_tagged: pd.DataFrame, artists: pd.DataFrame, tags: pd.DataFrame,
+                 alignment_chunk_size: int = 1024,
+                 state_cache_size: int = 10000,
+                 state_cache_ttl: Optional[float] = 300.0):
         """
         Inicializar módulo de percepción
         
+        Las tablas de interacciones, amistades y tags solo se leen aquí: a
+        partir de entonces los micro-batches actualizan los acumuladores por
+        usuario y las matrices dispersas sin volver a recorrerlas.
+        
         Args:
             user_artists: DataFrame de interacciones usuario-artista
             user_friends: DataFrame de relaciones de amistad
             user_tagged: DataFrame de tags asignados
             artists: DataFrame de artistas
             tags: DataFrame de tags
+            alignment_chunk_size: Usuarios por bloque al calcular la alineación social
+            state_cache_size: Número máximo de estados de usuario en caché
+            state_cache_ttl: Segundos de validez de un estado en caché (None = sin expiración)
         """
-        self.user_artists = user_artists
-        self.user_friends = user_friends
-        self.user_tagged = user_tagged
+        self.alignment_chunk_size = alignment_chunk_size
+        self.state_cache = TTLCache(maxsize=state_cache_size, ttl=state_cache_ttl)
         self.artists = artists
         self.tags = tags
+        # Catálogo de tags (los batches con tags desconocidos se rechazan en la ingesta)
+        self.tag_ids = np.union1d(tags['tagID'].to_numpy(), user_tagged['tagID'].unique())
+        
+        # Las matrices dispersas definen el índice usuario -> fila compartido
+        user_ids = np.union1d(
+            np.union1d(user_artists['userID'].unique(), user_friends['userID'].unique()),
+            np.union1d(user_friends['friendID'].unique(), user_tagged['userID'].unique())
+        )
+        # Catálogo de artistas = columnas densas de la matriz usuario×artista
+        artist_ids = np.union1d(artists['id'].to_numpy(), user_tagged['artistID'].unique())
+        self.matrices = InteractionMatrices(
+            user_ids, user_artists, user_friends, self.alignment_chunk_size,
+            artist_ids=artist_ids
+        )
+        self.user_index = self.matrices.user_index
         
         # Pre-computar métricas para eficiencia
-        self._precompute_statistics()
+        self._precompute_statistics(user_artists, user_tagged)
+        self.user_state_matrix = self._compute_states(self.user_ids)
         
         logger.info("PerceptionModule inicializado con estadísticas pre-computadas")
     
-    def _precompute_statistics(self) -> None:
-        """Pre-computar estadísticas de usuarios para eficiencia"""
-        # Estadísticas musicales
-        self.user_music_stats = self.user_artists.groupby('userID').agg({
-            'weight': ['sum', 'count', 'mean', 'std'],
-            'artistID': 'nunique'
-        }).fillna(0)
-        self.user_music_stats.columns = [
-            'total_plays', 'total_interactions', 'avg_plays', 'std_plays', 'unique_artists'
-        ]
+    def _precompute_statistics(self, user_artists: pd.DataFrame,
+                               user_tagged: pd.DataFrame) -> None:
+        """
+        Pre-computar los acumuladores por usuario, alineados con las filas de las matrices
+        
+        Se guardan como arrays (fila de usuario × columna) para que cada
+        micro-batch los actualice en su sitio.
+        """
+        self._stats_capacity = 0
+        self._music_stats = np.zeros((0, len(MUSIC_STATS)))
+        self._semantic_stats = np.zeros((0, len(SEMANTIC_STATS)))
+        self._state_versions = np.zeros(0, dtype=np.int64)
+        self._ensure_stats_capacity()
+        
+        # Estadísticas musicales (los artistas distintos salen de la matriz usuario×artista)
+        music = user_artists.groupby('userID')['weight'].agg(['sum', 'count'])
+        rows = self.matrices.get_rows(music.index)
+        self._music_stats[rows, 0] = music['sum'].to_numpy()
+        self._music_stats[rows, 1] = music['count'].to_numpy()
+        self._music_stats[:self.matrices.n_users, 2] = np.diff(self.matrices.user_items.indptr)
         
-        # Estadísticas sociales
-        self.user_social_stats = self.user_friends.groupby('userID').size().to_frame('num_friends')
+        # El número de amigos sale de la adyacencia (binaria y sin duplicados)
         
         # Estadísticas semánticas
-        self.user_semantic_stats = self.user_tagged.groupby('userID').agg({
+        semantic = user_tagged.groupby('userID').agg({
             'tagID': ['count', 'nunique'],
             'artistID': 'nunique'
-        }).fillna(0)
-        self.user_semantic_stats.columns = ['total_tags', 'unique_tags', 'tagged_artists']
+        })
+        self._semantic_stats[self.matrices.get_rows(semantic.index)] = semantic.to_numpy()
+        self._tag_pair_keys = set(self._encode_pairs(user_tagged, 'tagID').tolist())
+        self._tagged_artist_keys = set(self._encode_pairs(user_tagged, 'artistID').tolist())
     
-    def get_user_state(self, user_id: int) -> Dict:
+    def _ensure_stats_capacity(self, n_users: Optional[int] = None) -> None:
+        """Ampliar (duplicando) los arrays de acumuladores si hay usuarios nuevos"""
+        n_users = self.matrices.n_users if n_users is None else n_users
+        if n_users <= self._stats_capacity:
+            return
+        capacity = max(n_users, 2 * self._stats_capacity)
+        for attr in ('_music_stats', '_semantic_stats'):
+            current = getattr(self, attr)
+            grown = np.zeros((capacity, current.shape[1]))
+            grown[:len(current)] = current
+            setattr(self, attr, grown)
+        versions = np.zeros(capacity, dtype=np.int64)
+        versions[:len(self._state_versions)] = self._state_versions
+        self._state_versions = versions
+        self._stats_capacity = capacity
+    
+    @staticmethod
+    def _encode_pairs(frame: pd.DataFrame, column: str) -> np.ndarray:
+        """Codificar pares (userID, column) como claves int64"""
+        return (frame['userID'].to_numpy(dtype=np.int64) * PAIR_KEY_SPACE
+                + frame[column].to_numpy(dtype=np.int64))
+    
+    def _new_pair_keys(self, seen: set, batch: pd.DataFrame, column: str) -> np.ndarray:
+        """Claves (userID, column) del batch que aún no están en `seen` (sin registrarlas)"""
+        keys = np.unique(self._encode_pairs(batch, column))
+        return np.asarray([key for key in keys.tolist() if key not in seen], dtype=np.int64)
+    
+    @staticmethod
+    def _stats_rows(stats: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        """Filas de un array de acumuladores (ceros para las que aún no tienen capacidad)"""
+        values = np.zeros((len(rows), stats.shape[1]))
+        present = rows < len(stats)
+        values[present] = stats[rows[present]]
+        return values
+    
+    def prepare_interactions(self, batch: pd.DataFrame) -> PerceptionUpdate:
         """
-        Obtener estado unificado del usuario
+        Calcular el efecto de un micro-batch de interacciones sin publicarlo
+        
+        Produce el mismo resultado que re-ejecutar el groupby sobre la tabla
+        completa, pero solo toca las filas de los usuarios del batch y de
+        quienes los tienen como amigo (su alineación social cambia).
         
         Args:
-            user_id: ID del usuario
+            batch: DataFrame con columnas userID, artistID y weight
+            
+        Returns:
+            Cambios a aplicar con commit
+        
+        Raises:
+            ValueError: Si algún artistID no está en el catálogo
+        """
+        matrix_set = self.matrices.with_interactions(batch)
+        rows = self.matrices.get_rows(batch['userID'], matrix_set)
+        affected = self.matrices.affected_rows('interactions', batch, matrix_set)
+        
+        # Pares (usuario, artista) nuevos -> incrementan unique_artists
+        new_rows = self.matrices.new_item_rows(rows, self.matrices.artist_columns(batch['artistID']))
+        
+        music_delta = np.zeros((len(affected), len(MUSIC_STATS)))
+        positions = np.searchsorted(affected, rows)
+        np.add.at(music_delta[:, 0], positions, batch['weight'].to_numpy(dtype=np.float64))
+        np.add.at(music_delta[:, 1], positions, 1.0)
+        np.add.at(music_delta[:, 2], np.searchsorted(affected, new_rows), 1.0)
+        
+        return self._prepare(matrix_set, affected, music_delta=music_delta)
+    
+    def prepare_tags(self, batch: pd.DataFrame) -> PerceptionUpdate:
+        """
+        Calcular el efecto de nuevas asignaciones de tags sin publicarlo
+        
+        Args:
+            batch: DataFrame con columnas userID, artistID y tagID
+            
+        Returns:
+            Cambios a aplicar con commit
+        """
+        matrix_set = self.matrices.stage_users(batch['userID'].unique().tolist())
+        rows = self.matrices.get_rows(batch['userID'], matrix_set)
+        affected = np.unique(rows)
+        
+        tag_keys = self._new_pair_keys(self._tag_pair_keys, batch, 'tagID')
+        artist_keys = self._new_pair_keys(self._tagged_artist_keys, batch, 'artistID')
+        
+        semantic_delta = np.zeros((len(affected), len(SEMANTIC_STATS)))
+        np.add.at(semantic_delta[:, 0], np.searchsorted(affected, rows), 1.0)
+        for column, keys in ((1, tag_keys), (2, artist_keys)):
+            key_rows = self.matrices.get_rows(keys // PAIR_KEY_SPACE, matrix_set)
+            np.add.at(semantic_delta[:, column], np.searchsorted(affected, key_rows), 1.0)
+        
+        return self._prepare(matrix_set, affected, semantic_delta=semantic_delta,
+                             tag_pair_keys=tag_keys.tolist(),
+                             tagged_artist_keys=artist_keys.tolist())
+    
+    def prepare_friendships(self, batch: pd.DataFrame) -> PerceptionUpdate:
+        """
+        Calcular el efecto de nuevas amistades sin publicarlo
+        
+        Args:
+            batch: DataFrame con columnas userID y friendID
+            
+        Returns:
+            Cambios a aplicar con commit
+        """
+        matrix_set = self.matrices.with_friendships(batch)
+        affected = self.matrices.affected_rows('friendships', batch, matrix_set)
+        return self._prepare(matrix_set, affected)
+    
+    def _prepare(self, matrix_set: MatrixSet, rows: np.ndarray,
+                 music_delta: Optional[np.ndarray] = None,
+                 semantic_delta: Optional[np.ndarray] = None,
+                 tag_pair_keys: List[int] = (),
+                 tagged_artist_keys: List[int] = ()) -> PerceptionUpdate:
+        """Calcular los estados nuevos de `rows` con las matrices y acumuladores preparados"""
+        if music_delta is None:
+            music_delta = np.zeros((len(rows), len(MUSIC_STATS)))
+        if semantic_delta is None:
+            semantic_delta = np.zeros((len(rows), len(SEMANTIC_STATS)))
+        
+        states = self._compute_state_rows(
+            rows,
+            self._stats_rows(self._music_stats, rows) + music_delta,
+            self._stats_rows(self._semantic_stats, rows) + semantic_delta,
+            matrix_set
+        )
+        
+        # Ampliar los arrays ya: no cambia ningún valor y deja a commit solo asignaciones
+        self._ensure_stats_capacity(matrix_set.n_users)
+        missing_rows = matrix_set.n_users - len(self.user_state_matrix)
+        if missing_rows > 0:
+            self.user_state_matrix = np.vstack([
+                self.user_state_matrix,
+                np.zeros((missing_rows, len(STATE_FEATURES)), dtype=np.float32)
+            ])
+        
+        return PerceptionUpdate(matrix_set, rows, music_delta, semantic_delta, states,
+                                list(tag_pair_keys), list(tagged_artist_keys))
+    
+    def commit(self, update: PerceptionUpdate) -> List[int]:
+        """
+        Publicar los cambios calculados por un prepare_*
+        
+        Solo hace asignaciones sobre arrays ya dimensionados: un batch se
+        aplica entero o (si falla su prepare) no se aplica. Las escrituras
+        deben estar serializadas (lock de la ingesta).
+        
+        Args:
+            update: Cambios devueltos por prepare_interactions, prepare_tags o prepare_friendships
+            
+        Returns:
+            Lista de usuarios cuyo estado cambió
+        """
+        rows = update.rows
+        self._music_stats[rows] += update.music_delta
+        self._semantic_stats[rows] += update.semantic_delta
+        self._tag_pair_keys.update(update.tag_pair_keys)
+        self._tagged_artist_keys.update(update.tagged_artist_keys)
+        self.user_state_matrix[rows] = update.states
+        
+        # Las matrices se publican después de las filas de estado que usan sus usuarios nuevos
+        self.matrices.publish(update.matrices)
+        
+        # La versión se sube después de escribir la fila: una lectura concurrente
+        # que guarde el estado anterior queda con versión antigua y no se sirve
+        self._state_versions[rows] += 1
+        affected = self.user_ids[rows].tolist()
+        self.state_cache.invalidate(affected)
+        
+        return affected
+    
+    def apply_interactions(self, batch: pd.DataFrame) -> List[int]:
+        """
+        Actualizar incrementalmente las estadísticas musicales con un micro-batch
+        
+        Args:
+            batch: DataFrame con columnas userID, artistID y weight
+            
+        Returns:
+            Lista de usuarios cuyo estado cambió
+        """
+        if len(batch) == 0:
+            return []
+        return self.commit(self.prepare_interactions(batch))
+    
+    def apply_tags(self, batch: pd.DataFrame) -> List[int]:
+        """
+        Actualizar incrementalmente las estadísticas semánticas con nuevos tags
+        
+        Args:
+            batch: DataFrame con columnas userID, artistID y tagID
+            
+        Returns:
+            Lista de usuarios cuyo estado cambió
+        """
+        if len(batch) == 0:
+            return []
+        return self.commit(self.prepare_tags(batch))
+    
+    def apply_friendships(self, batch: pd.DataFrame) -> List[int]:
+        """
+        Actualizar incrementalmente las señales sociales con nuevas amistades
+        
+        Args:
+            batch: DataFrame con columnas userID y friendID
+            
+        Returns:
+            Lista de usuarios cuyo estado cambió
+        """
+        if len(batch) == 0:
+            return []
+        return self.commit(self.prepare_friendships(batch))
+    
+    @property
+    def user_ids(self) -> np.ndarray:
+        """IDs de usuario en el orden de las filas de la matriz de estado"""
+        return self.matrices.user_ids
+    
+    def _compute_states(self, user_ids: np.ndarray) -> np.ndarray:
+        """
+        Calcular el estado de un conjunto de usuarios con operaciones vectorizadas
+        
+        Args:
+            user_ids: Array de IDs de usuario
+            
+        Returns:
+            Matriz (len(user_ids), len(STATE_FEATURES)) en float32
+        """
+        rows = self.get_user_rows(user_ids)
+        return self._compute_state_rows(
+            rows, self._music_stats[rows], self._semantic_stats[rows], self.matrices.current
+        )
+    
+    def _compute_state_rows(self, rows: np.ndarray, music: np.ndarray, semantic: np.ndarray,
+                            matrix_set: MatrixSet) -> np.ndarray:
+        """
+        Calcular el estado de unas filas a partir de sus acumuladores y unas matrices
+        
+        Args:
+            rows: Filas de usuario en `matrix_set`
+            music: Acumuladores musicales de las filas (MUSIC_STATS)
+            semantic: Acumuladores semánticos de las filas (SEMANTIC_STATS)
+            matrix_set: Matrices (publicadas o preparadas)
             
         Returns:
-            Diccionario con el estado del usuario
+            Matriz (len(rows), len(STATE_FEATURES)) en float32
         """
-        state = {'user_id': user_id}
+        num_friends = np.diff(matrix_set.friends.indptr)[rows]
+        
+        states = np.empty((len(rows), len(STATE_FEATURES)), dtype=np.float64)
         
         # Señales musicales
-        if user_id in self.user_music_stats.index:
-            music_data = self.user_music_stats.loc[user_id]
-            state['music_engagement'] = min(1.0, music_data['total_plays'] / 10000)
-            state['music_diversity'] = min(1.0, music_data['unique_artists'] / 200)
-            state['music_intensity'] = min(1.0, music_data['avg_plays'] / 500)
-        else:
-            state.update({
-                'music_engagement': 0.0,
-                'music_diversity': 0.0,
-                'music_intensity': 0.0
-            })
+        total_plays, total_interactions = music[:, 0], music[:, 1]
+        avg_plays = np.divide(total_plays, total_interactions,
+                              out=np.zeros_like(total_plays), where=total_interactions > 0)
+        states[:, 0] = np.minimum(1.0, total_plays / 10000)
+        states[:, 1] = np.minimum(1.0, music[:, 2] / 200)
+        states[:, 2] = np.minimum(1.0, avg_plays / 500)
         
         # Señales sociales
-        if user_id in self.user_social_stats.index:
-            social_data = self.user_social_stats.loc[user_id]
-            state['social_connectivity'] = min(1.0, social_data['num_friends'] / 20)
-            
-            # Calcular overlap musical con amigos
-            friends = self.user_friends[self.user_friends['userID'] == user_id]['friendID'].tolist()
-            if friends:
-                user_music = set(self.user_artists[self.user_artists['userID'] == user_id]['artistID'])
-                friends_music = set(self.user_artists[self.user_artists['userID'].isin(friends)]['artistID'])
-                if user_music and friends_music:
-                    overlap = len(user_music.intersection(friends_music)) / len(user_music.union(friends_music))
-                    state['social_alignment'] = overlap
-                else:
-                    state['social_alignment'] = 0.0
-            else:
-                state['social_alignment'] = 0.0
-        else:
-            state.update({
-                'social_connectivity': 0.0,
-                'social_alignment': 0.0
-            })
+        states[:, 3] = np.minimum(1.0, num_friends / 20)
+        states[:, 4] = self.matrices.social_alignment(rows, matrix_set)
         
         # Señales semánticas
-        if user_id in self.user_semantic_stats.index:
-            semantic_data = self.user_semantic_stats.loc[user_id]
-            state['semantic_activity'] = min(1.0, semantic_data['total_tags'] / 200)
-            state['semantic_diversity'] = min(1.0, semantic_data['unique_tags'] / 50)
-        else:
-            state.update({
-                'semantic_activity': 0.0,
-                'semantic_diversity': 0.0
-            })
+        states[:, 5] = np.minimum(1.0, semantic[:, 0] / 200)
+        states[:, 6] = np.minimum(1.0, semantic[:, 1] / 50)
         
         # Score compuesto
-        state['overall_sophistication'] = np.mean([
-            state['music_diversity'],
-            state['social_connectivity'],
-            state['semantic_diversity']
-        ])
+        states[:, 7] = states[:, [1, 3, 6]].mean(axis=1)
+        
+        return states.astype(np.float32)
+    
+    def affected_users(self, kind: str, batch) -> List[int]:
+        """
+        Obtener los usuarios cuyo estado cambia con un batch ya aplicado
+        
+        Args:
+            kind: Tipo de batch ('interactions', 'friendships' o 'tags')
+            batch: DataFrame del batch aplicado
+            
+        Returns:
+            Lista de IDs de usuario
+        """
+        return self.user_ids[self.matrices.affected_rows(kind, batch)].tolist()
+    
+    def get_user_rows(self, user_ids) -> np.ndarray:
+        """
+        Obtener la fila de la matriz de estado de cada usuario
+        
+        Args:
+            user_ids: Iterable de IDs de usuario
+            
+        Returns:
+            Array de filas (-1 para usuarios desconocidos)
+        """
+        return np.fromiter(
+            (self.user_index.get(int(uid), -1) for uid in user_ids), dtype=np.int64
+        )
+    
+    def get_user_states(self, user_ids) -> np.ndarray:
+        """
+        Obtener el estado de varios usuarios en un solo acceso
+        
+        Args:
+            user_ids: Iterable de IDs de usuario
+            
+        Returns:
+            Matriz (n_usuarios, len(STATE_FEATURES)); ceros para usuarios desconocidos
+        """
+        rows = self.get_user_rows(user_ids)
+        states = self.user_state_matrix[np.maximum(rows, 0)]
+        states[rows < 0] = 0.0
+        return states
+    
+    def get_user_state(self, user_id: int) -> Dict:
+        """
+        Obtener estado unificado del usuario
+        
+        Args:
+            user_id: ID del usuario
+            
+        Returns:
+            Diccionario con el estado del usuario (compartido con la caché: no modificar)
+        """
+        # Las entradas guardan la versión de la fila leída; solo valen si sigue vigente
+        row = self.user_index.get(user_id)
+        version = int(self._state_versions[row]) if row is not None else 0
+        entry = self.state_cache.get(user_id)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        
+        if row is None:
+            values = [0.0] * len(STATE_FEATURES)
+        else:
+            values = self.user_state_matrix[row].tolist()
+        
+        state = {'user_id': user_id, **dict(zip(STATE_FEATURES, values))}
+        self.state_cache.put(user_id, (version, state))
         
         logger.debug(f"Estado del usuario {user_id}: sophistication={state['overall_sophistication']:.2f}")
         
         return state
-
@@ -0,0 +1,277 @@
+"""Servicio de Persistencia - Log binario append-only y snapshots del estado del bandit"""
+import numpy as np
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import os
+import re
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Registro del log: una actualización del bandit (22 bytes, sin padding)
+LOG_DTYPE = np.dtype([
+    ('user_id', '<i8'),
+    ('arm', '<i2'),
+    ('reward', '<f4'),
+    ('timestamp', '<f8')
+])
+
+SNAPSHOT_FILE = 'bandit-snapshot.npz'
+_LOG_PATTERN = re.compile(r'^bandit-(\d{8})\.wal$')
+
+
+class BanditPersistence:
+    """Write-ahead log por batches y snapshots compactos del estado del agente"""
+
+    def __init__(self, directory: Path, flush_batch_size: int = 256,
+                 flush_interval: float = 1.0, snapshot_interval: int = 50000,
+                 fsync: bool = False):
+        """
+        Inicializar persistencia
+
+        El log se reparte en generaciones (`bandit-<gen>.wal`). Cada snapshot
+        abre una generación nueva y guarda su número: al recuperar se carga el
+        snapshot y solo se reproducen los logs de esa generación en adelante,
+        así que una caída entre snapshot y borrado no duplica actualizaciones.
+        Un hilo (ver start) escribe el buffer cada flush_interval aunque no
+        lleguen más actualizaciones.
+
+        Args:
+            directory: Directorio de los ficheros
+            flush_batch_size: Registros acumulados que fuerzan una escritura
+            flush_interval: Segundos máximos entre escrituras del buffer
+            snapshot_interval: Actualizaciones entre snapshots automáticos
+            fsync: Forzar fsync tras cada escritura del log
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.flush_batch_size = flush_batch_size
+        self.flush_interval = flush_interval
+        self.snapshot_interval = snapshot_interval
+        self.fsync = fsync
+
+        self._buffer: List[np.ndarray] = []
+        self._buffered = 0
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._updates_since_snapshot = 0
+        self._stop_event = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+
+        self.generation = max(self._log_generations() + [self._snapshot_generation()])
+        self._log_file = None
+
+        self.stats = {
+            'records_written': 0,
+            'log_flushes': 0,
+            'periodic_flushes': 0,
+            'snapshots_written': 0,
+            'last_snapshot_ms': 0.0,
+            'last_snapshot_at': None,
+            'recovery': None
+        }
+
+        logger.info(f"BanditPersistence inicializada en {self.directory} "
+                    f"(generación {self.generation})")
+
+    @property
+    def snapshot_path(self) -> Path:
+        return self.directory / SNAPSHOT_FILE
+
+    def _log_path(self, generation: int) -> Path:
+        return self.directory / f"bandit-{generation:08d}.wal"
+
+    def _log_generations(self) -> List[int]:
+        """Generaciones de log presentes en disco, ordenadas"""
+        generations = []
+        for path in self.directory.iterdir():
+            match = _LOG_PATTERN.match(path.name)
+            if match:
+                generations.append(int(match.group(1)))
+        return sorted(generations)
+
+    def _snapshot_generation(self) -> int:
+        """Generación registrada en el snapshot (0 si no existe)"""
+        if not self.snapshot_path.exists():
+            return 0
+        with np.load(self.snapshot_path) as snapshot:
+            return int(snapshot['meta_generation'])
+
+    def _open_log(self) -> None:
+        if self._log_file is None:
+            self._log_file = open(self._log_path(self.generation), 'ab')
+
+    def append(self, user_ids: np.ndarray, arms: np.ndarray, rewards: np.ndarray) -> None:
+        """
+        Añadir actualizaciones al log (se escriben en batches)
+
+        Args:
+            user_ids: IDs de usuario
+            arms: Brazos jugados
+            rewards: Recompensas recibidas
+        """
+        records = np.empty(len(user_ids), dtype=LOG_DTYPE)
+        records['user_id'] = user_ids
+        records['arm'] = arms
+        records['reward'] = rewards
+        records['timestamp'] = time.time()
+
+        with self._lock:
+            self._buffer.append(records)
+            self._buffered += len(records)
+            self._updates_since_snapshot += len(records)
+            should_flush = (self._buffered >= self.flush_batch_size
+                            or time.monotonic() - self._last_flush >= self.flush_interval)
+
+        if should_flush:
+            self.flush()
+
+    def flush(self) -> int:
+        """
+        Escribir el buffer en el log
+
+        Returns:
+            Número de registros escritos
+        """
+        with self._lock:
+            if not self._buffer:
+                return 0
+            records = np.concatenate(self._buffer)
+            self._buffer, self._buffered = [], 0
+
+            self._open_log()
+            self._log_file.write(records.tobytes())
+            self._log_file.flush()
+            if self.fsync:
+                os.fsync(self._log_file.fileno())
+
+            self._last_flush = time.monotonic()
+            self.stats['records_written'] += len(records)
+            self.stats['log_flushes'] += 1
+
+        return len(records)
+
+    def start(self) -> None:
+        """Arrancar el hilo de flush periódico"""
+        if self._worker is not None and self._worker.is_alive():
+            return
+        self._stop_event.clear()
+        self._worker = threading.Thread(
+            target=self._run, name="bandit-persistence", daemon=True
+        )
+        self._worker.start()
+
+    def stop(self) -> None:
+        """Detener el hilo de flush periódico"""
+        self._stop_event.set()
+        if self._worker is not None:
+            self._worker.join(timeout=self.flush_interval * 2)
+            self._worker = None
+
+    def _run(self) -> None:
+        """Bucle del hilo: escribir el buffer si lleva flush_interval sin escribirse"""
+        while not self._stop_event.wait(self.flush_interval):
+            try:
+                if time.monotonic() - self._last_flush >= self.flush_interval and self.flush():
+                    self.stats['periodic_flushes'] += 1
+            except Exception as e:
+                logger.error(f"Error en flush periódico del log: {e}")
+
+    @property
+    def snapshot_due(self) -> bool:
+        """Indica si se alcanzó el intervalo de snapshot"""
+        return self._updates_since_snapshot >= self.snapshot_interval
+
+    def write_snapshot(self, arrays: Dict[str, np.ndarray]) -> Path:
+        """
+        Escribir un snapshot y descartar los logs que cubre
+
+        El llamador debe garantizar que no entran actualizaciones entre el
+        volcado de `arrays` y esta llamada.
+
+        Args:
+            arrays: Arrays del estado (claves planas, p.ej. 'store_arm_counts')
+
+        Returns:
+            Ruta del snapshot
+        """
+        start = time.perf_counter()
+        self.flush()
+
+        with self._lock:
+            # Las actualizaciones posteriores van a una generación nueva
+            if self._log_file is not None:
+                self._log_file.close()
+                self._log_file = None
+            self.generation += 1
+
+            tmp_path = self.snapshot_path.with_suffix('.tmp.npz')
+            np.savez(tmp_path, meta_generation=np.array(self.generation),
+                     meta_created_at=np.array(time.time()), **arrays)
+            os.replace(tmp_path, self.snapshot_path)
+
+            for generation in self._log_generations():
+                if generation < self.generation:
+                    self._log_path(generation).unlink()
+
+            self._updates_since_snapshot = 0
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.stats['snapshots_written'] += 1
+        self.stats['last_snapshot_ms'] = elapsed_ms
+        self.stats['last_snapshot_at'] = time.time()
+
+        logger.info(f"Snapshot escrito en {elapsed_ms:.1f} ms (generación {self.generation})")
+
+        return self.snapshot_path
+
+    def recover(self) -> Tuple[Optional[Dict[str, np.ndarray]], np.ndarray]:
+        """
+        Leer el último snapshot y los registros de log posteriores
+
+        Returns:
+            Tupla (arrays del snapshot o None, registros del log en orden)
+        """
+        snapshot = None
+        snapshot_generation = 0
+        if self.snapshot_path.exists():
+            with np.load(self.snapshot_path) as data:
+                snapshot = {key: data[key] for key in data.files}
+            snapshot_generation = int(snapshot['meta_generation'])
+
+        chunks = []
+        for generation in self._log_generations():
+            if generation < snapshot_generation:
+                continue
+            raw = self._log_path(generation).read_bytes()
+            # Descartar un registro final incompleto (escritura interrumpida)
+            usable = len(raw) - len(raw) % LOG_DTYPE.itemsize
+            chunks.append(np.frombuffer(raw[:usable], dtype=LOG_DTYPE))
+
+        records = np.concatenate(chunks) if chunks else np.empty(0, dtype=LOG_DTYPE)
+        return snapshot, records
+
+    def record_recovery(self, report: Dict) -> None:
+        """Guardar el informe de la última recuperación"""
+        self.stats['recovery'] = report
+
+    def close(self) -> None:
+        """Detener el hilo, escribir lo pendiente y cerrar el log"""
+        self.stop()
+        self.flush()
+        with self._lock:
+            if self._log_file is not None:
+                self._log_file.close()
+                self._log_file = None
+
+    def get_statistics(self) -> Dict:
+        """Obtener estadísticas de persistencia"""
+        return {
+            **self.stats,
+            'directory': str(self.directory),
+            'generation': self.generation,
+            'buffered_records': self._buffered,
+            'updates_since_snapshot': self._updates_since_snapshot
+        }
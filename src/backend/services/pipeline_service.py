@@ -0,0 +1,148 @@
+"""Servicio de Pipeline - Generación de candidatos por estrategia y re-ranking híbrido"""
+import numpy as np
+from typing import Callable, Dict, List, Tuple
+import threading
+import time
+import logging
+
+from services.stats_service import RunningStats
+
+logger = logging.getLogger(__name__)
+
+# Fuente de candidatos: (user_id, estrategia, k, exclude) -> (artistID, scores)
+CandidateSource = Callable[[int, str, int, np.ndarray], Tuple[np.ndarray, np.ndarray]]
+
+
+class HybridCandidatePipeline:
+    """Candidatos de todas las estrategias mezclados y re-ordenados con pesos del bandit"""
+
+    def __init__(self, strategies: List[str], candidate_source: CandidateSource,
+                 candidates_per_strategy: int = 50, temperature: float = 0.1,
+                 prior_reward: float = 0.5):
+        """
+        Inicializar pipeline
+
+        Cada estrategia aporta sus candidatos con scores normalizados a [0, 1];
+        el score final de un artista es la suma de las aportaciones ponderadas
+        por el peso de cada estrategia para el usuario (softmax de sus medias
+        de recompensa). El artista se atribuye a la estrategia que más aporta,
+        así el feedback actualiza el brazo correcto.
+
+        Args:
+            strategies: Nombres de las estrategias (brazos)
+            candidate_source: Función que genera los candidatos de una estrategia
+            candidates_per_strategy: Candidatos pedidos a cada estrategia
+            temperature: Temperatura del softmax de pesos (menor = más concentrado)
+            prior_reward: Recompensa supuesta de las estrategias no jugadas
+        """
+        self.strategies = strategies
+        self.candidate_source = candidate_source
+        self.candidates_per_strategy = candidates_per_strategy
+        self.temperature = temperature
+        self.prior_reward = prior_reward
+
+        self._stats_lock = threading.Lock()
+        self.requests = 0
+        self.stage_ms: Dict[str, RunningStats] = {
+            stage: RunningStats() for stage in
+            [f"candidates:{s}" for s in strategies] + ['merge', 'rank', 'total']
+        }
+
+        logger.info(f"HybridCandidatePipeline inicializado ({len(strategies)} estrategias, "
+                    f"{candidates_per_strategy} candidatos por estrategia)")
+
+    def strategy_weights(self, arm_means: np.ndarray, arm_counts: np.ndarray) -> np.ndarray:
+        """
+        Pesos de las estrategias para un usuario
+
+        Args:
+            arm_means: Recompensa media por estrategia
+            arm_counts: Veces jugada cada estrategia
+
+        Returns:
+            Array de pesos que suma 1
+        """
+        values = np.where(arm_counts > 0, arm_means, self.prior_reward)
+        logits = (values - values.max()) / max(self.temperature, 1e-9)
+        weights = np.exp(logits)
+        return weights / weights.sum()
+
+    def rank(self, user_id: int, weights: np.ndarray, k: int,
+             exclude: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, Dict[str, float]]:
+        """
+        Generar, mezclar y ordenar candidatos de todas las estrategias
+
+        Args:
+            user_id: ID del usuario
+            weights: Peso de cada estrategia (strategy_weights)
+            k: Número de artistas a devolver
+            exclude: artistID a excluir, ordenados
+
+        Returns:
+            Tupla (artistID, scores, estrategia dominante, milisegundos por etapa)
+        """
+        timings = {}
+        start = time.perf_counter()
+        per_strategy = max(k, self.candidates_per_strategy)
+
+        ids, arms, contributions = [], [], []
+        for arm, strategy in enumerate(self.strategies):
+            stage_start = time.perf_counter()
+            candidate_ids, scores = self.candidate_source(user_id, strategy, per_strategy, exclude)
+            timings[f"candidates:{strategy}"] = (time.perf_counter() - stage_start) * 1000
+            if len(candidate_ids) == 0:
+                continue
+
+            scores = np.asarray(scores, dtype=np.float64)
+            top = scores.max()
+            # Los scores negativos (p.ej. productos de factores) no aportan
+            normalized = np.maximum(scores, 0.0) / top if top > 0 else np.ones_like(scores)
+            ids.append(np.asarray(candidate_ids, dtype=np.int64))
+            arms.append(np.full(len(candidate_ids), arm, dtype=np.int64))
+            contributions.append(weights[arm] * normalized)
+
+        stage_start = time.perf_counter()
+        if ids:
+            ids = np.concatenate(ids)
+            arms = np.concatenate(arms)
+            contributions = np.concatenate(contributions)
+
+            # Score por artista = suma de aportaciones; estrategia dominante = mayor aportación
+            unique_ids, inverse = np.unique(ids, return_inverse=True)
+            totals = np.bincount(inverse, weights=contributions, minlength=len(unique_ids))
+            order = np.lexsort((-contributions, inverse))
+            group_starts = np.flatnonzero(np.r_[True, np.diff(inverse[order]) != 0])
+            dominant = arms[order[group_starts]]
+        else:
+            unique_ids = np.empty(0, dtype=np.int64)
+            totals = np.empty(0, dtype=np.float64)
+            dominant = np.empty(0, dtype=np.int64)
+        timings['merge'] = (time.perf_counter() - stage_start) * 1000
+
+        stage_start = time.perf_counter()
+        if len(totals) > k:
+            top = np.argpartition(-totals, k - 1)[:k]
+        else:
+            top = np.arange(len(totals))
+        top = top[np.argsort(-totals[top], kind='stable')]
+        timings['rank'] = (time.perf_counter() - stage_start) * 1000
+        timings['total'] = (time.perf_counter() - start) * 1000
+
+        with self._stats_lock:
+            self.requests += 1
+            for stage, elapsed in timings.items():
+                self.stage_ms[stage].update(elapsed)
+
+        return unique_ids[top], totals[top], dominant[top], timings
+
+    def get_statistics(self) -> Dict:
+        """Obtener latencia media por etapa"""
+        return {
+            'requests': self.requests,
+            'candidates_per_strategy': self.candidates_per_strategy,
+            'temperature': self.temperature,
+            'stage_ms': {
+                stage: {'avg': stats.mean, 'std': stats.std}
+                for stage, stats in self.stage_ms.items()
+            }
+        }
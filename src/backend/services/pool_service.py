@@ -0,0 +1,219 @@
+"""Servicio de Pools - Candidatos por estrategia pre-calculados en segundo plano"""
+import numpy as np
+from typing import Callable, ContextManager, Dict, Iterable, List, Optional, Set, Tuple
+import contextlib
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Fuente de candidatos: (user_id, estrategia, k, exclude) -> (artistID, scores)
+CandidateSource = Callable[[int, str, int, np.ndarray], Tuple[np.ndarray, np.ndarray]]
+
+
+class _PoolBuffer:
+    """Pools de un ciclo de pre-cálculo: arrays compactos más un cursor por usuario y estrategia"""
+
+    def __init__(self, user_ids: np.ndarray, pools: np.ndarray, built_at: float):
+        self.user_ids = user_ids  # ordenados
+        self.pools = pools  # (usuarios, estrategias, tamaño del pool), -1 = hueco
+        self.cursors = np.zeros(pools.shape[:2], dtype=np.int32)
+        self.built_at = built_at
+
+    def row_of(self, user_id: int) -> Optional[int]:
+        row = int(np.searchsorted(self.user_ids, user_id))
+        if row < len(self.user_ids) and self.user_ids[row] == user_id:
+            return row
+        return None
+
+
+class CandidatePoolService:
+    """Pools de candidatos por usuario y estrategia con doble buffer y refresco periódico"""
+
+    def __init__(self, strategies: List[str], candidate_source: CandidateSource,
+                 user_ids_source: Callable[[], np.ndarray],
+                 exclusions: Callable[[int], np.ndarray],
+                 pool_size: int = 20, refresh_interval: float = 60.0,
+                 lock: Optional[ContextManager] = None):
+        """
+        Inicializar servicio
+
+        Un hilo recalcula todos los pools en un buffer nuevo y lo publica con
+        una sola asignación, así las peticiones siempre leen un buffer completo.
+        En cada petición basta con avanzar el cursor del pool hasta el
+        siguiente candidato no visto. Los usuarios invalidados mientras se
+        recalcula se agotan también en el buffer nuevo antes de publicarlo.
+
+        Args:
+            strategies: Nombres de las estrategias
+            candidate_source: Función que genera los candidatos de una estrategia
+            user_ids_source: Función que devuelve los usuarios a pre-calcular
+            exclusions: Función que devuelve los artistID a excluir de un usuario (ordenados)
+            pool_size: Candidatos guardados por usuario y estrategia
+            refresh_interval: Segundos entre recálculos
+            lock: Lock que serializa el cálculo de cada usuario con las
+                  escrituras del dueño de las fuentes (None = sin lock)
+        """
+        self.strategies = strategies
+        self.candidate_source = candidate_source
+        self.user_ids_source = user_ids_source
+        self.exclusions = exclusions
+        self.pool_size = pool_size
+        self.refresh_interval = refresh_interval
+        self._lock = lock if lock is not None else contextlib.nullcontext()
+
+        self._active: Optional[_PoolBuffer] = None
+        self._cursor_lock = threading.Lock()
+        # Usuarios invalidados durante el recálculo en curso (None = sin recálculo)
+        self._invalidated_during_build: Optional[Set[int]] = None
+        self._stop_event = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'invalidated_users': 0,
+            'builds': 0,
+            'last_build_ms': 0.0
+        }
+
+        logger.info(f"CandidatePoolService inicializado (pool_size={pool_size}, "
+                    f"refresh_interval={refresh_interval}s)")
+
+    def rebuild(self) -> int:
+        """
+        Recalcular los pools de todos los usuarios y publicar el buffer nuevo
+
+        Returns:
+            Número de usuarios con pool
+        """
+        start = time.perf_counter()
+        with self._cursor_lock:
+            self._invalidated_during_build = set()
+        try:
+            buffer = self._build()
+            # Publicación atómica: las peticiones en curso terminan con el buffer anterior
+            with self._cursor_lock:
+                self._exhaust(buffer, self._invalidated_during_build)
+                self._active = buffer
+        finally:
+            with self._cursor_lock:
+                self._invalidated_during_build = None
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.stats['builds'] += 1
+        self.stats['last_build_ms'] = elapsed_ms
+        logger.info(f"Pools de candidatos recalculados: {len(buffer.user_ids)} usuarios en {elapsed_ms:.0f} ms")
+
+        return len(buffer.user_ids)
+
+    def _build(self) -> _PoolBuffer:
+        """Calcular un buffer nuevo con los pools de todos los usuarios"""
+        user_ids = np.unique(np.asarray(self.user_ids_source(), dtype=np.int64))
+        pools = np.full((len(user_ids), len(self.strategies), self.pool_size), -1, dtype=np.int64)
+
+        for row, user_id in enumerate(user_ids.tolist()):
+            # Historial e índices consistentes mientras se calcula el usuario
+            with self._lock:
+                exclude = self.exclusions(user_id)
+                for arm, strategy in enumerate(self.strategies):
+                    ids, _ = self.candidate_source(user_id, strategy, self.pool_size, exclude)
+                    pools[row, arm, :len(ids)] = ids
+
+        return _PoolBuffer(user_ids, pools, time.time())
+
+    def _exhaust(self, buffer: _PoolBuffer, user_ids: Iterable[int]) -> int:
+        """Agotar los pools de unos usuarios en un buffer (requiere _cursor_lock)"""
+        exhausted = 0
+        for user_id in user_ids:
+            row = buffer.row_of(user_id)
+            if row is not None:
+                buffer.cursors[row] = self.pool_size
+                exhausted += 1
+        return exhausted
+
+    def take(self, user_id: int, arm: int, k: int, exclude: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Extraer los siguientes k candidatos no vistos del pool
+
+        Args:
+            user_id: ID del usuario
+            arm: Índice de la estrategia
+            k: Número de candidatos
+            exclude: artistID a excluir, ordenados (historial actual del usuario)
+
+        Returns:
+            Array de k artistID, o None si el pool no existe o no tiene suficientes
+        """
+        buffer = self._active
+        row = buffer.row_of(user_id) if buffer is not None else None
+        with self._cursor_lock:
+            if row is None:
+                self.stats['misses'] += 1
+                return None
+
+            start = int(buffer.cursors[row, arm])
+            pool = buffer.pools[row, arm, start:]
+            usable = np.flatnonzero((pool >= 0) & ~np.isin(pool, exclude))[:k]
+            if len(usable) < k:
+                self.stats['misses'] += 1
+                return None
+            buffer.cursors[row, arm] = start + usable[-1] + 1
+            self.stats['hits'] += 1
+
+        return pool[usable]
+
+    def invalidate(self, user_ids: Iterable[int]) -> None:
+        """
+        Agotar los pools de unos usuarios (p.ej. tras nuevas interacciones)
+
+        Hasta el siguiente recálculo sus peticiones calculan los candidatos en
+        línea. Si hay un recálculo en curso se aplica también al buffer nuevo,
+        cuyos pools pueden haberse calculado con los datos anteriores.
+        """
+        user_ids = list(user_ids)
+        with self._cursor_lock:
+            if self._invalidated_during_build is not None:
+                self._invalidated_during_build.update(user_ids)
+            if self._active is not None:
+                self.stats['invalidated_users'] += self._exhaust(self._active, user_ids)
+
+    def start(self) -> None:
+        """Arrancar el hilo de recálculo (el primer cálculo es inmediato)"""
+        if self._worker is not None and self._worker.is_alive():
+            return
+        self._stop_event.clear()
+        self._worker = threading.Thread(
+            target=self._run, name="candidate-pools", daemon=True
+        )
+        self._worker.start()
+
+    def stop(self) -> None:
+        """Detener el hilo de recálculo"""
+        self._stop_event.set()
+        if self._worker is not None:
+            self._worker.join(timeout=self.refresh_interval)
+            self._worker = None
+
+    def _run(self) -> None:
+        """Bucle del hilo: recalcular y esperar el intervalo"""
+        while not self._stop_event.is_set():
+            try:
+                self.rebuild()
+            except Exception as e:
+                logger.error(f"Error recalculando pools de candidatos: {e}")
+            self._stop_event.wait(self.refresh_interval)
+
+    def get_statistics(self) -> Dict:
+        """Obtener estadísticas de los pools (frescura y tasa de aciertos)"""
+        buffer = self._active
+        lookups = self.stats['hits'] + self.stats['misses']
+        return {
+            **self.stats,
+            'hit_rate': self.stats['hits'] / lookups if lookups else 0.0,
+            'pool_size': self.pool_size,
+            'refresh_interval': self.refresh_interval,
+            'users': len(buffer.user_ids) if buffer is not None else 0,
+            'age_s': time.time() - buffer.built_at if buffer is not None else None
+        }
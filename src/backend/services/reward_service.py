@@ -1,35 +1,157 @@
 """Servicio de Recompensas - Sistema de recompensas multimodales"""
 import numpy as np
-from typing import Dict, Tuple
+from typing import Dict, List, Optional, Sequence, Tuple
 import logging
 
-from services.perception_service import PerceptionModule
+from services.perception_service import PerceptionModule, STATE_FEATURES
 
 logger = logging.getLogger(__name__)
 
+# Recompensa base por outcome (código = posición en OUTCOMES)
+OUTCOMES = ('positive', 'neutral', 'negative')
+BASE_REWARDS = np.array([0.8, 0.5, 0.2])
+_NEUTRAL = OUTCOMES.index('neutral')
+
+# Componentes de la recompensa (columnas de la matriz de componentes)
+REWARD_COMPONENTS = ('satisfaction', 'discovery', 'social_alignment', 'engagement')
+
+# Feature del estado de la que depende cada componente
+_COMPONENT_FEATURES = np.array([
+    STATE_FEATURES.index('music_engagement'),
+    STATE_FEATURES.index('music_diversity'),
+    STATE_FEATURES.index('social_connectivity'),
+    STATE_FEATURES.index('overall_sophistication')
+])
+
+
+def _component_coefficients(strategy: Optional[str]) -> Tuple[List[float], List[float]]:
+    """Término independiente y pendiente de cada componente para una estrategia"""
+    intercepts = [
+        0.7,
+        0.8 if strategy == 'Exploration' else 0.6,  # Discovery: bonificado si explora
+        0.7 if strategy == 'Social Influence' else 0.5,  # Social: bonificado si es social
+        0.6
+    ]
+    slopes = [0.3, 0.2, 0.3 if strategy == 'Social Influence' else 0.2, 0.4]
+    return intercepts, slopes
+
 
 class MultimodalRewardSystem:
     """Sistema de recompensas multimodales para el agente"""
     
-    def __init__(self, perception_module: PerceptionModule):
+    def __init__(self, perception_module: Optional[PerceptionModule],
+                 strategies: Sequence[str],
+                 reward_weights: Optional[Dict[str, float]] = None,
+                 noise_std: float = 0.05,
+                 seed: Optional[int] = None):
         """
         Inicializar sistema de recompensas
         
+        Cada componente es `base(outcome) × (a + b × feature del usuario)`, con
+        (a, b) según la estrategia; se guardan como tablas (estrategia,
+        componente) para evaluar lotes enteros con indexado de arrays.
+        
         Args:
             perception_module: Módulo de percepción para obtener estado del usuario
+                               (None si siempre se proporcionan los estados)
+            strategies: Nombres de las estrategias (código = posición)
+            reward_weights: Pesos por componente (None = pesos por defecto)
+            noise_std: Desviación estándar del ruido de la recompensa
+            seed: Semilla del generador del ruido (None = aleatoria)
         """
         self.perception = perception_module
+        self.strategies = list(strategies)
+        self.noise_std = noise_std
+        self.rng = np.random.default_rng(seed)
         
         # Pesos por tipo de recompensa
-        self.reward_weights = {
+        self.reward_weights = reward_weights or {
             'satisfaction': 0.4,
             'discovery': 0.3,
             'social_alignment': 0.2,
             'engagement': 0.1
         }
+        self.weight_vector = np.array([self.reward_weights[comp] for comp in REWARD_COMPONENTS])
+        
+        # Una fila por estrategia más una final para estrategias desconocidas
+        coefficients = [_component_coefficients(s) for s in self.strategies + [None]]
+        self.intercepts = np.array([c[0] for c in coefficients])
+        self.slopes = np.array([c[1] for c in coefficients])
+        self._strategy_code = {name: i for i, name in enumerate(self.strategies)}
         
         logger.info("MultimodalRewardSystem inicializado")
     
+    def strategy_codes(self, strategies: Sequence[str]) -> np.ndarray:
+        """Códigos de estrategia (las desconocidas usan la fila por defecto)"""
+        default = len(self.strategies)
+        return np.fromiter(
+            (self._strategy_code.get(s, default) for s in strategies),
+            dtype=np.int64, count=len(strategies)
+        )
+    
+    @staticmethod
+    def outcome_codes(outcomes: Sequence[str]) -> np.ndarray:
+        """Códigos de outcome (los desconocidos cuentan como 'neutral')"""
+        codes = {name: i for i, name in enumerate(OUTCOMES)}
+        return np.fromiter(
+            (codes.get(o, _NEUTRAL) for o in outcomes), dtype=np.int64, count=len(outcomes)
+        )
+    
+    def compute_components(self, user_rows: np.ndarray, strategy_codes: np.ndarray,
+                           outcome_codes: np.ndarray, user_states: np.ndarray) -> np.ndarray:
+        """
+        Calcular los componentes de recompensa de un lote (deterministas, sin ruido)
+        
+        Args:
+            user_rows: Filas de usuario en `user_states`
+            strategy_codes: Código de estrategia de cada evento (strategy_codes)
+            outcome_codes: Código de outcome de cada evento (outcome_codes)
+            user_states: Matriz de estados (n_usuarios, len(STATE_FEATURES))
+        
+        Returns:
+            Matriz de componentes (n_eventos, len(REWARD_COMPONENTS))
+        """
+        strategy_codes = np.asarray(strategy_codes)
+        return BASE_REWARDS[outcome_codes][:, None] * (
+            self.intercepts[strategy_codes]
+            + self.slopes[strategy_codes] * user_states[user_rows][:, _COMPONENT_FEATURES]
+        )
+    
+    def add_noise(self, components: np.ndarray,
+                  rng: Optional[np.random.Generator] = None) -> np.ndarray:
+        """
+        Combinar los componentes en recompensas y sumarles el ruido
+        
+        Args:
+            components: Matriz de componentes (compute_components)
+            rng: Generador del ruido (None = el del sistema)
+        
+        Returns:
+            Recompensas en [0, 1]
+        """
+        rng = rng if rng is not None else self.rng
+        rewards = components @ self.weight_vector + rng.normal(0, self.noise_std, len(components))
+        return np.clip(rewards, 0.0, 1.0)
+    
+    def compute_rewards(self, user_rows: np.ndarray, strategy_codes: np.ndarray,
+                        outcome_codes: np.ndarray, user_states: np.ndarray,
+                        rng: Optional[np.random.Generator] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Calcular recompensas de un lote a partir de arrays de códigos
+        
+        Args:
+            user_rows: Filas de usuario en `user_states`
+            strategy_codes: Código de estrategia de cada evento (strategy_codes)
+            outcome_codes: Código de outcome de cada evento (outcome_codes)
+            user_states: Matriz de estados (n_usuarios, len(STATE_FEATURES))
+            rng: Generador del ruido (None = el del sistema)
+        
+        Returns:
+            Tupla (recompensas en [0, 1], componentes (n_eventos, len(REWARD_COMPONENTS)))
+        """
+        components = self.compute_components(user_rows, strategy_codes, outcome_codes, user_states)
+        return self.add_noise(components, rng), components
+    
     def calculate_reward(self, user_id: int, strategy: str, outcome: str = 'positive',
                         user_state: Dict = None) -> Tuple[float, Dict]:
         """
@@ -40,52 +162,44 @@ class MultimodalRewardSystem:
             strategy: Estrategia de recomendación utilizada
             outcome: Resultado del feedback ('positive', 'neutral', 'negative')
             user_state: Estado del usuario (opcional, se calculará si no se proporciona)
-            
+        
         Returns:
             Tupla (recompensa final, componentes de recompensa)
         """
         if user_state is None:
-            user_state = self.perception.get_user_state(user_id)
-        
-        # Base reward según outcome
-        base_rewards = {
-            'positive': 0.8,
-            'neutral': 0.5,
-            'negative': 0.2
-        }
-        base_reward = base_rewards.get(outcome, 0.5)
-        
-        # Componentes de recompensa
-        components = {}
-        
-        # Satisfaction: Basado en engagement musical del usuario
-        components['satisfaction'] = base_reward * (0.7 + 0.3 * user_state['music_engagement'])
-        
-        # Discovery: Bonificado si el usuario es explorador
-        if strategy == 'Exploration':
-            discovery_bonus = 0.8 + 0.2 * user_state['music_diversity']
+            states = self.perception.get_user_states([user_id])
         else:
-            discovery_bonus = 0.6 + 0.2 * user_state['music_diversity']
-        components['discovery'] = base_reward * discovery_bonus
+            states = np.array([[user_state[feature] for feature in STATE_FEATURES]])
         
-        # Social Alignment: Bonificado para estrategias sociales
-        if strategy == 'Social Influence':
-            social_bonus = 0.7 + 0.3 * user_state['social_connectivity']
-        else:
-            social_bonus = 0.5 + 0.2 * user_state['social_connectivity']
-        components['social_alignment'] = base_reward * social_bonus
+        rewards, components = self.compute_rewards(
+            np.zeros(1, dtype=np.int64), self.strategy_codes([strategy]),
+            self.outcome_codes([outcome]), states
+        )
+        final_reward = float(rewards[0])
         
-        # Engagement: Basado en actividad general
-        components['engagement'] = base_reward * (0.6 + 0.4 * user_state['overall_sophistication'])
+        logger.debug(f"Recompensa calculada para usuario {user_id}: {final_reward:.3f} (outcome={outcome})")
         
-        # Calcular recompensa final ponderada
-        final_reward = sum(components[comp] * self.reward_weights[comp] for comp in components)
+        return final_reward, dict(zip(REWARD_COMPONENTS, components[0].tolist()))
+    
+    def calculate_rewards(self, user_ids: Sequence[int], strategies: Sequence[str],
+                          outcomes: Sequence[str],
+                          user_states: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Calcular la recompensa multimodal de un lote de eventos en una pasada vectorizada
         
-        # Añadir ruido realista
-        noise = np.random.normal(0, 0.05)
-        final_reward = max(0, min(1, final_reward + noise))
+        Args:
+            user_ids: IDs de usuario
+            strategies: Estrategia de cada evento
+            outcomes: Outcome de cada evento ('positive', 'neutral', 'negative')
+            user_states: Matriz de estados (n_eventos, len(STATE_FEATURES)); se obtiene si no se proporciona
         
-        logger.debug(f"Recompensa calculada para usuario {user_id}: {final_reward:.3f} (outcome={outcome})")
+        Returns:
+            Tupla (recompensas, componentes (n_eventos, len(REWARD_COMPONENTS)))
+        """
+        if user_states is None:
+            user_states = self.perception.get_user_states(user_ids)
         
-        return final_reward, components
-
+        return self.compute_rewards(
+            np.arange(len(user_states)), self.strategy_codes(strategies),
+            self.outcome_codes(outcomes), user_states
+        )
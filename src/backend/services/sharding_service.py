@@ -0,0 +1,703 @@
+"""Servicio de Sharding - Reparto de usuarios entre procesos con hashing consistente"""
+import numpy as np
+import multiprocessing as mp
+from hashlib import blake2b
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import logging
+
+from models.entities import AgentStatistics, DecisionInfo, LearningInfo, Recommendation
+
+logger = logging.getLogger(__name__)
+
+# Miembros del anillo guardados en PERSISTENCE_DIR (cada shard persiste en PERSISTENCE_DIR/<nombre>)
+SHARD_MEMBERSHIP = 'shards.json'
+
+
+def hash_user_ids(user_ids: np.ndarray) -> np.ndarray:
+    """
+    Hash de 64 bits de los user_id (finalizador splitmix64, vectorizado)
+
+    Args:
+        user_ids: Array de IDs de usuario
+
+    Returns:
+        Array uint64 de hashes
+    """
+    z = np.asarray(user_ids, dtype=np.int64).astype(np.uint64)
+    with np.errstate(over='ignore'):
+        z = z + np.uint64(0x9E3779B97F4A7C15)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+
+class ConsistentHashRing:
+    """Anillo de hashing consistente con nodos virtuales"""
+
+    def __init__(self, nodes: Iterable[str] = (), virtual_nodes: int = 64):
+        """
+        Inicializar anillo
+
+        Args:
+            nodes: Nombres de los nodos iniciales
+            virtual_nodes: Puntos del anillo por nodo (más puntos = reparto más uniforme)
+        """
+        self.virtual_nodes = virtual_nodes
+        self.nodes: List[str] = []
+        self._points = np.empty(0, dtype=np.uint64)
+        self._owners = np.empty(0, dtype=np.int64)
+        for node in nodes:
+            self.add_node(node)
+
+    def _node_points(self, node: str) -> np.ndarray:
+        return np.array([
+            int.from_bytes(blake2b(f"{node}#{i}".encode(), digest_size=8).digest(), 'little')
+            for i in range(self.virtual_nodes)
+        ], dtype=np.uint64)
+
+    def _rebuild(self) -> None:
+        points = [self._node_points(node) for node in self.nodes]
+        owners = [np.full(self.virtual_nodes, i, dtype=np.int64) for i in range(len(self.nodes))]
+        all_points = np.concatenate(points) if points else np.empty(0, dtype=np.uint64)
+        all_owners = np.concatenate(owners) if owners else np.empty(0, dtype=np.int64)
+        order = np.argsort(all_points, kind='stable')
+        self._points = all_points[order]
+        self._owners = all_owners[order]
+
+    def add_node(self, node: str) -> None:
+        """Añadir un nodo al anillo"""
+        if node in self.nodes:
+            return
+        self.nodes.append(node)
+        self._rebuild()
+
+    def remove_node(self, node: str) -> None:
+        """Quitar un nodo del anillo"""
+        self.nodes.remove(node)
+        self._rebuild()
+
+    def owners_of(self, user_ids: Iterable[int]) -> np.ndarray:
+        """
+        Obtener el índice (en `nodes`) del nodo propietario de cada usuario
+
+        Args:
+            user_ids: IDs de usuario
+
+        Returns:
+            Array de índices de nodo
+        """
+        if not self.nodes:
+            raise RuntimeError("El anillo no tiene nodos")
+        hashes = hash_user_ids(np.fromiter((int(u) for u in user_ids), dtype=np.int64))
+        positions = np.searchsorted(self._points, hashes, side='right') % len(self._points)
+        return self._owners[positions]
+
+    def owner_of(self, user_id: int) -> str:
+        """Nombre del nodo propietario de un usuario"""
+        return self.nodes[int(self.owners_of([user_id])[0])]
+
+
+def shard_seed(seed: Optional[int], name: str) -> Optional[int]:
+    """
+    Semilla propia de un shard derivada de la semilla global y su nombre
+
+    Args:
+        seed: Semilla global (None = aleatoria)
+        name: Nombre del shard
+
+    Returns:
+        Semilla del shard (None si la global es None)
+    """
+    if seed is None:
+        return None
+    digest = blake2b(f"{seed}#{name}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+def _shard_worker_main(name: str, conn, settings_overrides: Dict[str, Any]) -> None:
+    """
+    Bucle de un proceso de shard: agente local completo atendiendo peticiones por pipe
+
+    Args:
+        name: Nombre del shard
+        conn: Extremo hijo del pipe
+        settings_overrides: Configuración del proceso padre
+    """
+    from core.config import settings
+    for key, value in settings_overrides.items():
+        setattr(settings, key, value)
+    # El proceso de shard siempre usa un agente local y no lee ficheros en tail
+    settings.SHARD_WORKERS = 0
+    settings.INGESTION_TAIL_FILE = None
+    # Secuencias aleatorias (ruido de recompensa, políticas) independientes entre shards
+    settings.RANDOM_SEED = shard_seed(settings.RANDOM_SEED, name)
+    if settings.PERSISTENCE_DIR is not None:
+        settings.PERSISTENCE_DIR = Path(settings.PERSISTENCE_DIR) / name
+
+    from core.dependencies import get_agent_service, get_ingestion_service
+    agent = get_agent_service()
+    ingestion = get_ingestion_service()
+
+    handlers = {
+        'recommend': agent.recommend,
+        'recommend_slate': agent.recommend_slate,
+        'recommend_hybrid': agent.recommend_hybrid,
+        'learn_from_feedback': agent.learn_from_feedback,
+        'learn_from_feedback_batch': agent.learn_from_feedback_batch,
+        'find_recommendation': agent.find_recommendation,
+        'resolve_recommendation': agent.resolve_recommendation,
+        'get_user_profile': agent.get_user_profile,
+        'get_agent_statistics': agent.get_agent_statistics,
+        'get_persistence_statistics': agent.get_persistence_statistics,
+        'apply_batch': ingestion.apply_batch,
+        'user_ids': lambda: agent.bandit_store.user_ids[:agent.bandit_store.n_rows].copy(),
+        'export_users': agent.export_users,
+        'import_users': agent.import_users,
+        'save_snapshot': agent.save_snapshot
+    }
+
+    conn.send(('ok', name))
+    while True:
+        try:
+            op, args = conn.recv()
+        except EOFError:
+            break
+        if op == 'stop':
+            try:
+                agent.shutdown()
+            except Exception as e:
+                logger.error(f"Error cerrando shard {name}: {e}")
+            conn.send(('ok', None))
+            break
+        try:
+            conn.send(('ok', handlers[op](*args)))
+        except Exception as e:
+            logger.error(f"Error en shard {name} ({op}): {e}")
+            conn.send(('error', f"{type(e).__name__}: {e}"))
+    conn.close()
+
+
+class _ShardHandle:
+    """Proceso de shard y su pipe (una petición en vuelo a la vez)"""
+
+    def __init__(self, name: str, ctx, settings_overrides: Dict[str, Any]):
+        self.name = name
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_shard_worker_main, args=(name, child_conn, settings_overrides),
+            name=name, daemon=True
+        )
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.process.start()
+        child_conn.close()
+
+    def send(self, op: str, args: tuple) -> None:
+        self.conn.send((op, args))
+        self.requests += 1
+
+    def receive(self) -> Any:
+        status, result = self.conn.recv()
+        if status == 'error':
+            raise RuntimeError(f"Shard {self.name}: {result}")
+        return result
+
+    def call(self, op: str, *args) -> Any:
+        with self.lock:
+            self.send(op, args)
+            return self.receive()
+
+
+class _ReadWriteLock:
+    """Cerrojo lectores/escritor: las peticiones comparten, el rebalanceo es exclusivo"""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._writing = False
+
+    def acquire_read(self) -> None:
+        with self._condition:
+            while self._writing:
+                self._condition.wait()
+            self._readers += 1
+
+    def release_read(self) -> None:
+        with self._condition:
+            self._readers -= 1
+            if self._readers == 0:
+                self._condition.notify_all()
+
+    def acquire_write(self) -> None:
+        with self._condition:
+            while self._writing:
+                self._condition.wait()
+            self._writing = True
+            while self._readers > 0:
+                self._condition.wait()
+
+    def release_write(self) -> None:
+        with self._condition:
+            self._writing = False
+            self._condition.notify_all()
+
+
+class ShardedAgentDispatcher:
+    """Dispatcher local que enruta cada usuario al proceso de shard que posee su estado"""
+
+    def __init__(self, data_repository, perception_module, n_workers: int = 2,
+                 virtual_nodes: int = 64, settings_overrides: Optional[Dict[str, Any]] = None):
+        """
+        Inicializar dispatcher y arrancar los procesos de shard
+
+        Expone la misma interfaz que IntelligentRecommendationAgent para las
+        rutas; el repositorio y la percepción del proceso principal se siguen
+        usando para las consultas que no dependen del estado aprendido.
+
+        Con PERSISTENCE_DIR los miembros del anillo se guardan en
+        SHARD_MEMBERSHIP. Al arrancar se recuperan todos los shards anteriores
+        (incluidos los añadidos en caliente) y se re-ubica a cada usuario en
+        su dueño según el anillo actual, así un reinicio, con el mismo
+        SHARD_WORKERS o con otro, no pierde el estado de ningún usuario. Los
+        shards sobrantes se vacían y se borra su directorio.
+
+        Args:
+            data_repository: Repositorio de datos del proceso principal
+            perception_module: Módulo de percepción del proceso principal
+            n_workers: Procesos de shard
+            virtual_nodes: Nodos virtuales por shard en el anillo
+            settings_overrides: Configuración a replicar en los procesos hijos
+        """
+        self.data_repository = data_repository
+        self.perception = perception_module
+        self.persistence = None
+        self.pending_decisions = None  # cada shard guarda las de sus usuarios
+        self.pipeline = None
+        self.candidate_pools = None
+        self.settings_overrides = settings_overrides or {}
+        persistence_dir = self.settings_overrides.get('PERSISTENCE_DIR')
+        self.persistence_dir = Path(persistence_dir) if persistence_dir is not None else None
+
+        self._ctx = mp.get_context('spawn')
+        self._lock = _ReadWriteLock()
+        self.ring = ConsistentHashRing(virtual_nodes=virtual_nodes)
+        self.shards: Dict[str, _ShardHandle] = {}
+        self.rebalances: List[Dict] = []
+
+        start = time.perf_counter()
+        previous = self._load_membership()
+        self._next_id = max((_shard_number(name) + 1 for name in previous), default=0)
+        kept = previous[:n_workers]
+        retiring = previous[n_workers:]
+        names = kept + [self._new_name() for _ in range(n_workers - len(kept))]
+
+        shared_path = self._export_shared_data()
+        try:
+            handles = [self._spawn_shard(shared_path, name) for name in names + retiring]
+            for handle in handles:
+                handle.receive()  # esperar a que cargue datos y agente
+                self.shards[handle.name] = handle
+            for name in names:
+                self.ring.add_node(name)
+        finally:
+            self._discard_shared_data(shared_path)
+
+        if previous:
+            rebalance_start = time.perf_counter()
+            moved = self._rebalance(list(self.shards))
+            for name in retiring:
+                self._retire(name)
+            if moved or retiring:
+                self.rebalances.append({
+                    'worker': None,
+                    'workers': len(self.shards),
+                    'moved_users': sum(moved.values()),
+                    'moved_from': moved,
+                    'retired': retiring,
+                    'elapsed_ms': (time.perf_counter() - rebalance_start) * 1000
+                })
+                logger.info(f"Usuarios re-ubicados al arrancar: {sum(moved.values())} migrados, "
+                            f"shards retirados: {retiring}")
+        self._save_membership()
+
+        logger.info(f"ShardedAgentDispatcher inicializado con {n_workers} shards "
+                    f"en {time.perf_counter() - start:.1f}s")
+
+    def _load_membership(self) -> List[str]:
+        """
+        Shards de la ejecución anterior
+
+        Sin SHARD_MEMBERSHIP (estado escrito antes de guardarlo) se usan los
+        directorios shard-N existentes.
+
+        Returns:
+            Nombres de los shards, en orden de creación ([] sin persistencia)
+        """
+        if self.persistence_dir is None:
+            return []
+        path = self.persistence_dir / SHARD_MEMBERSHIP
+        if path.exists():
+            return list(json.loads(path.read_text())['shards'])
+        if not self.persistence_dir.is_dir():
+            return []
+        names = [
+            entry.name for entry in self.persistence_dir.iterdir()
+            if entry.is_dir() and _shard_number(entry.name) >= 0
+        ]
+        return sorted(names, key=_shard_number)
+
+    def _save_membership(self) -> None:
+        """Guardar (de forma atómica) los miembros actuales del anillo"""
+        if self.persistence_dir is None:
+            return
+        self.persistence_dir.mkdir(parents=True, exist_ok=True)
+        path = self.persistence_dir / SHARD_MEMBERSHIP
+        tmp_path = path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps({
+            'shards': list(self.ring.nodes),
+            'virtual_nodes': self.ring.virtual_nodes
+        }))
+        os.replace(tmp_path, path)
+
+    def _export_shared_data(self) -> Optional[Path]:
+        """
+        Volcar las tablas del proceso principal para que los shards las mapeen
+
+        Cada shard mapea las columnas numéricas copy-on-write en lugar de
+        releer y parsear el dataset, así que las páginas se comparten entre
+        procesos. Los mapeos sobreviven al borrado del volcado, que se
+        descarta en cuanto los shards han cargado.
+
+        Returns:
+            Directorio del volcado (None si SHARD_SHARED_DATA está desactivado)
+        """
+        if not self.settings_overrides.get('SHARD_SHARED_DATA', True):
+            return None
+        return self.data_repository.export_shared(
+            Path(tempfile.mkdtemp(prefix='shard-data-')) / 'tables'
+        )
+
+    @staticmethod
+    def _discard_shared_data(shared_path: Optional[Path]) -> None:
+        """Borrar un volcado una vez cargado por los shards"""
+        if shared_path is not None:
+            shutil.rmtree(shared_path.parent, ignore_errors=True)
+
+    def _new_name(self) -> str:
+        """Nombre para un shard nuevo"""
+        name = f"shard-{self._next_id}"
+        self._next_id += 1
+        return name
+
+    def _spawn_shard(self, shared_path: Optional[Path] = None,
+                     name: Optional[str] = None) -> _ShardHandle:
+        """Lanzar un proceso de shard (aún no registrado ni listo)"""
+        name = name or self._new_name()
+        overrides = dict(self.settings_overrides)
+        if shared_path is not None:
+            overrides['SHARED_DATA_PATH'] = shared_path
+        return _ShardHandle(name, self._ctx, overrides)
+
+    def _route(self, user_id: int, op: str, *args) -> Any:
+        """Ejecutar una operación en el shard propietario del usuario"""
+        self._lock.acquire_read()
+        try:
+            return self.shards[self.ring.owner_of(user_id)].call(op, *args)
+        finally:
+            self._lock.release_read()
+
+    def _broadcast(self, op: str, *args, names: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Enviar una operación a varios shards en paralelo y recoger los resultados"""
+        return self._scatter(op, {name: args for name in (names or list(self.shards))})
+
+    def _scatter(self, op: str, args_by_shard: Dict[str, tuple]) -> Dict[str, Any]:
+        """Enviar a cada shard sus propios argumentos en paralelo y recoger los resultados"""
+        handles = [self.shards[name] for name in args_by_shard]
+        for handle in handles:
+            handle.lock.acquire()
+        try:
+            for handle in handles:
+                handle.send(op, args_by_shard[handle.name])
+            return {handle.name: handle.receive() for handle in handles}
+        finally:
+            for handle in handles:
+                handle.lock.release()
+
+    # Interfaz del agente ---------------------------------------------------
+
+    def recommend(self, user_id: int, context: Optional[Dict] = None) -> Tuple[Recommendation, DecisionInfo]:
+        return self._route(user_id, 'recommend', user_id, context)
+
+    def recommend_slate(self, user_id: int, top_k: int,
+                        context: Optional[Dict] = None) -> Tuple[List[Recommendation], DecisionInfo]:
+        return self._route(user_id, 'recommend_slate', user_id, top_k, context)
+
+    def recommend_hybrid(self, user_id: int, top_k: int,
+                         context: Optional[Dict] = None) -> Tuple[List[Recommendation], DecisionInfo]:
+        return self._route(user_id, 'recommend_hybrid', user_id, top_k, context)
+
+    def learn_from_feedback(self, user_id: int, recommendation: Recommendation,
+                            feedback_type: str, feedback_value: Optional[float] = None) -> LearningInfo:
+        return self._route(user_id, 'learn_from_feedback', user_id, recommendation,
+                           feedback_type, feedback_value)
+
+    def learn_from_feedback_batch(self, events: List[Dict]) -> Dict:
+        """Repartir un lote de feedback entre los shards propietarios y combinar los informes"""
+        self._lock.acquire_read()
+        try:
+            owners = self.ring.owners_of([event['user_id'] for event in events])
+            groups = {
+                self.ring.nodes[owner]: np.flatnonzero(owners == owner)
+                for owner in np.unique(owners).tolist()
+            }
+            reports = self._scatter('learn_from_feedback_batch', {
+                name: ([events[i] for i in positions.tolist()],) for name, positions in groups.items()
+            })
+        finally:
+            self._lock.release_read()
+
+        statuses = [None] * len(events)
+        for name, positions in groups.items():
+            for i, status in zip(positions.tolist(), reports[name]['statuses']):
+                statuses[i] = status
+        return {
+            'statuses': statuses,
+            'applied': sum(report['applied'] for report in reports.values()),
+            'total_reward': sum(report['total_reward'] for report in reports.values())
+        }
+
+    def find_recommendation(self, user_id: int, artist_id: int) -> Optional[Recommendation]:
+        return self._route(user_id, 'find_recommendation', user_id, artist_id)
+
+    def resolve_recommendation(self, user_id: int, recommendation_id: str,
+                               artist_id: Optional[int] = None) -> Optional[Recommendation]:
+        # La decisión pendiente vive en el shard del usuario que la recibió
+        return self._route(user_id, 'resolve_recommendation', user_id, recommendation_id, artist_id)
+
+    def get_user_profile(self, user_id: int) -> Optional[Dict]:
+        return self._route(user_id, 'get_user_profile', user_id)
+
+    def on_data_ingested(self, kind: str, batch) -> None:
+        """Replicar en todos los shards un batch aplicado en el proceso principal"""
+        self._lock.acquire_read()
+        try:
+            self._broadcast('apply_batch', kind, batch)
+        finally:
+            self._lock.release_read()
+
+    def get_agent_statistics(self) -> AgentStatistics:
+        """Combinar las estadísticas de todos los shards"""
+        self._lock.acquire_read()
+        try:
+            partials = list(self._broadcast('get_agent_statistics').values())
+        finally:
+            self._lock.release_read()
+        return merge_agent_statistics(
+            partials, top_users=self.settings_overrides.get('STATISTICS_TOP_USERS', 10)
+        )
+
+    def get_persistence_statistics(self) -> Optional[Dict]:
+        """Combinar las estadísticas de persistencia de los shards (None si ninguno la usa)"""
+        self._lock.acquire_read()
+        try:
+            partials = {
+                name: stats for name, stats in self._broadcast('get_persistence_statistics').items()
+                if stats is not None
+            }
+        finally:
+            self._lock.release_read()
+        if not partials:
+            return None
+        totals = {
+            key: sum(stats[key] for stats in partials.values())
+            for key in ('records_written', 'log_flushes', 'periodic_flushes', 'snapshots_written',
+                        'buffered_records', 'updates_since_snapshot')
+        }
+        return {**totals, 'shards': partials}
+
+    def shutdown(self) -> None:
+        """Detener los procesos de shard (cada uno cierra su persistencia)"""
+        self._lock.acquire_write()
+        try:
+            for handle in self.shards.values():
+                try:
+                    handle.call('stop')
+                except (EOFError, OSError) as e:
+                    logger.warning(f"Shard {handle.name} ya detenido: {e}")
+                handle.process.join(timeout=10)
+        finally:
+            self._lock.release_write()
+
+    # Rebalanceo ------------------------------------------------------------
+
+    def add_worker(self) -> Dict:
+        """
+        Arrancar un shard nuevo y migrarle los usuarios que pasa a poseer
+
+        Con hashing consistente solo cambian de dueño ~1/n de los usuarios, y
+        todos hacia el shard nuevo. Las peticiones esperan durante la migración.
+
+        Returns:
+            Informe del rebalanceo
+        """
+        shared_path = self._export_shared_data()
+        try:
+            handle = self._spawn_shard(shared_path)
+            handle.receive()
+        finally:
+            self._discard_shared_data(shared_path)
+        name = handle.name
+
+        self._lock.acquire_write()
+        try:
+            start = time.perf_counter()
+            self.shards[name] = handle
+            self.ring.add_node(name)
+            moved = self._rebalance([other for other in self.shards if other != name])
+            self._save_membership()
+
+            report = {
+                'worker': name,
+                'workers': len(self.shards),
+                'moved_users': sum(moved.values()),
+                'moved_from': moved,
+                'elapsed_ms': (time.perf_counter() - start) * 1000
+            }
+        finally:
+            self._lock.release_write()
+
+        self.rebalances.append(report)
+        logger.info(f"Shard {name} añadido: {report['moved_users']} usuarios migrados "
+                    f"en {report['elapsed_ms']:.1f} ms")
+
+        return report
+
+    def _rebalance(self, sources: List[str]) -> Dict:
+        """
+        Migrar a su dueño en el anillo los usuarios de `sources` que ya no les pertenecen
+
+        Se guarda primero el snapshot de los destinos y luego el de los
+        orígenes: si el proceso cae en medio, el usuario queda en ambos y el
+        siguiente arranque lo vuelve a migrar (la importación sobrescribe).
+
+        Args:
+            sources: Shards cuyos usuarios se revisan
+
+        Returns:
+            Usuarios migrados por shard de origen
+        """
+        moved = {}
+        targets = set()
+        for source, user_ids in self._broadcast('user_ids', names=sources).items():
+            if len(user_ids) == 0:
+                continue
+            owners = self.ring.owners_of(user_ids)
+            for owner in np.unique(owners).tolist():
+                target = self.ring.nodes[owner]
+                if target == source:
+                    continue
+                moving = user_ids[owners == owner]
+                payload = self.shards[source].call('export_users', moving.tolist())
+                self.shards[target].call('import_users', payload)
+                moved[source] = moved.get(source, 0) + int(len(moving))
+                targets.add(target)
+
+        # Los snapshots dejan de contener a los usuarios migrados
+        if self.persistence_dir is not None and moved:
+            self._broadcast('save_snapshot', names=sorted(targets))
+            self._broadcast('save_snapshot', names=list(moved))
+
+        return moved
+
+    def _retire(self, name: str) -> None:
+        """Detener un shard ya vaciado y borrar su directorio de persistencia"""
+        handle = self.shards.pop(name)
+        handle.call('stop')
+        handle.process.join(timeout=10)
+        if self.persistence_dir is not None:
+            shutil.rmtree(self.persistence_dir / name, ignore_errors=True)
+
+    def get_statistics(self) -> Dict:
+        """Obtener estadísticas del sharding"""
+        self._lock.acquire_read()
+        try:
+            users = {name: int(len(ids)) for name, ids in self._broadcast('user_ids').items()}
+        finally:
+            self._lock.release_read()
+        return {
+            'workers': len(self.shards),
+            'virtual_nodes': self.ring.virtual_nodes,
+            'shards': {
+                name: {
+                    'pid': handle.process.pid,
+                    'alive': handle.process.is_alive(),
+                    'users': users.get(name, 0),
+                    'requests': handle.requests
+                }
+                for name, handle in self.shards.items()
+            },
+            'rebalances': self.rebalances
+        }
+
+
+def _shard_number(name: str) -> int:
+    """Número de un nombre shard-N (-1 si no sigue ese formato)"""
+    prefix, _, number = name.partition('-')
+    return int(number) if prefix == 'shard' and number.isdigit() else -1
+
+
+def merge_agent_statistics(partials: List[AgentStatistics], top_users: int = 10) -> AgentStatistics:
+    """
+    Combinar estadísticas de varios agentes (media y varianza por Chan et al.)
+
+    Args:
+        partials: Estadísticas de cada shard
+        top_users: Usuarios a conservar en user_profiles
+
+    Returns:
+        Estadísticas combinadas
+    """
+    total_recommendations = sum(p.total_recommendations for p in partials)
+    total_reward = sum(p.average_reward * p.total_recommendations for p in partials)
+
+    strategy_performance = {}
+    for strategy in {s for p in partials for s in p.strategy_performance}:
+        count, mean, m2, successes = 0, 0.0, 0.0, 0.0
+        for p in partials:
+            stats = p.strategy_performance.get(strategy)
+            if not stats or stats['count'] == 0:
+                continue
+            n = stats['count']
+            delta = stats['avg_reward'] - mean
+            total = count + n
+            mean += delta * n / total
+            m2 += stats['std_reward'] ** 2 * n + delta ** 2 * count * n / total
+            successes += stats['success_rate'] * n
+            count = total
+        strategy_performance[strategy] = {
+            'count': count,
+            'avg_reward': mean,
+            'std_reward': float(np.sqrt(m2 / count)) if count else 0.0,
+            'success_rate': successes / count if count else 0.0
+        }
+
+    profiles = sorted(
+        ((user_id, profile) for p in partials for user_id, profile in p.user_profiles.items()),
+        key=lambda item: item[1]['total_interactions'], reverse=True
+    )[:top_users]
+
+    return AgentStatistics(
+        total_users=sum(p.total_users for p in partials),
+        total_recommendations=total_recommendations,
+        average_reward=total_reward / max(1, total_recommendations),
+        active_sessions=sum(p.active_sessions for p in partials),
+        strategy_performance=strategy_performance,
+        user_profiles=dict(profiles)
+    )
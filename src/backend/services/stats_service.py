@@ -0,0 +1,153 @@
+"""Servicio de Estadísticas - Agregados en streaming de memoria acotada"""
+import numpy as np
+from typing import Dict, List, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class RunningStats:
+    """Media, varianza (Welford) y tasa de éxito en streaming"""
+
+    def __init__(self, success_threshold: float = 0.6):
+        """
+        Inicializar agregados
+
+        Args:
+            success_threshold: Recompensa a partir de la cual (estricto) se cuenta un éxito
+        """
+        self.success_threshold = success_threshold
+
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.total = 0.0
+        self.success_count = 0
+
+    def update(self, value: float) -> None:
+        """
+        Añadir una observación
+
+        Args:
+            value: Valor observado
+        """
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.total += value
+        if value > self.success_threshold:
+            self.success_count += 1
+
+    def update_many(self, values: np.ndarray) -> None:
+        """
+        Añadir un lote de observaciones (combinación paralela de Chan et al.)
+
+        Args:
+            values: Array de valores observados
+        """
+        values = np.asarray(values, dtype=np.float64)
+        n = len(values)
+        if n == 0:
+            return
+
+        batch_mean = float(values.mean())
+        batch_m2 = float(((values - batch_mean) ** 2).sum())
+
+        total_count = self.count + n
+        delta = batch_mean - self.mean
+        self.mean += delta * n / total_count
+        self.m2 += batch_m2 + delta ** 2 * self.count * n / total_count
+        self.count = total_count
+        self.total += float(values.sum())
+        self.success_count += int((values > self.success_threshold).sum())
+
+    @property
+    def std(self) -> float:
+        """Desviación estándar poblacional"""
+        return float(np.sqrt(self.m2 / self.count)) if self.count > 0 else 0.0
+
+    @property
+    def success_rate(self) -> float:
+        """Proporción de observaciones por encima del umbral"""
+        return self.success_count / self.count if self.count > 0 else 0.0
+
+    def get_state(self) -> np.ndarray:
+        """Agregados como array [count, mean, m2, total, success_count]"""
+        return np.array([self.count, self.mean, self.m2, self.total, self.success_count],
+                        dtype=np.float64)
+
+    def set_state(self, state: np.ndarray) -> None:
+        """Restaurar los agregados devueltos por get_state"""
+        self.count = int(state[0])
+        self.mean = float(state[1])
+        self.m2 = float(state[2])
+        self.total = float(state[3])
+        self.success_count = int(state[4])
+
+    def to_dict(self) -> Dict:
+        """Resumen en el formato de strategy_performance"""
+        return {
+            'count': self.count,
+            'avg_reward': float(self.mean),
+            'std_reward': self.std,
+            'success_rate': self.success_rate
+        }
+
+
+class TopKTracker:
+    """Top-k de claves por un valor que solo crece (p.ej. interacciones por usuario)"""
+
+    def __init__(self, k: int = 10):
+        """
+        Inicializar tracker
+
+        Args:
+            k: Número de claves a mantener
+        """
+        self.k = k
+        self._values: Dict = {}
+
+    def update(self, key, value: float) -> None:
+        """
+        Registrar el nuevo valor de una clave
+
+        Como los valores son monótonos crecientes, una clave fuera del top-k
+        solo entra al superar el mínimo actual: el coste es O(k), constante.
+
+        Args:
+            key: Clave (p.ej. user_id)
+            value: Valor actual de la clave
+        """
+        if key in self._values or len(self._values) < self.k:
+            self._values[key] = value
+            return
+
+        min_key = min(self._values, key=self._values.__getitem__)
+        if value > self._values[min_key]:
+            del self._values[min_key]
+            self._values[key] = value
+
+    def reset(self, keys: np.ndarray, values: np.ndarray) -> None:
+        """
+        Recalcular el top-k desde los valores de todas las claves
+
+        Quitar una clave del top-k deja un hueco que `update` solo rellena
+        cuando otra clave vuelve a crecer; tras cambiar el conjunto de claves
+        (p.ej. al migrar usuarios) hay que recalcularlo entero.
+
+        Args:
+            keys: Claves
+            values: Valor actual de cada clave (las de valor 0 no entran)
+        """
+        self._values = {}
+        if len(keys) == 0:
+            return
+        top = np.argsort(-values, kind='stable')[:self.k]
+        for key, value in zip(keys[top].tolist(), values[top].tolist()):
+            if value > 0:
+                self._values[key] = value
+
+    def top(self) -> List[Tuple]:
+        """Claves del top-k ordenadas por valor descendente"""
+        return sorted(self._values.items(), key=lambda item: item[1], reverse=True)
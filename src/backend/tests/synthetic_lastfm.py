@@ -0,0 +1,56 @@
+"""Dataset Last.fm sintético y agente construido sobre él, compartidos por los tests"""
+from pathlib import Path
+
+import numpy as np
+
+from core.config import settings
+from repositories.data_repository import DataRepository
+from services.agent_service import IntelligentRecommendationAgent
+from services.perception_service import PerceptionModule
+from services.reward_service import MultimodalRewardSystem
+
+N_USERS = 30
+N_ARTISTS = 40
+N_TAGS = 5
+
+
+def write_dataset(data_path: Path) -> None:
+    """Escribir un dataset Last.fm sintético y pequeño"""
+    rng = np.random.default_rng(0)
+    data_path.mkdir()
+    with open(data_path / 'artists.dat', 'w') as f:
+        f.write('id\tname\turl\tpictureURL\n')
+        for artist_id in range(1, N_ARTISTS + 1):
+            f.write(f'{artist_id}\tArtist {artist_id}\thttp://a/{artist_id}\thttp://p/{artist_id}\n')
+    with open(data_path / 'user_artists.dat', 'w') as f:
+        f.write('userID\tartistID\tweight\n')
+        for user_id in range(1, N_USERS + 1):
+            for artist_id in rng.choice(np.arange(1, N_ARTISTS + 1), 8, replace=False):
+                f.write(f'{user_id}\t{artist_id}\t{rng.integers(1, 500)}\n')
+    with open(data_path / 'user_friends.dat', 'w') as f:
+        f.write('userID\tfriendID\n')
+        for user_id in range(1, N_USERS + 1):
+            friend_id = user_id % N_USERS + 1
+            f.write(f'{user_id}\t{friend_id}\n{friend_id}\t{user_id}\n')
+    with open(data_path / 'tags.dat', 'w') as f:
+        f.write('tagID\ttagValue\n')
+        for tag_id in range(1, N_TAGS + 1):
+            f.write(f'{tag_id}\ttag {tag_id}\n')
+    with open(data_path / 'user_taggedartists.dat', 'w') as f:
+        f.write('userID\tartistID\ttagID\tday\tmonth\tyear\n')
+        for user_id in range(1, N_USERS + 1):
+            f.write(f'{user_id}\t{rng.integers(1, N_ARTISTS + 1)}\t{rng.integers(1, N_TAGS + 1)}\t1\t1\t2010\n')
+
+
+def build_agent(data_path: Path, **kwargs) -> IntelligentRecommendationAgent:
+    """Agente completo sobre el dataset sintético; kwargs se pasan al constructor del agente"""
+    repository = DataRepository(data_path)
+    perception = PerceptionModule(
+        repository.user_artists, repository.user_friends, repository.user_tagged,
+        repository.artists, repository.tags
+    )
+    strategies = settings.RECOMMENDATION_STRATEGIES
+    return IntelligentRecommendationAgent(
+        perception, MultimodalRewardSystem(perception, strategies, seed=0),
+        repository, strategies, random_seed=0, **kwargs
+    )
@@ -0,0 +1,100 @@
+"""Tests del bandit: almacén vectorizado y políticas de selección"""
+import numpy as np
+import pytest
+
+from services.bandit_service import BanditStore, LinUCBPolicy, UCBPolicy, create_policy
+
+ARMS = ['a', 'b', 'c', 'd']
+
+
+def _store(n_users: int = 3, recent_window: int = 4) -> BanditStore:
+    store = BanditStore(ARMS, initial_capacity=1, recent_window=recent_window)
+    for user_id in range(n_users):
+        store.add_user(100 + user_id, 1.0)
+    return store
+
+
+def test_update_many_matches_sequential_updates():
+    rng = np.random.default_rng(0)
+    rows = rng.integers(0, 3, 50)
+    arms = rng.integers(0, len(ARMS), 50)
+    rewards = rng.random(50).astype(np.float32)
+
+    batched, sequential = _store(), _store()
+    batched.update_many(rows, arms, rewards)
+    for row, arm, reward in zip(rows.tolist(), arms.tolist(), rewards.tolist()):
+        sequential.update(row, arm, reward)
+
+    for name in ('arm_counts', 'total_steps', 'recent_rewards'):
+        np.testing.assert_array_equal(getattr(batched, name), getattr(sequential, name))
+    for name in ('arm_rewards', 'arm_means', 'recent_sums', 'recent_sums_sq'):
+        np.testing.assert_allclose(getattr(batched, name), getattr(sequential, name), rtol=1e-5)
+    np.testing.assert_allclose(batched.confidence_of(np.arange(3)), sequential.confidence_of(np.arange(3)))
+
+
+def test_store_grows_and_round_trips_rows():
+    store = _store(n_users=5)
+    assert store.capacity >= 5
+    store.update_many(np.arange(5), np.array([0, 1, 2, 3, 0]), np.full(5, 0.5))
+
+    exported = store.export_rows(np.array([1, 3]))
+    store.remove_users([101, 103])
+    assert store.n_rows == 3 and store.get_row(101) is None
+
+    rows = store.import_rows(exported)
+    np.testing.assert_array_equal(store.user_ids[rows], [101, 103])
+    np.testing.assert_array_equal(store.arm_counts[rows], [[0, 1, 0, 0], [0, 0, 0, 1]])
+    assert store.get_user_statistics(103)['arm_counts'] == [0, 0, 0, 1]
+
+
+def test_ucb_plays_unplayed_arms_first_then_best_mean():
+    store = _store(n_users=1)
+    policy = UCBPolicy()
+    rows = np.array([0])
+    for expected_arm in range(len(ARMS)):
+        arms, explore = policy.select_arms(store, rows)
+        assert arms[0] == expected_arm and explore[0]
+        store.update_many(rows, arms, np.array([0.9 if expected_arm == 2 else 0.1]))
+
+    arms, explore = policy.select_arms(store, rows)
+    assert arms[0] == 2 and not explore[0]
+
+
+@pytest.mark.parametrize('name', ['thompson_beta', 'thompson_gaussian'])
+def test_thompson_prefers_rewarding_arm(name):
+    store = _store(n_users=1)
+    rows = np.zeros(200, dtype=np.int64)
+    store.update_many(rows, np.repeat(np.arange(len(ARMS)), 50), np.repeat([0.0, 0.0, 1.0, 0.0], 50))
+
+    policy = create_policy(name, len(ARMS), 0, seed=0)
+    arms, explore = policy.select_arms(store, rows)
+    assert np.mean(arms == 2) > 0.9
+    assert not explore.any()
+
+
+def test_linucb_sherman_morrison_matches_ridge_solution():
+    rng = np.random.default_rng(1)
+    policy = LinUCBPolicy(n_arms=2, n_features=3, alpha=0.0)
+    contexts = rng.random((40, 3))
+    arms = rng.integers(0, 2, 40)
+    # El brazo 0 premia la primera feature; el 1, la segunda
+    rewards = np.where(arms == 0, contexts[:, 0], contexts[:, 1])
+    for start in range(0, 40, 10):
+        chunk = slice(start, start + 10)
+        policy.update_many(np.zeros(10, dtype=np.int64), arms[chunk], rewards[chunk], contexts[chunk])
+
+    x = np.hstack([contexts, np.ones((40, 1))])
+    for arm in range(2):
+        mask = arms == arm
+        A = np.eye(4) + x[mask].T @ x[mask]
+        np.testing.assert_allclose(policy.A_inv[arm], np.linalg.inv(A), atol=1e-10)
+        np.testing.assert_allclose(policy.theta[arm], np.linalg.solve(A, x[mask].T @ rewards[mask]), atol=1e-10)
+
+    store = _store(n_users=2)
+    selected, _ = policy.select_arms(store, np.array([0, 1]), np.array([[1.0, 0.0, 0.0], [0.0, 1.0, 0.0]]))
+    np.testing.assert_array_equal(selected, [0, 1])
+
+
+def test_create_policy_rejects_unknown_name():
+    with pytest.raises(ValueError):
+        create_policy('greedy', len(ARMS), 0)
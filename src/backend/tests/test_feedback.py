@@ -0,0 +1,101 @@
+"""Tests de feedback: atribución por recommendation_id y rechazo de lo que no está pendiente"""
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api.routes import recommendations
+from core.dependencies import (
+    get_agent_service, get_feedback_batcher, get_request_executor, get_response_cache
+)
+from services.executor_service import RequestExecutor
+from services.feedback_service import FeedbackBatcher
+from synthetic_lastfm import build_agent, write_dataset
+
+
+@pytest.fixture
+def agent(tmp_path):
+    write_dataset(tmp_path / 'data')
+    return build_agent(tmp_path / 'data')
+
+
+def _arm_count(agent, user_id: int, strategy: str) -> int:
+    row = agent.bandit_store.get_row(user_id)
+    return 0 if row is None else int(agent.bandit_store.arm_counts[row, agent.strategies.index(strategy)])
+
+
+def test_feedback_is_credited_to_the_recommendation_with_that_id(agent):
+    recommendations_, _ = agent.recommend_slate(1, 3)
+    target = recommendations_[1]
+
+    # Otro usuario u otro artista no consumen la decisión
+    assert agent.resolve_recommendation(2, target.recommendation_id) is None
+    assert agent.resolve_recommendation(1, target.recommendation_id, target.artist_id + 1) is None
+
+    recommendation = agent.resolve_recommendation(1, target.recommendation_id, target.artist_id)
+    assert recommendation is target
+    before = _arm_count(agent, 1, target.strategy)
+    info = agent.learn_from_feedback(1, recommendation, 'positive')
+    assert info.strategy == target.strategy
+    assert _arm_count(agent, 1, target.strategy) == before + 1
+
+    # Cada decisión admite un único feedback
+    assert agent.resolve_recommendation(1, target.recommendation_id) is None
+
+
+def test_feedback_without_id_resolves_only_pending_recommendations(agent):
+    recommendations_, _ = agent.recommend_slate(1, 2)
+    target = recommendations_[0]
+
+    assert agent.find_recommendation(1, target.artist_id) is target
+    assert agent.find_recommendation(1, target.artist_id) is None
+    assert agent.resolve_recommendation(1, target.recommendation_id) is None
+
+    report = agent.learn_from_feedback_batch([
+        {'user_id': 1, 'artist_id': recommendations_[1].artist_id, 'feedback_type': 'positive'},
+        {'user_id': 1, 'artist_id': target.artist_id, 'feedback_type': 'positive'},
+        {'user_id': 1, 'artist_id': target.artist_id, 'recommendation_id': 'missing',
+         'feedback_type': 'positive'}
+    ])
+    assert report['statuses'] == ['applied', 'not_found', 'not_found']
+    assert report['applied'] == 1
+    assert agent.global_statistics['total_recommendations'] == 1
+
+
+def test_feedback_routes_never_learn_from_unknown_recommendations(agent):
+    executor = RequestExecutor(max_workers=0)
+    app = FastAPI()
+    app.include_router(recommendations.router)
+    app.dependency_overrides[get_agent_service] = lambda: agent
+    app.dependency_overrides[get_request_executor] = lambda: executor
+    app.dependency_overrides[get_response_cache] = lambda: None
+    app.dependency_overrides[get_feedback_batcher] = lambda: FeedbackBatcher(agent, executor, max_wait=0.0)
+
+    with TestClient(app) as client:
+        recommendation = client.post('/api/recommend', json={'user_id': 1, 'top_k': 2}).json()
+        slate = recommendation['slate']
+
+        response = client.post('/api/feedback', json={
+            'user_id': 1, 'artist_id': slate[0]['artist_id'],
+            'recommendation_id': slate[0]['recommendation_id'], 'feedback_type': 'positive'
+        })
+        assert response.status_code == 200
+        assert response.json()['strategy'] == recommendation['strategy']
+
+        # Sin ID ni decisión pendiente para ese artista: 404 en lugar de una estrategia por defecto
+        response = client.post('/api/feedback', json={
+            'user_id': 1, 'artist_id': slate[0]['artist_id'], 'feedback_type': 'positive'
+        })
+        assert response.status_code == 404
+
+        response = client.post('/api/feedback/batch', json={'events': [
+            {'user_id': 1, 'artist_id': slate[1]['artist_id'], 'feedback_type': 'negative'},
+            {'user_id': 1, 'artist_id': slate[1]['artist_id'], 'feedback_type': 'negative'},
+            {'user_id': 999, 'artist_id': 1, 'feedback_type': 'negative'}
+        ]})
+        assert response.status_code == 200
+        assert response.json()['statuses'] == ['applied', 'not_found', 'unknown_user']
+
+    assert agent.global_statistics['total_recommendations'] == 2
+    row = agent.bandit_store.get_row(1)
+    assert int(np.sum(agent.bandit_store.arm_counts[row])) == 2
@@ -0,0 +1,121 @@
+"""Tests de ingesta: el camino incremental equivale a recalcular desde cero y rechaza IDs fuera del catálogo"""
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api.routes import ingestion
+from core.dependencies import get_ingestion_service, get_request_executor
+from repositories.data_repository import DataRepository
+from services.executor_service import RequestExecutor
+from services.ingestion_service import InteractionIngestionService
+from services.perception_service import PerceptionModule
+from synthetic_lastfm import N_ARTISTS, N_TAGS, N_USERS, write_dataset
+
+NEW_USERS = (101, 102, 103)
+
+
+def _build(repository: DataRepository):
+    """Percepción recalculada desde las tablas actuales del repositorio"""
+    return PerceptionModule(
+        repository.user_artists, repository.user_friends, repository.user_tagged,
+        repository.artists, repository.tags
+    )
+
+
+def _new_events(repository: DataRepository):
+    """Escuchas de pares usuario-artista nuevos, amistades y tags (con usuarios nuevos)"""
+    rng = np.random.default_rng(2)
+    seen = set(zip(repository.user_artists['userID'].tolist(), repository.user_artists['artistID'].tolist()))
+    interactions = [
+        (user_id, artist_id, int(rng.integers(1, 500)))
+        for user_id in list(range(1, N_USERS + 1)) + list(NEW_USERS[:2])
+        for artist_id in rng.choice(np.arange(1, N_ARTISTS + 1), 3, replace=False).tolist()
+        if (user_id, artist_id) not in seen
+    ]
+    friendships = [(NEW_USERS[0], 1), (3, 10), (NEW_USERS[2], NEW_USERS[1])]
+    tags = [
+        (int(user_id), int(artist_id), int(tag_id))
+        for user_id, artist_id, tag_id in zip(
+            rng.integers(1, N_USERS + 1, 20), rng.integers(1, N_ARTISTS + 1, 20), rng.integers(1, N_TAGS + 1, 20)
+        )
+    ] + [(NEW_USERS[1], 1, 1)]
+    return interactions, friendships, tags
+
+
+@pytest.fixture
+def service(tmp_path):
+    write_dataset(tmp_path / 'data')
+    repository = DataRepository(tmp_path / 'data')
+    return InteractionIngestionService(repository, _build(repository), batch_size=10 ** 6)
+
+
+def test_incremental_ingestion_matches_full_recompute(service):
+    interactions, friendships, tags = _new_events(service.data_repository)
+    half = len(interactions) // 2
+    service.ingest(interactions[:half])
+    service.flush()
+    service.ingest_friendships(friendships)
+    service.ingest(interactions[half:])
+    service.flush()
+    service.ingest_tags(tags)
+
+    incremental = service.perception
+    full = _build(service.data_repository)
+    user_ids = np.sort(full.user_ids)
+    np.testing.assert_array_equal(np.sort(incremental.user_ids), user_ids)
+    np.testing.assert_array_equal(incremental.matrices.artist_ids, full.matrices.artist_ids)
+
+    rows = incremental.matrices.get_rows(user_ids)
+    full_rows = full.matrices.get_rows(user_ids)
+    np.testing.assert_array_equal(
+        incremental.matrices.user_items[rows].toarray(), full.matrices.user_items[full_rows].toarray()
+    )
+    np.testing.assert_array_equal(
+        incremental.matrices.friends[rows][:, rows].toarray(),
+        full.matrices.friends[full_rows][:, full_rows].toarray()
+    )
+    np.testing.assert_array_equal(
+        incremental.matrices.followers[rows][:, rows].toarray(),
+        full.matrices.followers[full_rows][:, full_rows].toarray()
+    )
+    np.testing.assert_allclose(incremental.get_user_states(user_ids), full.get_user_states(user_ids),
+                               rtol=1e-6, atol=1e-9)
+
+
+def test_unknown_artist_is_rejected_before_buffering(service):
+    matrices = service.perception.matrices.current
+    for artist_id in (N_ARTISTS + 1, 2 ** 40):
+        with pytest.raises(ValueError):
+            service.ingest([(1, 1, 5), (1, artist_id, 5)])
+
+    assert service.pending == 0
+    assert service.get_statistics()['events_rejected'] == 4
+    assert service.perception.matrices.current is matrices
+
+    with pytest.raises(ValueError):
+        service.ingest_tags([(1, 1, N_TAGS + 1)])
+    assert service.perception.matrices.current is matrices
+
+
+def test_interactions_route_rejects_ids_outside_catalog(service):
+    app = FastAPI()
+    app.include_router(ingestion.router)
+    app.dependency_overrides[get_ingestion_service] = lambda: service
+    app.dependency_overrides[get_request_executor] = lambda: RequestExecutor(max_workers=0)
+    client = TestClient(app)
+
+    response = client.post('/api/interactions', json={
+        'events': [{'user_id': 1, 'artist_id': N_ARTISTS + 1, 'weight': 3}], 'flush': True
+    })
+    assert response.status_code == 400
+    response = client.post('/api/interactions', json={
+        'events': [{'user_id': 1, 'artist_id': 2 ** 40, 'weight': 3}], 'flush': True
+    })
+    assert response.status_code == 422
+
+    response = client.post('/api/interactions', json={
+        'events': [{'user_id': 1, 'artist_id': N_ARTISTS, 'weight': 3}], 'flush': True
+    })
+    assert response.status_code == 200
+    assert response.json()['applied'] == 1
@@ -0,0 +1,115 @@
+"""Tests de persistencia: recuperación del estado del bandit tras matar el proceso"""
+import multiprocessing as mp
+import os
+import signal
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from core.config import settings
+from services.bandit_service import BanditStore
+from services.persistence_service import BanditPersistence
+from synthetic_lastfm import N_USERS, build_agent, write_dataset
+
+N_UPDATES = 200000
+CHUNK_SIZE = 50
+SNAPSHOT_INTERVAL = 500
+
+
+def _update_sequence():
+    """Secuencia determinista de actualizaciones (usuario, brazo, recompensa)"""
+    rng = np.random.default_rng(1)
+    user_ids = rng.integers(1, N_USERS + 1, N_UPDATES)
+    arms = rng.integers(0, len(settings.RECOMMENDATION_STRATEGIES), N_UPDATES)
+    # Las recompensas viajan como float32 en el log
+    rewards = rng.random(N_UPDATES).astype(np.float32).astype(np.float64)
+    return user_ids, arms, rewards
+
+
+def _learn_until_killed(data_path: Path, persistence_dir: Path, ready) -> None:
+    """Proceso hijo: aplicar la secuencia con persistencia hasta que lo maten"""
+    agent = build_agent(data_path)
+    agent.attach_persistence(BanditPersistence(
+        persistence_dir, flush_batch_size=64, flush_interval=0.01,
+        snapshot_interval=SNAPSHOT_INTERVAL
+    ))
+    user_ids, arms, rewards = _update_sequence()
+    for step, start in enumerate(range(0, N_UPDATES, CHUNK_SIZE)):
+        end = start + CHUNK_SIZE
+        agent.apply_updates(user_ids[start:end], arms[start:end], rewards[start:end])
+        if step == 3 * SNAPSHOT_INTERVAL // CHUNK_SIZE:
+            ready.set()
+    time.sleep(60)
+
+
+def test_recovery_after_kill_matches_applied_prefix(tmp_path):
+    data_path = tmp_path / 'data'
+    persistence_dir = tmp_path / 'persistence'
+    write_dataset(data_path)
+
+    ctx = mp.get_context('spawn')
+    ready = ctx.Event()
+    process = ctx.Process(target=_learn_until_killed, args=(data_path, persistence_dir, ready))
+    process.start()
+    try:
+        assert ready.wait(timeout=120), "el proceso hijo no llegó a escribir snapshots"
+        time.sleep(0.05)
+    finally:
+        os.kill(process.pid, signal.SIGKILL)
+        process.join()
+    assert process.exitcode == -signal.SIGKILL
+
+    # Un registro a medio escribir en el log más reciente no debe romper la recuperación
+    newest_log = sorted(persistence_dir.glob('bandit-*.wal'))[-1]
+    with open(newest_log, 'ab') as f:
+        f.write(b'\x01' * 7)
+
+    agent = build_agent(data_path)
+    persistence = BanditPersistence(persistence_dir)
+    report = agent.attach_persistence(persistence)
+    try:
+        assert report['snapshot_loaded']
+        recovered = agent.global_statistics['total_recommendations']
+        assert recovered >= 3 * SNAPSHOT_INTERVAL
+
+        # El estado recuperado es exactamente el de aplicar el prefijo escrito
+        user_ids, arms, rewards = _update_sequence()
+        expected = BanditStore(settings.RECOMMENDATION_STRATEGIES, recent_window=agent.bandit_store.recent_window)
+        rows = np.array([
+            expected.get_row(uid) if expected.get_row(uid) is not None
+            else expected.add_user(uid, 0.0)
+            for uid in user_ids[:recovered].tolist()
+        ])
+        expected.update_many(rows, arms[:recovered], rewards[:recovered])
+
+        store = agent.bandit_store
+        recovered_rows = np.array([store.get_row(uid) for uid in expected.user_ids[:expected.n_rows].tolist()])
+        assert store.n_rows == expected.n_rows
+        np.testing.assert_array_equal(store.arm_counts[recovered_rows], expected.arm_counts[:expected.n_rows])
+        np.testing.assert_array_equal(store.total_steps[recovered_rows], expected.total_steps[:expected.n_rows])
+        np.testing.assert_allclose(store.arm_rewards[recovered_rows], expected.arm_rewards[:expected.n_rows],
+                                   rtol=1e-5)
+        np.testing.assert_array_equal(store.recent_rewards[recovered_rows],
+                                      expected.recent_rewards[:expected.n_rows])
+        assert agent.global_statistics['total_reward'] == pytest.approx(rewards[:recovered].sum())
+    finally:
+        persistence.close()
+
+
+def test_periodic_flush_writes_buffer_without_new_appends(tmp_path):
+    persistence = BanditPersistence(tmp_path, flush_batch_size=1000, flush_interval=0.05)
+    persistence.start()
+    try:
+        persistence.append(np.array([1, 2]), np.array([0, 1]), np.array([0.5, 0.25]))
+        deadline = time.monotonic() + 5
+        while persistence.stats['records_written'] < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert persistence.stats['records_written'] == 2
+        assert persistence.stats['periodic_flushes'] >= 1
+
+        _, records = BanditPersistence(tmp_path).recover()
+        np.testing.assert_array_equal(records['user_id'], [1, 2])
+    finally:
+        persistence.close()
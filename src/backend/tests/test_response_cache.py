@@ -0,0 +1,77 @@
+"""Tests de la caché de respuestas: ETag, 304 e invalidación tras feedback e ingesta"""
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api.routes import recommendations
+from core.dependencies import get_agent_service, get_request_executor, get_response_cache
+from services.cache_service import VersionedResponseCache
+from services.executor_service import RequestExecutor
+from services.ingestion_service import InteractionIngestionService
+from synthetic_lastfm import N_ARTISTS, build_agent, write_dataset
+
+
+@pytest.fixture
+def setup(tmp_path):
+    write_dataset(tmp_path / 'data')
+    agent = build_agent(tmp_path / 'data')
+    response_cache = VersionedResponseCache()
+
+    # Mismo cableado que core.dependencies: la ingesta invalida a los usuarios afectados
+    ingestion = InteractionIngestionService(agent.data_repository, agent.perception, batch_size=10 ** 6)
+    ingestion.add_listener(agent.on_data_ingested)
+    ingestion.add_listener(
+        lambda kind, batch: response_cache.bump(agent.perception.affected_users(kind, batch))
+    )
+
+    app = FastAPI()
+    app.include_router(recommendations.router)
+    app.dependency_overrides[get_agent_service] = lambda: agent
+    app.dependency_overrides[get_request_executor] = lambda: RequestExecutor(max_workers=0)
+    app.dependency_overrides[get_response_cache] = lambda: response_cache
+    return TestClient(app), ingestion
+
+
+def test_profile_etag_returns_304_until_feedback_changes_it(setup):
+    client, _ = setup
+    first = client.get('/api/users/1/profile')
+    assert first.status_code == 200
+    etag = first.headers['etag']
+
+    cached = client.get('/api/users/1/profile', headers={'If-None-Match': etag})
+    assert cached.status_code == 304
+    assert cached.headers['etag'] == etag
+    assert cached.content == b''
+
+    recommendation = client.post('/api/recommend', json={'user_id': 1}).json()
+    response = client.post('/api/feedback', json={
+        'user_id': 1, 'artist_id': recommendation['artist_id'],
+        'recommendation_id': recommendation['recommendation_id'], 'feedback_type': 'positive'
+    })
+    assert response.status_code == 200
+
+    updated = client.get('/api/users/1/profile', headers={'If-None-Match': etag})
+    assert updated.status_code == 200
+    assert updated.headers['etag'] != etag
+    assert updated.json()['total_interactions'] == 1
+
+
+def test_state_etag_changes_after_ingestion(setup):
+    client, ingestion = setup
+    first = client.get('/api/users/1/state')
+    etag = first.headers['etag']
+    assert client.get('/api/users/1/state', headers={'If-None-Match': etag}).status_code == 304
+
+    # Otro usuario no invalida la respuesta cacheada
+    ingestion.ingest([(5, N_ARTISTS, 1000)])
+    ingestion.flush()
+    assert client.get('/api/users/1/state', headers={'If-None-Match': etag}).status_code == 304
+
+    listened = set(ingestion.data_repository.get_user_artist_ids(1).tolist())
+    artist_id = next(a for a in range(1, N_ARTISTS + 1) if a not in listened)
+    ingestion.ingest([(1, artist_id, 1000)])
+    ingestion.flush()
+    updated = client.get('/api/users/1/state', headers={'If-None-Match': etag})
+    assert updated.status_code == 200
+    assert updated.headers['etag'] != etag
+    assert updated.json() != first.json()
@@ -0,0 +1,54 @@
+"""Tests de recompensas: el cálculo vectorizado equivale al escalar"""
+import numpy as np
+import pytest
+
+from core.config import settings
+from repositories.data_repository import DataRepository
+from services.perception_service import PerceptionModule
+from services.reward_service import REWARD_COMPONENTS, MultimodalRewardSystem
+from synthetic_lastfm import N_USERS, write_dataset
+
+OUTCOMES = ['positive', 'neutral', 'negative']
+
+
+@pytest.fixture
+def perception(tmp_path):
+    write_dataset(tmp_path / 'data')
+    repository = DataRepository(tmp_path / 'data')
+    return PerceptionModule(
+        repository.user_artists, repository.user_friends, repository.user_tagged,
+        repository.artists, repository.tags
+    )
+
+
+def _events(n: int = 200):
+    rng = np.random.default_rng(3)
+    strategies = settings.RECOMMENDATION_STRATEGIES
+    return (
+        rng.integers(1, N_USERS + 1, n).tolist(),
+        [strategies[i] for i in rng.integers(0, len(strategies), n)],
+        [OUTCOMES[i] for i in rng.integers(0, len(OUTCOMES), n)]
+    )
+
+
+def test_vectorized_rewards_match_scalar_rewards_without_noise(perception):
+    rewards_system = MultimodalRewardSystem(perception, settings.RECOMMENDATION_STRATEGIES, noise_std=0.0)
+    user_ids, strategies, outcomes = _events()
+
+    rewards, components = rewards_system.calculate_rewards(user_ids, strategies, outcomes)
+    for i, (user_id, strategy, outcome) in enumerate(zip(user_ids, strategies, outcomes)):
+        reward, reward_components = rewards_system.calculate_reward(user_id, strategy, outcome)
+        assert rewards[i] == pytest.approx(reward)
+        np.testing.assert_allclose(components[i], [reward_components[c] for c in REWARD_COMPONENTS])
+
+
+def test_noise_only_perturbs_the_final_reward(perception):
+    noisy = MultimodalRewardSystem(perception, settings.RECOMMENDATION_STRATEGIES, noise_std=0.2, seed=0)
+    clean = MultimodalRewardSystem(perception, settings.RECOMMENDATION_STRATEGIES, noise_std=0.0)
+    user_ids, strategies, outcomes = _events()
+
+    noisy_rewards, noisy_components = noisy.calculate_rewards(user_ids, strategies, outcomes)
+    clean_rewards, clean_components = clean.calculate_rewards(user_ids, strategies, outcomes)
+    np.testing.assert_allclose(noisy_components, clean_components)
+    assert not np.allclose(noisy_rewards, clean_rewards)
+    assert np.all((noisy_rewards >= 0.0) & (noisy_rewards <= 1.0))
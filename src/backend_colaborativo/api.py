@@ -9,6 +9,8 @@ CORS(app)
 # Inicializar recomendador
 DATA_PATH = os.path.join(os.path.dirname(__file__), '../../notebooks')
 MODEL_PATH = os.path.join(os.path.dirname(__file__), 'model.pkl')
+# Factores en .npy que también mapea el backend del agente (CF_MODEL_PATH)
+FACTORS_PATH = os.path.join(os.path.dirname(__file__), 'factors')
 
 recommender = CollaborativeFilteringRecommender(DATA_PATH)
 
@@ -32,6 +34,9 @@ def init_model():
         recommender.save_model(MODEL_PATH)
         model_loaded = True
     
+    recommender.export_factors(FACTORS_PATH)
+    recommender.load_factors(FACTORS_PATH)
+    
     print("Modelo listo!")
 
 @app.route('/health', methods=['GET'])
@@ -2,8 +2,14 @@ import pandas as pd
 import numpy as np
 from scipy.sparse import csr_matrix
 from sklearn.decomposition import TruncatedSVD
+import json
 import os
 import pickle
+import shutil
+
+# Manifiesto con la versión publicada de los factores (lo lee también el backend del agente)
+FACTORS_MANIFEST = 'manifest.json'
+FACTOR_FILES = ('user_ids', 'artist_ids', 'user_factors', 'artist_factors')
 
 class CollaborativeFilteringRecommender:
     """Collaborative Filtering Recommender usando SVD"""
@@ -186,6 +192,70 @@ class CollaborativeFilteringRecommender:
             pickle.dump(model_data, f)
         print(f"Modelo guardado en {filepath}")
     
+    def export_factors(self, directory, keep_versions=2):
+        """
+        Exportar factores a ficheros .npy para compartirlos vía memory-map
+        
+        Cada exportación escribe una versión completa en su propio directorio
+        y la publica reemplazando el manifiesto con os.replace: los lectores
+        ven la versión anterior o la nueva entera, nunca una mezcla.
+        """
+        os.makedirs(directory, exist_ok=True)
+        arrays = {
+            'user_ids': np.asarray(self.user_ids, dtype=np.int64),
+            'artist_ids': np.asarray(self.artist_ids, dtype=np.int64),
+            'user_factors': np.ascontiguousarray(self.user_factors, dtype=np.float32),
+            'artist_factors': np.ascontiguousarray(self.artist_factors, dtype=np.float32)
+        }
+        
+        versions = self._factor_versions(directory)
+        version = versions[-1] + 1 if versions else 1
+        version_dir = os.path.join(directory, f'v{version:06d}')
+        os.makedirs(version_dir)
+        for name, array in arrays.items():
+            np.save(os.path.join(version_dir, f'{name}.npy'), array)
+        
+        manifest = {
+            'version': version,
+            'path': os.path.basename(version_dir),
+            'shapes': {name: list(array.shape) for name, array in arrays.items()}
+        }
+        manifest_path = os.path.join(directory, FACTORS_MANIFEST)
+        with open(manifest_path + '.tmp', 'w') as f:
+            json.dump(manifest, f)
+        os.replace(manifest_path + '.tmp', manifest_path)
+        
+        # Se conservan las últimas versiones: un lector puede estar abriendo la anterior
+        for old in versions[:max(len(versions) + 1 - keep_versions, 0)]:
+            shutil.rmtree(os.path.join(directory, f'v{old:06d}'), ignore_errors=True)
+        print(f"Factores exportados en {version_dir} (versión {version})")
+    
+    @staticmethod
+    def _factor_versions(directory):
+        """Versiones exportadas presentes en el directorio, ordenadas"""
+        return sorted(
+            int(name[1:]) for name in os.listdir(directory)
+            if name.startswith('v') and name[1:].isdigit()
+            and os.path.isdir(os.path.join(directory, name))
+        )
+    
+    def load_factors(self, directory):
+        """Usar los factores exportados (memory-map de solo lectura, compartido entre procesos)"""
+        with open(os.path.join(directory, FACTORS_MANIFEST)) as f:
+            manifest = json.load(f)
+        version_dir = os.path.join(directory, manifest['path'])
+        arrays = {
+            name: np.load(os.path.join(version_dir, f'{name}.npy'), mmap_mode='r')
+            for name in FACTOR_FILES
+        }
+        shapes = {name: list(array.shape) for name, array in arrays.items()}
+        if shapes != manifest['shapes']:
+            raise ValueError(f"Factores de la versión {manifest['version']} incompletos: "
+                             f"{shapes} != {manifest['shapes']}")
+        self.user_factors = arrays['user_factors']
+        self.artist_factors = arrays['artist_factors']
+        print(f"Factores mapeados desde {version_dir} (versión {manifest['version']})")
+    
     def load_model(self, filepath):
         """Cargar modelo entrenado"""
         with open(filepath, 'rb') as f: